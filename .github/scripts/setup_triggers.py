@@ -223,10 +223,14 @@ def setup_eventbridge_trigger(config, lambda_arn):
                     )
             except ClientError:
                 pass
+            target = {"Id": target_id, "Arn": lambda_arn}
+            if "input" in source:
+                # Constant JSON passed to the Lambda instead of the EventBridge event.
+                target["Input"] = json.dumps(source["input"])
             events_client.put_targets(
                 Rule=rule_name,
                 EventBusName=event_bus_arn,
-                Targets=[{"Id": target_id, "Arn": lambda_arn}],
+                Targets=[target],
             )
             time.sleep(5)
 
@@ -6,19 +6,40 @@ for site-utilization metrics covering the past seven days, compares
 them to the prior week, and publishes a plain-text summary to an SNS
 topic for email delivery.
 
-Trigger: EventBridge schedule (weekly, Sunday evening US-Pacific).
+When ANALYTICS_SNAPSHOT_BUCKET is set, each week's metrics are saved to S3
+as a JSON snapshot keyed by ISO week. Later runs read the prior week from
+its snapshot instead of re-querying it, and the stored weeks feed a
+12-week trend section.
+
+A daily run (event key "analytics_sketch") stores per-day HyperLogLog
+sketches of session ids and video viewer ids in the same bucket. The report
+merges them for distinct counts over any window (each report week, and a
+rolling 28 days) instead of running count_distinct over raw events.
+
+Triggers: EventBridge schedules (weekly report, Sunday evening US-Pacific;
+daily sketches just after midnight UTC).
 """
 
+import json
 import logging
 import os
+import sys
 import time
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
 
 import boto3
 from botocore.exceptions import ClientError
 
 from common.constants import DEFAULT_REGION
 
+# Allow submodule import when app is loaded by path (tests); Lambda runtime already has cwd on path
+_APP_DIR = Path(__file__).resolve().parent
+if str(_APP_DIR) not in sys.path:
+    sys.path.insert(0, str(_APP_DIR))
+
+import hll  # noqa: E402
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
@@ -36,18 +57,58 @@ TRACKED_EVENTS = (
 # A week-over-week change above this threshold is flagged
 SIGNIFICANT_CHANGE_PCT = 20
 
-# Logs Insights polling
-_QUERY_POLL_INTERVAL_SECS = 2
+# Logs Insights polling. Every report query is submitted up front (up to
+# _MAX_CONCURRENT_QUERIES at once, well under the account quota) and polled in one
+# loop that shares a single deadline. The poll interval backs off while nothing
+# finishes and resets whenever a query completes.
+_QUERY_POLL_MIN_SECS = 0.5
+_QUERY_POLL_MAX_SECS = 4.0
+_QUERY_POLL_BACKOFF = 1.5
 _QUERY_TIMEOUT_SECS = 60
+_MAX_CONCURRENT_QUERIES = 10
+_QUERY_DONE_STATUSES = ("Complete", "Failed", "Cancelled", "Timeout")
 
 # RUM stores custom events as one log record per event with this top-level
 # event_type. The user-defined event name (PageView, VideoPlay, ...) lives
 # inside the event_details JSON blob.
 _RUM_CUSTOM_EVENT_TYPE = "com.amazon.rum.custom_event"
 
-
-def lambda_handler(_event, _context):
-    """Generate and publish the weekly analytics report."""
+# Both report weeks come from one scan per metric: rows are grouped by a week index
+# counted from the start of the range (bin(7d) would align buckets to the epoch, not
+# to the report's weeks) and split per week in Python.
+_WEEK_FIELD = "week_index"
+_WEEK_MILLIS = 7 * 24 * 60 * 60 * 1000
+
+# Weekly snapshots (optional; ANALYTICS_SNAPSHOT_BUCKET). One compact JSON object
+# per report week under the prefix, named by the ISO week of its first day.
+_SNAPSHOT_VERSION = 1
+_DEFAULT_SNAPSHOT_PREFIX = "analytics-report/weeks/"
+_TREND_WEEKS = 12
+_SPARK_CHARS = "▁▂▃▄▅▆▇█"
+_SPARK_MISSING = "·"
+
+# Daily HyperLogLog sketches of the distinct-count fields (same bucket). Each daily
+# run sketches the closed days of the last _SKETCH_DAYS that have no sketch yet; one
+# Insights query per day and field lists the day's distinct values.
+_SKETCH_EVENT_KEY = "analytics_sketch"
+_DEFAULT_SKETCH_PREFIX = "analytics-report/sketches/"
+_SKETCH_VERSION = 1
+_SKETCH_DAYS = 7
+_SKETCH_ROW_LIMIT = 10000
+_ROLLING_UNIQUE_DAYS = 28
+# metric -> (distinct field, custom event filter)
+_SKETCH_FIELDS = {
+    "sessions": ("metadata.session_id", None),
+    "unique_video_viewers": ("user_details.user_id", "VideoPlay"),
+}
+# (bucket, day) -> {metric: sketch}
+_SKETCH_CACHE: dict[tuple[str, date], dict[str, bytearray]] = {}
+
+
+def lambda_handler(event, _context):
+    """Generate and publish the weekly analytics report (or build daily sketches)."""
+    if _SKETCH_EVENT_KEY in (event or {}):
+        return _build_sketches(event)
     log_group = os.environ["RUM_LOG_GROUP_NAME"]
     rum_region = os.environ.get("RUM_LOG_REGION", DEFAULT_REGION)
     sns_topic_arn = os.environ["AWS_SNS_ANALYTICS_TOPIC_ARN"]
@@ -55,22 +116,27 @@ def lambda_handler(_event, _context):
 
     logs = boto3.client("logs", region_name=rum_region)
     sns = boto3.client("sns", region_name=region)
+    store = _snapshot_store(region)
 
     today = datetime.now(timezone.utc).date()  # noqa: UP017
     this_week_end = today
     this_week_start = today - timedelta(days=7)
-    prev_week_end = this_week_start
-    prev_week_start = prev_week_end - timedelta(days=7)
 
-    this_week = _gather_metrics(logs, log_group, this_week_start, this_week_end)
-    prev_week = _gather_metrics(logs, log_group, prev_week_start, prev_week_end)
+    history = _load_history(store, this_week_start)
+    weeks = _report_weeks(logs, log_group, this_week_start, history, store)
+    saved = _save_new_weeks(store, weeks, history)
+    this_week = weeks[this_week_start]
+    prev_week = weeks[this_week_start - timedelta(days=7)]
+    trend = _trend(history | weeks, this_week_start) if store else None
+    rolling_start = this_week_end - timedelta(days=_ROLLING_UNIQUE_DAYS)
+    rolling = _sketch_counts(store, rolling_start, _ROLLING_UNIQUE_DAYS)
 
     date_label = (
         f"{this_week_start.strftime('%b %d')} - "
         f"{(this_week_end - timedelta(days=1)).strftime('%b %d, %Y')}"
     )
     subject = f"Suigetsukan Weekly Analytics - {date_label}"
-    body = _build_report(this_week, prev_week, date_label)
+    body = _build_report(this_week, prev_week, date_label, trend, rolling)
 
     sns.publish(
         TopicArn=sns_topic_arn,
@@ -79,7 +145,41 @@ def lambda_handler(_event, _context):
     )
 
     logger.info("Published analytics report for %s", date_label)
-    return {"report_period": date_label, "metrics": this_week}
+    return {
+        "report_period": date_label,
+        "metrics": this_week,
+        "snapshots": {"loaded": len(history), "saved": saved},
+        "rolling_unique": rolling,
+    }
+
+
+def _report_weeks(logs_client, log_group, this_week_start, history, store=None):
+    """Return ``{week start: metrics}`` for this week and the previous one.
+
+    The previous week comes from its snapshot when one exists, so only this
+    week is queried; otherwise both weeks are queried in one scan. When daily
+    sketches cover every queried week, the count_distinct queries are skipped
+    and the distinct counts come from the merged sketches.
+    """
+    prev_week_start = this_week_start - timedelta(days=7)
+    starts = [this_week_start]
+    if prev_week_start not in history:
+        starts.insert(0, prev_week_start)
+    uniques = {start: _sketch_counts(store, start, 7) for start in starts}
+    from_sketches = all(uniques.values())
+    weeks = _gather_metrics(
+        logs_client,
+        log_group,
+        starts[0],
+        tuple(starts),
+        ("event_counts",) if from_sketches else None,
+    )
+    if from_sketches:
+        for start in starts:
+            weeks[start].update(uniques[start])
+    if prev_week_start in history:
+        weeks[prev_week_start] = history[prev_week_start]
+    return weeks
 
 
 # -------------------------------------------------------------------
@@ -87,47 +187,88 @@ def lambda_handler(_event, _context):
 # -------------------------------------------------------------------
 
 
-def _gather_metrics(logs_client, log_group, start_date, end_date):
-    """Aggregate RUM events for the given date range into the report dict."""
+def _gather_metrics(logs_client, log_group, start_date, labels, only=None):
+    """Aggregate RUM events for consecutive 7-day windows from ``start_date``.
+
+    ``labels`` names the windows oldest first. Each metric is one query over
+    the whole range, grouped by week index; returns ``{label: metrics}``.
+    ``only`` limits the queries run; skipped metrics are left as None.
+    """
     start_ts = _to_epoch(start_date)
-    end_ts = _to_epoch(end_date)
+    end_ts = _to_epoch(start_date + timedelta(days=7 * len(labels)))
+    jobs = {
+        metric: (query, start_ts, end_ts)
+        for metric, query in _metric_queries(start_ts).items()
+        if only is None or metric in only
+    }
+    results = _run_queries(logs_client, log_group, jobs)
+    weekly = {metric: _split_by_week(rows, len(labels)) for metric, rows in results.items()}
+    return {
+        label: _metrics_from_results({metric: weeks[index] for metric, weeks in weekly.items()})
+        for index, label in enumerate(labels)
+    }
+
+
+def _metric_queries(start_ts):
+    """Return ``{metric: query string}``, each grouped by week index from ``start_ts``."""
+    week = f"floor((toMillis(@timestamp) - {start_ts * 1000}) / {_WEEK_MILLIS}) as {_WEEK_FIELD}"
+    return {
+        "event_counts": _event_counts_query(week),
+        "sessions": _distinct_count_query(week, "metadata.session_id"),
+        "unique_video_viewers": _distinct_count_query(
+            week,
+            "user_details.user_id",
+            event_name_filter="VideoPlay",
+        ),
+    }
+
+
+def _split_by_week(rows, week_count):
+    """Split one query's rows into a list of per-week row lists (None stays None)."""
+    if rows is None:
+        return [None] * week_count
+    weeks: list[list] = [[] for _ in range(week_count)]
+    for row in rows:
+        cells = {cell["field"]: cell["value"] for cell in row}
+        index = _safe_int(cells.get(_WEEK_FIELD, -1))
+        if 0 <= index < week_count:
+            weeks[index].append(row)
+    return weeks
 
-    metrics = dict.fromkeys(TRACKED_EVENTS)
-    metrics["sessions"] = None
-    metrics["unique_video_viewers"] = None
 
-    event_counts = _query_event_counts(logs_client, log_group, start_ts, end_ts)
+def _metrics_from_results(results):
+    """Build the report dict from ``{metric: rows or None}`` for one window."""
+    metrics = dict.fromkeys(TRACKED_EVENTS)
+    event_counts = _parse_event_counts(results.get("event_counts"))
     if event_counts is not None:
         for event_name in TRACKED_EVENTS:
             metrics[event_name] = event_counts.get(event_name, 0)
-
-    metrics["sessions"] = _query_distinct_count(
-        logs_client,
-        log_group,
-        start_ts,
-        end_ts,
-        distinct_field="metadata.session_id",
-    )
-    metrics["unique_video_viewers"] = _query_distinct_count(
-        logs_client,
-        log_group,
-        start_ts,
-        end_ts,
-        distinct_field="user_details.user_id",
-        event_name_filter="VideoPlay",
-    )
+    metrics["sessions"] = _parse_distinct_count(results.get("sessions"))
+    metrics["unique_video_viewers"] = _parse_distinct_count(results.get("unique_video_viewers"))
     return metrics
 
 
-def _query_event_counts(logs_client, log_group, start_ts, end_ts):
-    """Return ``{event_name: count}`` for all custom events in the window."""
-    query = (
-        f"fields event_details.event_type as event_name\n"
+def _event_counts_query(week):
+    """Logs Insights query counting each custom event per week."""
+    return (
+        f"fields event_details.event_type as event_name, {week}\n"
         f'| filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"\n'
-        f"| stats count() as event_count by event_name\n"
+        f"| stats count() as event_count by event_name, {_WEEK_FIELD}\n"
         f"| limit 100"
     )
-    rows = _run_query(logs_client, log_group, start_ts, end_ts, query)
+
+
+def _distinct_count_query(week, distinct_field, event_name_filter=None):
+    """Logs Insights query for count_distinct(<field>) per week."""
+    parts = [f"fields {week}", f'| filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"']
+    if event_name_filter is not None:
+        parts.append(f'| filter event_details.event_type = "{event_name_filter}"')
+    parts.append(f"| stats count_distinct({distinct_field}) as n by {_WEEK_FIELD}")
+    return "\n".join(parts)
+
+
+def _parse_event_counts(rows):
+    """Return ``{event_name: count}`` from event-count rows, or None on error."""
     if rows is None:
         return None
     counts = {}
@@ -140,47 +281,80 @@ def _query_event_counts(logs_client, log_group, start_ts, end_ts):
     return counts
 
 
-def _query_distinct_count(
-    logs_client,
-    log_group,
-    start_ts,
-    end_ts,
-    distinct_field,
-    event_name_filter=None,
-):
-    """Return count_distinct(<field>) over the window, or None on error."""
-    parts = [f'filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"']
-    if event_name_filter is not None:
-        parts.append(f'| filter event_details.event_type = "{event_name_filter}"')
-    parts.append(f"| stats count_distinct({distinct_field}) as n")
-    query = "\n".join(parts)
+def _parse_distinct_count(rows):
+    """Return the distinct count from a count_distinct result, or None on error.
 
-    rows = _run_query(logs_client, log_group, start_ts, end_ts, query)
-    if not rows:
+    A week with no matching events has no row and counts as 0.
+    """
+    if rows is None:
         return None
+    if not rows:
+        return 0
     cells = {cell["field"]: cell["value"] for cell in rows[0]}
     return _safe_int(cells.get("n"))
 
 
-def _run_query(logs_client, log_group, start_ts, end_ts, query_string):
-    """Submit a Logs Insights query and wait for results."""
-    try:
-        start_resp = logs_client.start_query(
-            logGroupName=log_group,
-            startTime=start_ts,
-            endTime=end_ts,
-            queryString=query_string,
-        )
-    except ClientError as err:
-        logger.warning(
-            "Logs Insights start_query failed: %s",
-            err.response["Error"]["Message"],
-        )
-        return None
+def _run_queries(logs_client, log_group, jobs):
+    """Run Logs Insights queries concurrently and wait for all of them.
 
-    query_id = start_resp["queryId"]
+    ``jobs`` maps a key to ``(query_string, start_ts, end_ts)``. Returns
+    ``{key: rows}``, with None for any query that failed, could not start
+    or was still running at the shared deadline.
+    """
+    run = {
+        "log_group": log_group,
+        "waiting": list(jobs.items()),
+        "running": {},
+        "results": dict.fromkeys(jobs),
+    }
     deadline = time.monotonic() + _QUERY_TIMEOUT_SECS
-    while time.monotonic() < deadline:
+    delay = _QUERY_POLL_MIN_SECS
+    while True:
+        _start_waiting(logs_client, run)
+        finished = _poll_running(logs_client, run)
+        remaining = deadline - time.monotonic()
+        if not (run["waiting"] or run["running"]) or remaining <= 0:
+            break
+        delay = (
+            _QUERY_POLL_MIN_SECS
+            if finished
+            else min(_QUERY_POLL_MAX_SECS, delay * _QUERY_POLL_BACKOFF)
+        )
+        time.sleep(min(delay, remaining))
+
+    _stop_outstanding(logs_client, run)
+    return run["results"]
+
+
+def _start_waiting(logs_client, run):
+    """Submit queued queries while there is room; LimitExceeded keeps them queued."""
+    while run["waiting"] and len(run["running"]) < _MAX_CONCURRENT_QUERIES:
+        key, (query_string, start_ts, end_ts) = run["waiting"][0]
+        try:
+            start_resp = logs_client.start_query(
+                logGroupName=run["log_group"],
+                startTime=start_ts,
+                endTime=end_ts,
+                queryString=query_string,
+            )
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "LimitExceededException":
+                logger.info("Logs Insights concurrency limit hit; %d queued", len(run["waiting"]))
+                return
+            logger.warning(
+                "Logs Insights start_query failed: %s",
+                err.response["Error"]["Message"],
+            )
+            run["waiting"].pop(0)
+            continue
+        run["waiting"].pop(0)
+        run["running"][key] = start_resp["queryId"]
+
+
+def _poll_running(logs_client, run):
+    """Poll every running query once; return how many finished."""
+    finished = 0
+    for key, query_id in list(run["running"].items()):
         try:
             result = logs_client.get_query_results(queryId=query_id)
         except ClientError as err:
@@ -188,21 +362,281 @@ def _run_query(logs_client, log_group, start_ts, end_ts, query_string):
                 "Logs Insights get_query_results failed: %s",
                 err.response["Error"]["Message"],
             )
-            return None
-        status = result.get("status")
+            status = "Failed"
+            result = {}
+        else:
+            status = result.get("status")
+        if status not in _QUERY_DONE_STATUSES:
+            continue
+        del run["running"][key]
+        finished += 1
         if status == "Complete":
-            return result.get("results", [])
-        if status in ("Failed", "Cancelled", "Timeout"):
-            logger.warning("Logs Insights query ended with status %s", status)
-            return None
-        time.sleep(_QUERY_POLL_INTERVAL_SECS)
+            run["results"][key] = result.get("results", [])
+        else:
+            logger.warning("Logs Insights query %s ended with status %s", key, status)
+    return finished
+
+
+def _stop_outstanding(logs_client, run):
+    """Cancel queries still running at the deadline and log anything never started."""
+    for key, query_id in run["running"].items():
+        logger.warning("Logs Insights query %s exceeded %ss timeout", key, _QUERY_TIMEOUT_SECS)
+        try:
+            logs_client.stop_query(queryId=query_id)
+        except ClientError:
+            logger.debug("stop_query failed for %s", query_id)
+    for key, _job in run["waiting"]:
+        logger.warning("Logs Insights query %s never started", key)
+
+
+# -------------------------------------------------------------------
+#  Weekly snapshots (S3)
+# -------------------------------------------------------------------
+
+
+def _snapshot_store(region):
+    """Return the S3 snapshot location, or None when snapshots are not configured."""
+    bucket = (os.environ.get("ANALYTICS_SNAPSHOT_BUCKET") or "").strip()
+    if not bucket:
+        return None
+    return {
+        "s3": boto3.client("s3", region_name=region),
+        "bucket": bucket,
+        "prefix": os.environ.get("ANALYTICS_SNAPSHOT_PREFIX") or _DEFAULT_SNAPSHOT_PREFIX,
+        "sketch_prefix": os.environ.get("ANALYTICS_SKETCH_PREFIX") or _DEFAULT_SKETCH_PREFIX,
+    }
 
-    logger.warning("Logs Insights query exceeded %ss timeout", _QUERY_TIMEOUT_SECS)
+
+def _get_json(store, key):
+    """Read one JSON object from the store; None if missing or unreadable."""
+    try:
+        obj = store["s3"].get_object(Bucket=store["bucket"], Key=key)
+        return json.loads(obj["Body"].read())
+    except ClientError as err:
+        if err.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+            logger.warning("load failed s3://%s/%s: %s", store["bucket"], key, err)
+        return None
+    except (ValueError, KeyError, TypeError) as err:
+        logger.warning("unreadable s3://%s/%s: %s", store["bucket"], key, err)
+        return None
+
+
+def _put_json(store, key, doc):
+    """Write one compact JSON object to the store. Return True on success."""
+    try:
+        store["s3"].put_object(
+            Bucket=store["bucket"],
+            Key=key,
+            Body=json.dumps(doc, separators=(",", ":"), sort_keys=True).encode("utf-8"),
+            ContentType="application/json",
+        )
+    except ClientError as err:
+        logger.warning("save failed s3://%s/%s: %s", store["bucket"], key, err)
+        return False
+    return True
+
+
+def _snapshot_key(store, week_start):
+    """S3 key of the snapshot for the week starting ``week_start`` (ISO week name)."""
+    iso_year, iso_week, _weekday = week_start.isocalendar()
+    return f"{store['prefix']}{iso_year}-W{iso_week:02d}.json"
+
+
+def _load_snapshot(store, week_start):
+    """Return the stored metrics for one week, or None if missing or unusable.
+
+    A snapshot only counts if it covers exactly the same 7 days, so a run on
+    an unusual day never mixes differently aligned weeks.
+    """
+    snapshot = _get_json(store, _snapshot_key(store, week_start))
+    if not isinstance(snapshot, dict) or snapshot.get("version") != _SNAPSHOT_VERSION:
+        return None
+    if snapshot.get("start") != week_start.isoformat():
+        return None
+    return snapshot.get("metrics")
+
+
+def _save_snapshot(store, week_start, metrics):
+    """Write one week's metrics as compact JSON. Return True on success."""
+    snapshot = {
+        "version": _SNAPSHOT_VERSION,
+        "start": week_start.isoformat(),
+        "end": (week_start + timedelta(days=7)).isoformat(),
+        "metrics": metrics,
+    }
+    return _put_json(store, _snapshot_key(store, week_start), snapshot)
+
+
+def _load_history(store, this_week_start):
+    """Return ``{week start: metrics}`` for the stored weeks before this one."""
+    if store is None:
+        return {}
+    history = {}
+    for weeks_back in range(1, _TREND_WEEKS):
+        week_start = this_week_start - timedelta(days=7 * weeks_back)
+        metrics = _load_snapshot(store, week_start)
+        if metrics is not None:
+            history[week_start] = metrics
+    return history
+
+
+def _save_new_weeks(store, weeks, history):
+    """Snapshot freshly queried weeks whose every metric is known; return the count saved.
+
+    Weeks with a failed query are left unsaved so the next run queries them again.
+    """
+    if store is None:
+        return 0
+    saved = 0
+    for week_start, metrics in weeks.items():
+        if week_start in history or any(value is None for value in metrics.values()):
+            continue
+        saved += _save_snapshot(store, week_start, metrics)
+    return saved
+
+
+def _trend(weeks, this_week_start):
+    """Return the last ``_TREND_WEEKS`` weeks' metrics, oldest first (None if unknown)."""
+    return [
+        weeks.get(this_week_start - timedelta(days=7 * weeks_back))
+        for weeks_back in range(_TREND_WEEKS - 1, -1, -1)
+    ]
+
+
+# -------------------------------------------------------------------
+#  Daily HyperLogLog sketches (S3)
+# -------------------------------------------------------------------
+
+
+def _build_sketches(event):
+    """Daily run: sketch every recent closed day that has no stored sketch yet.
+
+    ``{"analytics_sketch": {"days": N}}`` widens the look-back for a backfill.
+    Days whose queries fail or hit the row limit are not stored, so the next run
+    retries them.
+    """
+    region = os.environ.get("AWS_REGION", DEFAULT_REGION)
+    store = _snapshot_store(region)
+    if store is None:
+        return {"built": [], "failed": [], "error": "ANALYTICS_SNAPSHOT_BUCKET not configured"}
+    request = event.get(_SKETCH_EVENT_KEY) or {}
+    look_back = int(request.get("days") or _SKETCH_DAYS)
+    today = datetime.now(timezone.utc).date()  # noqa: UP017
+    days = [today - timedelta(days=back) for back in range(look_back, 0, -1)]
+    missing = [day for day in days if _load_day_sketches(store, day) is None]
+
+    logs = boto3.client("logs", region_name=os.environ.get("RUM_LOG_REGION", DEFAULT_REGION))
+    jobs = {
+        (day, metric): (_distinct_values_query(field, event_filter), *_day_range(day))
+        for day in missing
+        for metric, (field, event_filter) in _SKETCH_FIELDS.items()
+    }
+    results = _run_queries(logs, os.environ["RUM_LOG_GROUP_NAME"], jobs)
+    built, failed = [], []
+    for day in missing:
+        sketches = _sketch_day({metric: results[(day, metric)] for metric in _SKETCH_FIELDS})
+        if sketches is not None and _save_day_sketches(store, day, sketches):
+            built.append(day.isoformat())
+        else:
+            failed.append(day.isoformat())
+    logger.info("Built sketches for %s; failed %s", built, failed)
+    return {"built": built, "failed": failed}
+
+
+def _day_range(day):
+    """(start_ts, end_ts) epoch seconds of one UTC day."""
+    return _to_epoch(day), _to_epoch(day + timedelta(days=1))
+
+
+def _distinct_values_query(distinct_field, event_name_filter=None):
+    """Logs Insights query listing the distinct values of a field."""
+    parts = [
+        f"fields {distinct_field} as value",
+        f'| filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"',
+    ]
+    if event_name_filter is not None:
+        parts.append(f'| filter event_details.event_type = "{event_name_filter}"')
+    parts.append("| filter ispresent(value)")
+    parts.append(f"| stats count() as n by value\n| limit {_SKETCH_ROW_LIMIT}")
+    return "\n".join(parts)
+
+
+def _sketch_day(results):
+    """Build ``{metric: sketch}`` from one day's distinct-value rows, or None.
+
+    None if any query failed or returned the row limit (the value list would be
+    truncated, so the sketch would undercount).
+    """
+    sketches = {}
+    for metric, rows in results.items():
+        if rows is None:
+            return None
+        if len(rows) >= _SKETCH_ROW_LIMIT:
+            logger.warning("%s distinct values hit the %s row limit", metric, _SKETCH_ROW_LIMIT)
+            return None
+        sketch = hll.new_sketch()
+        for row in rows:
+            cells = {cell["field"]: cell["value"] for cell in row}
+            if cells.get("value"):
+                hll.add(sketch, cells["value"])
+        sketches[metric] = sketch
+    return sketches
+
+
+def _sketch_key(store, day):
+    """S3 key of one day's sketches."""
+    return f"{store['sketch_prefix']}{day.isoformat()}.json"
+
+
+def _save_day_sketches(store, day, sketches):
+    """Store one day's sketches as base64 registers."""
+    doc = {
+        "version": _SKETCH_VERSION,
+        "day": day.isoformat(),
+        "sketches": {metric: hll.encode(sketch) for metric, sketch in sketches.items()},
+    }
+    if not _put_json(store, _sketch_key(store, day), doc):
+        return False
+    _SKETCH_CACHE[(store["bucket"], day)] = sketches
+    return True
+
+
+def _load_day_sketches(store, day):
+    """Return ``{metric: sketch}`` for one day, or None if missing or unusable.
+
+    Closed days never change, so loaded sketches are kept for warm invocations.
+    """
+    cache_key = (store["bucket"], day)
+    if cache_key in _SKETCH_CACHE:
+        return _SKETCH_CACHE[cache_key]
+    doc = _get_json(store, _sketch_key(store, day))
+    if not isinstance(doc, dict) or doc.get("version") != _SKETCH_VERSION:
+        return None
     try:
-        logs_client.stop_query(queryId=query_id)
-    except ClientError:
-        logger.debug("stop_query failed for %s", query_id)
-    return None
+        sketches = {metric: hll.decode(doc["sketches"][metric]) for metric in _SKETCH_FIELDS}
+    except (KeyError, TypeError, ValueError) as err:
+        logger.warning("unusable sketch for %s: %s", day, err)
+        return None
+    _SKETCH_CACHE[cache_key] = sketches
+    return sketches
+
+
+def _sketch_counts(store, start_date, days):
+    """Distinct counts over ``days`` days from ``start_date`` by merging daily sketches.
+
+    Returns ``{metric: estimate}``, or None unless every day has a sketch.
+    """
+    if store is None:
+        return None
+    daily = []
+    for offset in range(days):
+        sketches = _load_day_sketches(store, start_date + timedelta(days=offset))
+        if sketches is None:
+            return None
+        daily.append(sketches)
+    return {
+        metric: hll.estimate(hll.merge(day[metric] for day in daily)) for metric in _SKETCH_FIELDS
+    }
 
 
 def _to_epoch(date_obj):
@@ -231,8 +665,12 @@ def _safe_int(value):
 # -------------------------------------------------------------------
 
 
-def _build_report(this_week, prev_week, date_label):
-    """Build the plain-text analytics report."""
+def _build_report(this_week, prev_week, date_label, trend=None, rolling=None):
+    """Build the plain-text analytics report.
+
+    ``trend``: weekly metrics, oldest first; ``rolling``: sketch-based distinct
+    counts over the last ``_ROLLING_UNIQUE_DAYS`` days.
+    """
     lines = [
         "=" * 56,
         "  SUIGETSUKAN WEEKLY ANALYTICS",
@@ -246,6 +684,10 @@ def _build_report(this_week, prev_week, date_label):
     _append_video(lines, this_week)
     _append_sections(lines, this_week)
     _append_comparison(lines, this_week, prev_week)
+    if trend:
+        _append_trend(lines, trend)
+    if rolling:
+        _append_rolling(lines, rolling)
 
     lines.append("=" * 56)
     lines.append("Report generated by suigetsukan-analytics-report Lambda.")
@@ -333,6 +775,31 @@ def _append_comparison(lines, this_week, prev_week):
     lines.append("")
 
 
+def _append_trend(lines, trend):
+    """Add one sparkline per headline metric across the stored weeks."""
+    lines.append(f"{len(trend)}-WEEK TREND (oldest -> newest)")
+    lines.append("-" * 40)
+    trend_keys = [
+        ("sessions", "Sessions"),
+        ("PageView", "Page Views"),
+        ("VideoPlay", "Video Plays"),
+        ("UserSignIn", "Sign-Ins"),
+    ]
+    for key, label in trend_keys:
+        values = [week.get(key) if week else None for week in trend]
+        lines.append(f"  {label:14s}  {_sparkline(values)}  {_fmt(values[-1])}")
+    lines.append("")
+
+
+def _append_rolling(lines, rolling):
+    """Add distinct counts over the rolling window (from merged daily sketches)."""
+    lines.append(f"LAST {_ROLLING_UNIQUE_DAYS} DAYS (UNIQUE, ESTIMATED)")
+    lines.append("-" * 40)
+    lines.append(f"  Sessions:        {_fmt(rolling.get('sessions'))}")
+    lines.append(f"  Video Viewers:   {_fmt(rolling.get('unique_video_viewers'))}")
+    lines.append("")
+
+
 # -------------------------------------------------------------------
 #  Formatting helpers
 # -------------------------------------------------------------------
@@ -357,6 +824,24 @@ def _fmt_pct_change(previous, current):
     return f"({sign}{pct:.0f}%{flag})"
 
 
+def _sparkline(values):
+    """Render values as block characters scaled between their min and max."""
+    known = [v for v in values if v is not None]
+    if not known:
+        return _SPARK_MISSING * len(values)
+    low, high = min(known), max(known)
+    top = len(_SPARK_CHARS) - 1
+    chars = []
+    for value in values:
+        if value is None:
+            chars.append(_SPARK_MISSING)
+        elif high == low:
+            chars.append(_SPARK_CHARS[top // 2])
+        else:
+            chars.append(_SPARK_CHARS[round((value - low) / (high - low) * top)])
+    return "".join(chars)
+
+
 def _completion_rate(plays, completions):
     """Return video completion rate as a formatted string."""
     if plays is None or completions is None or plays == 0:
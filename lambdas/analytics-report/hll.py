@@ -0,0 +1,83 @@
+"""
+HyperLogLog sketches for analytics-report distinct counts.
+
+A sketch is a bytearray of 2**precision registers. Each value is hashed to 64 bits: the
+top `precision` bits pick a register and the register keeps the longest run of leading
+zeros (+1) seen in the remaining bits. Sketches of the same precision merge by taking the
+register-wise max, so per-day sketches combine into the distinct count of any window.
+At the default precision (4096 registers) the standard error is about 1.6%.
+"""
+
+import base64
+import hashlib
+import math
+import zlib
+from collections.abc import Iterable
+
+PRECISION = 12
+_HASH_BITS = 64
+
+
+def new_sketch(precision: int = PRECISION) -> bytearray:
+    """Empty sketch with 2**precision registers."""
+    return bytearray(1 << precision)
+
+
+def _precision(sketch: bytearray) -> int:
+    """Precision of a sketch from its register count."""
+    return len(sketch).bit_length() - 1
+
+
+def add(sketch: bytearray, value: str) -> None:
+    """Add one value (hashed with BLAKE2b, so stable across processes)."""
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+    hashed = int.from_bytes(digest, "big")
+    precision = _precision(sketch)
+    rest_bits = _HASH_BITS - precision
+    index = hashed >> rest_bits
+    rest = hashed & ((1 << rest_bits) - 1)
+    rank = rest_bits - rest.bit_length() + 1
+    if rank > sketch[index]:
+        sketch[index] = rank
+
+
+def merge(sketches: Iterable[bytearray]) -> bytearray:
+    """Register-wise max of sketches of one precision (the sketch of their union)."""
+    merged: bytearray | None = None
+    for sketch in sketches:
+        if merged is None:
+            merged = bytearray(sketch)
+            continue
+        if len(sketch) != len(merged):
+            raise ValueError("cannot merge sketches of different precision")
+        merged = bytearray(map(max, merged, sketch))
+    if merged is None:
+        raise ValueError("no sketches to merge")
+    return merged
+
+
+def estimate(sketch: bytearray) -> int:
+    """Estimated distinct count, with linear counting for small cardinalities."""
+    registers = len(sketch)
+    alpha = 0.7213 / (1 + 1.079 / registers)
+    raw = alpha * registers * registers / sum(2.0**-r for r in sketch)
+    zeros = sketch.count(0)
+    if raw <= 2.5 * registers and zeros:
+        return round(registers * math.log(registers / zeros))
+    return round(raw)
+
+
+def encode(sketch: bytearray) -> str:
+    """Compact text form: zlib-compressed registers, base64-encoded."""
+    return base64.b64encode(zlib.compress(bytes(sketch), 9)).decode("ascii")
+
+
+def decode(text: str) -> bytearray:
+    """Inverse of encode; ValueError if the payload is not a sketch."""
+    try:
+        sketch = bytearray(zlib.decompress(base64.b64decode(text)))
+    except zlib.error as err:
+        raise ValueError(f"corrupt sketch: {err}") from err
+    if len(sketch) < 16 or len(sketch) & (len(sketch) - 1):
+        raise ValueError(f"sketch has {len(sketch)} registers, not a power of two")
+    return sketch
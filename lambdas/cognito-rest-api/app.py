@@ -3,9 +3,14 @@ This is a REST API lambda for accessing Cognito functions
 """
 #  Copyright (c) 2023.  Suigetsukan Dojo
 
+import base64
+import binascii
 import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
 
@@ -34,6 +39,48 @@ _TRACKED_GROUPS = (
     COGNITO_GROUP_CONTRIBUTOR,
 )
 
+# Cursor-paged /list?limit=&cursor=: each page lists one Cognito page of a single
+# group, unapproved first, then approved. The cursor is opaque to the client
+# (base64url JSON of the group and Cognito's NextToken).
+_LIST_PAGE_GROUPS = (COGNITO_GROUP_UNAPPROVED, COGNITO_GROUP_APPROVED)
+_LIST_PAGE_DEFAULT = 60
+_LIST_PAGE_MAX = 60  # ListUsersInGroup Limit ceiling
+
+# list_users only needs the email attribute; smaller pages, less to parse.
+_USER_ATTRIBUTES = ["email"]
+
+# /list runs its independent listings (all users, unapproved, approved and the
+# tracked groups) concurrently on one shared client. Every list page request takes a
+# token from one bucket kept under Cognito's default user-listing quota (30 RPS),
+# so one invocation's concurrent pagination cannot trip throttling. The bucket lives
+# in this container only: concurrent invocations in other containers each have
+# their own, so together they can still exceed the account-level quota. The
+# client therefore keeps botocore's default retries on throttling errors.
+_LIST_MAX_WORKERS = 6
+_LIST_TPS = 25.0
+
+
+class _TokenBucket:
+    """Thread-safe token bucket refilled at rate tokens/second, holding at most rate."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token (may go into debt); return seconds to wait before the call."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+            return max(0.0, -self.tokens / self.rate)
+
+
+_LIST_LIMITER = _TokenBucket(_LIST_TPS)
+
 logger = logging.getLogger(__name__)
 
 
@@ -105,6 +152,9 @@ def _success_response(body):
 def _handle_get(event, client, user_pool_id):
     """Handle GET requests; return response body."""
     path = event["path"]
+    qs = event.get("queryStringParameters") or {}
+    if path == "/list" and ("limit" in qs or "cursor" in qs):
+        return _handle_list_page(qs, client, user_pool_id)
     if path == "/list":
         return list_handler(client, user_pool_id)
     if path == "/list/admin":
@@ -161,6 +211,75 @@ def _handle_post(event, client, user_pool_id):
     raise RuntimeError("Invalid POST path: " + path)
 
 
+def _handle_list_page(qs, client, user_pool_id):
+    """Validate /list?limit=&cursor= and return one page (or an error response)."""
+    try:
+        limit = int(qs.get("limit") or _LIST_PAGE_DEFAULT)
+    except ValueError:
+        return _error_response(HTTP_BAD_REQUEST, "limit must be an integer")
+    if not 1 <= limit <= _LIST_PAGE_MAX:
+        return _error_response(HTTP_BAD_REQUEST, f"limit must be between 1 and {_LIST_PAGE_MAX}")
+    cursor = qs.get("cursor") or None
+    try:
+        position = _decode_cursor(cursor) if cursor else (_LIST_PAGE_GROUPS[0], None)
+    except ValueError:
+        return _error_response(HTTP_BAD_REQUEST, "Invalid cursor")
+    return list_page_handler(client, user_pool_id, limit, position)
+
+
+def _encode_cursor(group_name, token):
+    """Opaque cursor for the next page: group plus Cognito NextToken (or None)."""
+    raw = json.dumps({"group": group_name, "token": token}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode(CHARSET_UTF8)).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    """Return (group, token) from a cursor; ValueError if it is not one of ours."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as err:
+        raise ValueError("malformed cursor") from err
+    if not isinstance(state, dict) or state.get("group") not in _LIST_PAGE_GROUPS:
+        raise ValueError("unknown cursor group")
+    token = state.get("token")
+    if token is not None and not isinstance(token, str):
+        raise ValueError("bad cursor token")
+    return state["group"], token
+
+
+def _throttle_list_call():
+    """Wait for a token from the shared list-call bucket."""
+    wait = _LIST_LIMITER.take()
+    if wait:
+        time.sleep(wait)
+
+
+def _paged_users(client, operation, error_message, **kwargs):
+    """Yield every user from a Cognito list operation, following its pagination token.
+
+    Each page request is rate limited; the paginator fetches a page on next().
+    """
+    pages = iter(client.get_paginator(operation).paginate(**kwargs))
+    while True:
+        _throttle_list_call()
+        page = next(pages, None)
+        if page is None:
+            return
+        if page["ResponseMetadata"]["HTTPStatusCode"] != HTTP_OK:
+            raise RuntimeError(error_message)
+        yield from page["Users"]
+
+
+def _fan_out(calls):
+    """Run {key: (fn, *args)} concurrently on a small pool; return {key: result}.
+
+    The first failure is re-raised, as it would be from a sequential call.
+    """
+    with ThreadPoolExecutor(max_workers=min(_LIST_MAX_WORKERS, len(calls))) as pool:
+        futures = {key: pool.submit(fn, *args) for key, (fn, *args) in calls.items()}
+    return {key: future.result() for key, future in futures.items()}
+
+
 def compile_users(resp):
     """
     Take the output from Cognito and return a list of users and their emails
@@ -170,7 +289,7 @@ def compile_users(resp):
     return_var = []
     for user in resp["Users"]:
         user_name = user["Username"]
-        for attribute in user["Attributes"]:
+        for attribute in user.get("Attributes", []):
             if attribute["Name"] == "email":
                 email = attribute["Value"]
                 new_user = {"user_name": user_name, "email": email}
@@ -186,12 +305,14 @@ def get_users_in_group(client, user_pool_id, group_name):
     :param group_name: Cognito group name
     :return: List of users in the group
     """
-    response = client.list_users_in_group(UserPoolId=user_pool_id, GroupName=group_name)
-
-    if response["ResponseMetadata"]["HTTPStatusCode"] != HTTP_OK:
-        raise RuntimeError("An error occurred retrieving the users.")
-
-    return compile_users(response)
+    users = _paged_users(
+        client,
+        "list_users_in_group",
+        "An error occurred retrieving the users.",
+        UserPoolId=user_pool_id,
+        GroupName=group_name,
+    )
+    return compile_users({"Users": users})
 
 
 def add_user_to_group(client, user_pool_id, user_name, group_name):
@@ -284,12 +405,14 @@ def get_all_users(client, user_pool_id):
     :param user_pool_id: Cognito user pool id
     :return: List of users
     """
-    response = client.list_users(UserPoolId=user_pool_id)
-
-    if response["ResponseMetadata"]["HTTPStatusCode"] != HTTP_OK:
-        raise RuntimeError("An error occurred retrieving all users.")
-
-    return compile_users(response)
+    users = _paged_users(
+        client,
+        "list_users",
+        "An error occurred retrieving all users.",
+        UserPoolId=user_pool_id,
+        AttributesToGet=_USER_ATTRIBUTES,
+    )
+    return compile_users({"Users": users})
 
 
 def compile_emails(resp):
@@ -318,28 +441,35 @@ def get_admin_users(client, user_pool_id):
     :param user_pool_id: Cognito user pool id
     :return: List of users
     """
-    response = client.list_users_in_group(UserPoolId=user_pool_id, GroupName=COGNITO_GROUP_ADMIN)
-
-    if response["ResponseMetadata"]["HTTPStatusCode"] != HTTP_OK:
-        raise RuntimeError("An error occurred retrieving the admin users.")
-
-    return compile_emails(response)
+    users = _paged_users(
+        client,
+        "list_users_in_group",
+        "An error occurred retrieving the admin users.",
+        UserPoolId=user_pool_id,
+        GroupName=COGNITO_GROUP_ADMIN,
+    )
+    return compile_emails({"Users": users})
 
 
-def _membership_index(client, user_pool_id, group_names):
-    """Build {user_name: [group, ...]} for the supplied groups.
+def _membership_index(members_by_group):
+    """Build {user_name: [group, ...]} from {group: members}.
 
-    One ListUsersInGroup call per tracked group, then invert. Avoids the
-    N+1 of calling admin_list_groups_for_user once per user.
+    One ListUsersInGroup listing per tracked group, then invert. Used by the full
+    /list, where it avoids calling admin_list_groups_for_user once per user; paged
+    /list looks up only the users on the page instead (see list_page_handler).
     """
     index: dict[str, list[str]] = {}
-    for group in group_names:
-        members = get_users_in_group(client, user_pool_id, group)
+    for group, members in members_by_group.items():
         for member in members:
             index.setdefault(member["user_name"], []).append(group)
     return index
 
 
+def _group_listings(client, user_pool_id, group_names):
+    """{group: (get_users_in_group, ...)} calls for _fan_out."""
+    return {group: (get_users_in_group, client, user_pool_id, group) for group in group_names}
+
+
 def list_handler(client, user_pool_id):
     """
     List all Cognito users
@@ -347,9 +477,14 @@ def list_handler(client, user_pool_id):
     :param user_pool_id: Cognito user pool id
     :return: JSON object of users with their tracked-group memberships
     """
-    all_users = get_all_users(client, user_pool_id)
-    unapproved_users = get_users_in_group(client, user_pool_id, COGNITO_GROUP_UNAPPROVED)
-    approved_users = get_users_in_group(client, user_pool_id, COGNITO_GROUP_APPROVED)
+    listings = _group_listings(
+        client, user_pool_id, (COGNITO_GROUP_UNAPPROVED, COGNITO_GROUP_APPROVED, *_TRACKED_GROUPS)
+    )
+    listings[None] = (get_all_users, client, user_pool_id)
+    results = _fan_out(listings)
+    all_users = results[None]
+    unapproved_users = results[COGNITO_GROUP_UNAPPROVED]
+    approved_users = results[COGNITO_GROUP_APPROVED]
     unapproved_set = {(u["user_name"], u["email"]) for u in unapproved_users}
     approved_set = {(u["user_name"], u["email"]) for u in approved_users}
     other_users = [
@@ -365,7 +500,7 @@ def list_handler(client, user_pool_id):
         len(other_users),
     )
 
-    membership = _membership_index(client, user_pool_id, _TRACKED_GROUPS)
+    membership = _membership_index({group: results[group] for group in _TRACKED_GROUPS})
     enriched_approved = [
         {**u, "groups": sorted(membership.get(u["user_name"], []))} for u in approved_users
     ]
@@ -379,6 +514,73 @@ def list_handler(client, user_pool_id):
     return body
 
 
+def _tracked_groups_for_user(client, user_pool_id, user_name):
+    """Sorted tracked groups one user belongs to (AdminListGroupsForUser).
+
+    Each page request takes a token from the shared list-call bucket.
+    """
+    pages = iter(
+        client.get_paginator("admin_list_groups_for_user").paginate(
+            UserPoolId=user_pool_id, Username=user_name
+        )
+    )
+    groups: list[str] = []
+    while True:
+        _throttle_list_call()
+        page = next(pages, None)
+        if page is None:
+            return sorted(groups)
+        groups.extend(g["GroupName"] for g in page["Groups"] if g["GroupName"] in _TRACKED_GROUPS)
+
+
+def list_page_handler(client, user_pool_id, limit, position):
+    """
+    List one page of unapproved or approved users for /list?limit=&cursor=
+    :param client: Cognito client
+    :param user_pool_id: Cognito user pool id
+    :param limit: Maximum users in this page
+    :param position: (group name, Cognito NextToken or None) to resume from
+    :return: JSON object with this page's users and next_cursor (None when done);
+        the first page also carries the pool's estimated total_count
+
+    Group memberships are looked up per approved user on this page: one
+    AdminListGroupsForUser call each (so up to limit calls, paced by the shared
+    list-call bucket) instead of listing every member of each tracked group. A page's
+    cost grows with limit, not with the size of the tracked groups.
+    """
+    group_name, token = position
+    kwargs = {"UserPoolId": user_pool_id, "GroupName": group_name, "Limit": limit}
+    if token:
+        kwargs["NextToken"] = token
+    _throttle_list_call()
+    response = client.list_users_in_group(**kwargs)
+    if response["ResponseMetadata"]["HTTPStatusCode"] != HTTP_OK:
+        raise RuntimeError("An error occurred retrieving the users.")
+    users = compile_users(response)
+
+    body: dict = {"approved": [], "unapproved": [], "next_cursor": None}
+    if group_name != COGNITO_GROUP_APPROVED:
+        body["unapproved"] = users
+    elif users:
+        membership = _fan_out(
+            {
+                u["user_name"]: (_tracked_groups_for_user, client, user_pool_id, u["user_name"])
+                for u in users
+            }
+        )
+        body["approved"] = [{**u, "groups": membership[u["user_name"]]} for u in users]
+
+    next_index = _LIST_PAGE_GROUPS.index(group_name) + 1
+    if response.get("NextToken"):
+        body["next_cursor"] = _encode_cursor(group_name, response["NextToken"])
+    elif next_index < len(_LIST_PAGE_GROUPS):
+        body["next_cursor"] = _encode_cursor(_LIST_PAGE_GROUPS[next_index], None)
+    if position == (_LIST_PAGE_GROUPS[0], None):
+        pool = client.describe_user_pool(UserPoolId=user_pool_id)["UserPool"]
+        body["total_count"] = pool.get("EstimatedNumberOfUsers", 0)
+    return body
+
+
 def approve_handler(user_name, client, user_pool_id):
     """
     Approve a Cognito user
@@ -606,13 +808,13 @@ def handler(event, _context):
         return auth_err
 
     if event["httpMethod"] == "GET":
-        body = _handle_get(event, client, user_pool_id)
+        result = _handle_get(event, client, user_pool_id)
     elif event["httpMethod"] == "POST":
         result = _handle_post(event, client, user_pool_id)
-        if isinstance(result, dict) and "statusCode" in result:
-            return result  # already a full error response
-        body = result
     else:
         raise RuntimeError("Invalid http method: " + event["httpMethod"])
+    if isinstance(result, dict) and "statusCode" in result:
+        return result  # already a full error response
+    body = result
 
     return _success_response(body)
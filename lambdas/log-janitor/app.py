@@ -2,7 +2,8 @@
 log-janitor - Mother Hen Janitor Lambda.
 
 Enforces logging/audit hygiene: CloudWatch Logs retention, CloudTrail presence/config,
-and CloudTrail S3 bucket hardening. Supports AUDIT (report only) and APPLY (remediate).
+and S3 bucket hardening (CloudTrail bucket plus prefix-matched buckets).
+Supports AUDIT (report only) and APPLY (remediate).
 Runs on EventBridge schedule or on-demand. Idempotent; config via env vars.
 """
 
@@ -10,7 +11,7 @@ import json
 import logging
 import os
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, UTC
 from pathlib import Path
 
@@ -29,12 +30,43 @@ except ImportError:
     pass
 
 _RETRY_CONFIG = Config(retries={"max_attempts": 10, "mode": "adaptive"})
+# Clients whose mutating calls go through rate_limiter.limited_call: the limiter owns
+# throttle handling (AIMD backoff and retries), so botocore makes at most one retry.
+# Otherwise botocore would absorb the throttles the bucket needs to see, and each
+# limiter retry could itself cost up to ten requests.
+_LIMITED_RETRY_CONFIG = Config(retries={"max_attempts": 2, "mode": "standard"})
 
 # Allow submodule import when app is loaded by path (tests); Lambda runtime already has cwd on path
 _APP_DIR = Path(__file__).resolve().parent
 if str(_APP_DIR) not in sys.path:
     sys.path.insert(0, str(_APP_DIR))
-from dashboard import build_dashboard_widgets  # noqa: E402
+from dashboard import (  # noqa: E402
+    build_dashboard_widgets,
+    build_insights_dashboard_widgets,
+    dashboard_body_hash,
+)
+from insights_alarms import (  # noqa: E402
+    AGGREGATE_ALARM_PREFIX,
+    COMPOSITE_ALARM_NAME,
+    build_aggregate_alarm_specs,
+    composite_alarm_rule,
+    metric_alarm_params,
+)
+from matchers import (  # noqa: E402
+    compile_matchers,
+    in_scope,
+    scoped_target_days,
+    target_retention_days,
+)
+from rate_limiter import limited_call, limiter_stats, reset_limiters  # noqa: E402
+import s3_posture  # noqa: E402
+import state_snapshot  # noqa: E402
+from tripwires import (  # noqa: E402
+    ALARM_PREFIX as TRIPWIRE_ALARM_PREFIX,
+    COUNTERS as TRIPWIRE_COUNTERS,
+    alarm_in_sync,
+    reconcile_region,
+)
 
 
 def _parse_bool(val, default=True):
@@ -114,6 +146,8 @@ def _get_base_config():
         "require_bucket_encryption": _parse_bool(_env("REQUIRE_BUCKET_ENCRYPTION"), True),
         "require_block_public_access": _parse_bool(_env("REQUIRE_BLOCK_PUBLIC_ACCESS"), True),
         "require_bucket_lifecycle": _parse_bool(_env("REQUIRE_BUCKET_LIFECYCLE"), True),
+        "s3_posture_bucket_prefixes": _parse_comma_list("S3_POSTURE_BUCKET_PREFIXES", ""),
+        "s3_posture_max_workers": _parse_int(_env("S3_POSTURE_MAX_WORKERS"), 8),
         "sns_topic_arn": _get_sns_topic_arn(),
         "report_only_on_drift": _parse_bool(_env("REPORT_ONLY_ON_DRIFT"), True),
         "max_drift_items_in_message": _parse_int(_env("MAX_DRIFT_ITEMS_IN_MESSAGE"), 50),
@@ -140,12 +174,26 @@ def _get_feature_and_alarm_config():
         "sns_topic_prefixes": _parse_comma_list("SNS_TOPIC_PREFIXES", ""),
         "sns_topics": _parse_comma_list("SNS_TOPICS", ""),
         "alarm_sns_topic_arn": (os.environ.get("ALARM_SNS_TOPIC_ARN") or "").strip() or None,
+        "alarm_strategy": (os.environ.get("ALARM_STRATEGY") or "per_resource").strip().lower(),
+        "alarm_composite": _parse_bool(os.environ.get("ALARM_COMPOSITE"), False),
         "cloudtrail_log_group_name": (os.environ.get("CLOUDTRAIL_LOG_GROUP_NAME") or "").strip()
         or None,
         "cloudtrail_metric_namespace": (
             os.environ.get("CLOUDTRAIL_METRIC_NAMESPACE") or "Security/CloudTrail"
         ).strip(),
         "dashboard_name": (os.environ.get("DASHBOARD_NAME") or "MotherHen-Ops").strip(),
+        # iam_policy.json grants only s3://suigetsukan-log-janitor-state/ plus the default
+        # key; a different bucket or STATE_SNAPSHOT_KEY needs the policy updated to match.
+        "state_snapshot_bucket": (os.environ.get("STATE_SNAPSHOT_BUCKET") or "").strip() or None,
+        "state_snapshot_key": (
+            os.environ.get("STATE_SNAPSHOT_KEY") or "log-janitor/state-snapshot.json"
+        ).strip(),
+        # Insights (SEARCH-based) widgets are opt-in; the default keeps the existing
+        # per-resource layout so deployed dashboards are not rewritten unasked.
+        "dashboard_strategy": (
+            (os.environ.get("DASHBOARD_STRATEGY") or "per_resource").strip().lower()
+        ),
+        "dashboard_top_n": _parse_int(os.environ.get("DASHBOARD_TOP_N"), 10),
     }
 
 
@@ -170,40 +218,72 @@ def _get_regions(config):
     return [r.strip() for r in regions_val.split(",") if r.strip()]
 
 
+def _matchers(config):
+    """Compiled scope/retention matchers for this run's config (built on first use)."""
+    matchers = config.get("_matchers")
+    if matchers is None:
+        matchers = compile_matchers(config)
+        config["_matchers"] = matchers
+    return matchers
+
+
 def _is_log_group_in_scope(name, config):
     """True if log group passes include prefixes and does not match exclude patterns."""
-    prefixes = config["log_group_include_prefixes"]
-    if not any(name.startswith(p) for p in prefixes):
-        return False
-    exclude = config["log_group_exclude_patterns"]
-    return not any(pat.lower() in name.lower() for pat in exclude)
+    return in_scope(name, _matchers(config))
 
 
 def _get_target_retention_days(log_group_name, config):
     """Return target retention days for this log group (exception, high-risk, or default)."""
-    exceptions = config["log_group_exceptions"]
-    if log_group_name in exceptions:
-        return int(exceptions[log_group_name])
-    patterns = config["high_risk_patterns"]
-    if any(pat.lower() in log_group_name.lower() for pat in patterns):
-        return config["high_risk_retention_days"]
-    return config["default_retention_days"]
+    return target_retention_days(log_group_name, _matchers(config))
 
 
 def _put_retention_with_backoff(logs_client, log_group_name, retention_days):
-    """Call PutRetentionPolicy with simple backoff on throttle. Raises on other errors."""
-    for attempt in range(5):
-        try:
-            logs_client.put_retention_policy(
-                logGroupName=log_group_name, retentionInDays=retention_days
-            )
-            return True
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "ThrottlingException":
-                time.sleep(2**attempt)
-                continue
-            raise
-    return False
+    """Call PutRetentionPolicy through the shared logs limiter. Returns True on success and
+    never False: a throttle that outlasts the limiter's retries, or any other error,
+    raises ClientError, so callers must catch it rather than test the result."""
+    limited_call(
+        logs_client,
+        "logs",
+        "put_retention_policy",
+        logGroupName=log_group_name,
+        retentionInDays=retention_days,
+    )
+    return True
+
+
+def _check_log_group(logs_client, lg, region, config, mode, result):
+    """
+    Evaluate one listed log group against its target retention. Mutates result.
+    The listing already carries the retention, so the check is local; compliant groups
+    are only recorded in the snapshot for its new/changed/removed drift report.
+    """
+    name = lg.get("logGroupName", "")
+    current = lg.get("retentionInDays")
+    key = f"logs:{region}:{name}"
+    target = scoped_target_days(name, _matchers(config))
+    if target is None:
+        return
+    result["in_scope"] += 1
+    if current is not None and current == target:
+        state_snapshot.record(key, str(current))
+        return
+    result["drifted"] += 1
+    finding = {"log_group": name, "current": current, "target": target, "region": region}
+    result["findings"].append(finding)
+    logger.info("DRIFT log_group=%s region=%s current=%s target=%s", name, region, current, target)
+    if mode != "APPLY":
+        return
+    try:
+        _put_retention_with_backoff(logs_client, name, target)
+        result["fixed"] += 1
+        finding["action"] = "fixed"
+        state_snapshot.record(key, str(target))
+        logger.info("FIXED log_group=%s region=%s retention=%s", name, region, target)
+    except ClientError as e:
+        result["failed"] += 1
+        finding["action"] = "failed"
+        finding["error"] = str(e)
+        logger.exception("ERROR setting retention for %s: %s", name, e)
 
 
 def _scan_log_groups_region(logs_client, region, config, mode):
@@ -211,46 +291,19 @@ def _scan_log_groups_region(logs_client, region, config, mode):
     Scan one region for log group retention drift. Returns dict with keys:
     scanned, in_scope, drifted, fixed, failed, findings (list of dicts).
     """
-    result = {"scanned": 0, "in_scope": 0, "drifted": 0, "fixed": 0, "failed": 0, "findings": []}
+    result = {
+        "scanned": 0,
+        "in_scope": 0,
+        "drifted": 0,
+        "fixed": 0,
+        "failed": 0,
+        "findings": [],
+    }
     paginator = logs_client.get_paginator("describe_log_groups")
     for page in paginator.paginate():
         for lg in page.get("logGroups", []):
             result["scanned"] += 1
-            name = lg.get("logGroupName", "")
-            if not _is_log_group_in_scope(name, config):
-                continue
-            result["in_scope"] += 1
-            current = lg.get("retentionInDays")
-            target = _get_target_retention_days(name, config)
-            if current is None or current != target:
-                result["drifted"] += 1
-                finding = {
-                    "log_group": name,
-                    "current": current,
-                    "target": target,
-                    "region": region,
-                }
-                result["findings"].append(finding)
-                logger.info(
-                    "DRIFT log_group=%s region=%s current=%s target=%s",
-                    name,
-                    region,
-                    current,
-                    target,
-                )
-                if mode == "APPLY":
-                    try:
-                        _put_retention_with_backoff(logs_client, name, target)
-                        result["fixed"] += 1
-                        finding["action"] = "fixed"
-                        logger.info(
-                            "FIXED log_group=%s region=%s retention=%s", name, region, target
-                        )
-                    except ClientError as e:
-                        result["failed"] += 1
-                        finding["action"] = "failed"
-                        finding["error"] = str(e)
-                        logger.exception("ERROR setting retention for %s: %s", name, e)
+            _check_log_group(logs_client, lg, region, config, mode, result)
     return result
 
 
@@ -266,7 +319,7 @@ def _run_logs_retention(config, mode, regions):
     }
     for region in regions:
         try:
-            logs_client = boto3.client("logs", region_name=region, config=_RETRY_CONFIG)
+            logs_client = boto3.client("logs", region_name=region, config=_LIMITED_RETRY_CONFIG)
             one = _scan_log_groups_region(logs_client, region, config, mode)
             aggregated["scanned"] += one["scanned"]
             aggregated["in_scope"] += one["in_scope"]
@@ -343,141 +396,6 @@ def _run_cloudtrail_audit(cloudtrail_client, config):
     return findings
 
 
-_PAB_CONFIG = {
-    "BlockPublicAcls": True,
-    "BlockPublicPolicy": True,
-    "IgnorePublicAcls": True,
-    "RestrictPublicBuckets": True,
-}
-
-
-def _s3_check_block_public_access(s3_client, bucket_name, config, mode):
-    """Check/apply Block Public Access. Returns (findings, actions)."""
-    findings = []
-    actions = []
-    try:
-        pab = s3_client.get_public_access_block(Bucket=bucket_name)
-        block = pab.get("PublicAccessBlockConfiguration", {})
-        if not all(block.get(k, False) for k in _PAB_CONFIG):
-            findings.append({"bucket": bucket_name, "issue": "block_public_access_not_full"})
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "NoSuchPublicAccessBlockConfiguration":
-            findings.append({"bucket": bucket_name, "issue": "block_public_access_not_set"})
-        else:
-            findings.append({"bucket": bucket_name, "error": str(e)})
-            return findings, actions
-    if findings and mode == "APPLY" and config["require_block_public_access"]:
-        s3_client.put_public_access_block(
-            Bucket=bucket_name, PublicAccessBlockConfiguration=_PAB_CONFIG
-        )
-        actions.append({"bucket": bucket_name, "action": "put_public_access_block"})
-    return findings, actions
-
-
-def _s3_check_versioning(s3_client, bucket_name, config, mode):
-    """Check/apply versioning. Returns (findings, actions)."""
-    findings = []
-    actions = []
-    ver = s3_client.get_bucket_versioning(Bucket=bucket_name)
-    if ver.get("Status") != "Enabled" and config["require_bucket_versioning"]:
-        findings.append({"bucket": bucket_name, "issue": "versioning_disabled"})
-        if mode == "APPLY":
-            s3_client.put_bucket_versioning(
-                Bucket=bucket_name, VersioningConfiguration={"Status": "Enabled"}
-            )
-            actions.append({"bucket": bucket_name, "action": "put_bucket_versioning"})
-    return findings, actions
-
-
-def _s3_check_encryption(s3_client, bucket_name, config, mode):
-    """Check/apply bucket encryption. Returns (findings, actions)."""
-    findings = []
-    actions = []
-    enc_set = False
-    try:
-        enc = s3_client.get_bucket_encryption(Bucket=bucket_name)
-        enc_set = bool(enc.get("ServerSideEncryptionConfiguration", {}).get("Rules"))
-    except ClientError as e:
-        if e.response["Error"]["Code"] != "ServerSideEncryptionConfigurationNotFoundError":
-            findings.append({"bucket": bucket_name, "error": str(e)})
-    if not enc_set and config["require_bucket_encryption"]:
-        findings.append({"bucket": bucket_name, "issue": "encryption_not_set"})
-        if mode == "APPLY":
-            try:
-                s3_client.put_bucket_encryption(
-                    Bucket=bucket_name,
-                    ServerSideEncryptionConfiguration={
-                        "Rules": [
-                            {"ApplyServerSideEncryptionByDefault": {"SSEAlgorithm": "AES256"}}
-                        ]
-                    },
-                )
-                actions.append({"bucket": bucket_name, "action": "put_bucket_encryption"})
-            except ClientError as err:
-                findings.append({"bucket": bucket_name, "error": str(err)})
-    return findings, actions
-
-
-def _s3_check_lifecycle(s3_client, bucket_name, config, mode):
-    """Check/apply lifecycle. Returns (findings, actions)."""
-    findings = []
-    actions = []
-    try:
-        lc = s3_client.get_bucket_lifecycle_configuration(Bucket=bucket_name)
-        rules = lc.get("Rules", [])
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "NoSuchLifecycleConfiguration":
-            rules = []
-        else:
-            findings.append({"bucket": bucket_name, "error": str(e)})
-            return findings, actions
-    if config["require_bucket_lifecycle"] and not rules:
-        findings.append({"bucket": bucket_name, "issue": "lifecycle_not_set"})
-        if mode == "APPLY":
-            s3_client.put_bucket_lifecycle_configuration(
-                Bucket=bucket_name,
-                LifecycleConfiguration={
-                    "Rules": [
-                        {
-                            "ID": "CloudTrailRetention",
-                            "Status": "Enabled",
-                            "Filter": {"Prefix": config["cloudtrail_s3_prefix"] or ""},
-                            "Expiration": {"Days": config["cloudtrail_retention_years"] * 365},
-                        }
-                    ]
-                },
-            )
-            actions.append({"bucket": bucket_name, "action": "put_bucket_lifecycle"})
-    return findings, actions
-
-
-def _run_s3_bucket_audit(s3_client, bucket_name, config, mode):
-    """
-    Audit (and optionally apply) S3 bucket: Block Public Access, encryption, versioning, lifecycle.
-    Returns list of findings and list of actions_taken.
-    """
-    if not bucket_name:
-        return [], []
-    findings = []
-    actions_taken = []
-    try:
-        f1, a1 = _s3_check_block_public_access(s3_client, bucket_name, config, mode)
-        findings.extend(f1)
-        actions_taken.extend(a1)
-        f2, a2 = _s3_check_versioning(s3_client, bucket_name, config, mode)
-        findings.extend(f2)
-        actions_taken.extend(a2)
-        f3, a3 = _s3_check_encryption(s3_client, bucket_name, config, mode)
-        findings.extend(f3)
-        actions_taken.extend(a3)
-        f4, a4 = _s3_check_lifecycle(s3_client, bucket_name, config, mode)
-        findings.extend(f4)
-        actions_taken.extend(a4)
-    except ClientError as e:
-        findings.append({"bucket": bucket_name, "error": str(e)})
-    return findings, actions_taken
-
-
 def _collect_critical_lambdas(lambda_client, config):
     """Return list of Lambda function names matching prefixes or explicit list."""
     explicit = config.get("critical_lambdas") or []
@@ -497,30 +415,52 @@ def _collect_critical_lambdas(lambda_client, config):
     return list(set(names))
 
 
-def _ensure_alarm(cw_client, spec: dict, mode: str) -> bool:
-    """Create or update one CloudWatch alarm. Returns True if created/updated, else False.
-    spec: alarm_name, namespace, metric_name, dimensions, topic_arn."""
-    if mode != "APPLY":
-        return False
-    params = {
-        "AlarmName": spec["alarm_name"],
-        "MetricName": spec["metric_name"],
-        "Namespace": spec["namespace"],
-        "Dimensions": spec["dimensions"],
-        "Period": 300,
-        "EvaluationPeriods": 1,
-        "Threshold": 0,
-        "ComparisonOperator": "GreaterThanThreshold",
-        "Statistic": "Sum",
-        "TreatMissingData": "notBreaching",
-    }
-    if spec.get("topic_arn"):
-        params["AlarmActions"] = [spec["topic_arn"]]
+def _alarm_key(cw_client, alarm_name):
+    """State snapshot key for an alarm in the client's region."""
+    region = getattr(cw_client.meta, "region_name", None) or "global"
+    return f"alarm:{region}:{alarm_name}"
+
+
+def _put_alarm(cw_client, params, live):
+    """Put a metric or composite alarm unless the live alarm (from describe_alarms, or
+    None) already has every desired param, so out-of-band edits are repaired.
+    Returns 'created', 'unchanged' or 'failed'."""
+    key = _alarm_key(cw_client, params["AlarmName"])
+    fingerprint = state_snapshot.config_hash(params)
+    if alarm_in_sync(live, params):
+        if not state_snapshot.is_unchanged(key, fingerprint):
+            state_snapshot.record(key, fingerprint)
+        return "unchanged"
+    method = "put_composite_alarm" if "AlarmRule" in params else "put_metric_alarm"
     try:
-        cw_client.put_metric_alarm(**params)
-        return True
-    except ClientError:
-        return False
+        limited_call(cw_client, "cloudwatch", method, **params)
+    except ClientError as e:
+        logger.warning("alarm put failed name=%s: %s", params["AlarmName"], e)
+        return "failed"
+    state_snapshot.record(key, fingerprint)
+    return "created"
+
+
+def _tally_alarm(out, status, action):
+    """Count one alarm outcome into out (None = AUDIT mode, nothing to count)."""
+    if status is not None:
+        out["kept"].add(action["alarm"])
+    if status == "created":
+        out["created"] += 1
+        out["actions"].append(action)
+    elif status == "unchanged":
+        out["unchanged"] = out.get("unchanged", 0) + 1
+    elif status == "failed":
+        out["failed"] += 1
+
+
+def _ensure_alarm(cw_client, spec: dict, mode: str, existing: dict):
+    """Create or update one CloudWatch alarm. Returns _put_alarm status, or None in AUDIT.
+    spec: alarm_name, namespace, metric_name, dimensions, topic_arn.
+    existing: {AlarmName: alarm} of the live Janitor alarms."""
+    if mode != "APPLY":
+        return None
+    return _put_alarm(cw_client, metric_alarm_params(spec), existing.get(spec["alarm_name"]))
 
 
 def _run_lambda_alarms(cw, lam, config, mode, out):
@@ -532,7 +472,7 @@ def _run_lambda_alarms(cw, lam, config, mode, out):
         for metric, suffix in [("Errors", "Errors"), ("Throttles", "Throttles")]:
             out["scanned"] += 1
             aname = f"Janitor-{fname}-{suffix}"
-            if _ensure_alarm(
+            status = _ensure_alarm(
                 cw,
                 {
                     "alarm_name": aname,
@@ -542,11 +482,9 @@ def _run_lambda_alarms(cw, lam, config, mode, out):
                     "topic_arn": topic,
                 },
                 mode,
-            ):
-                out["created"] += 1
-                out["actions"].append({"alarm": aname, "type": "lambda", "metric": metric})
-            elif mode == "APPLY":
-                out["failed"] += 1
+                out["existing"],
+            )
+            _tally_alarm(out, status, {"alarm": aname, "type": "lambda", "metric": metric})
 
 
 def _ensure_ddb_alarm(cw, spec: dict, mode: str, out: dict) -> None:
@@ -557,7 +495,7 @@ def _ensure_ddb_alarm(cw, spec: dict, mode: str, out: dict) -> None:
     out["scanned"] += 1
     dims = [{"Name": "TableName", "Value": tname}]
     aname = f"Janitor-DDB-{tname}-{metric}"
-    if _ensure_alarm(
+    status = _ensure_alarm(
         cw,
         {
             "alarm_name": aname,
@@ -567,11 +505,9 @@ def _ensure_ddb_alarm(cw, spec: dict, mode: str, out: dict) -> None:
             "topic_arn": topic,
         },
         mode,
-    ):
-        out["created"] += 1
-        out["actions"].append({"alarm": aname, "type": "dynamodb", "metric": metric})
-    elif mode == "APPLY":
-        out["failed"] += 1
+        out["existing"],
+    )
+    _tally_alarm(out, status, {"alarm": aname, "type": "dynamodb", "metric": metric})
 
 
 def _resolve_ddb_tables(ddb, config):
@@ -611,7 +547,7 @@ def _ensure_sns_alarm(cw, tarn, topic, mode, out):
     name = tarn.split(":")[-1] if ":" in tarn else tarn
     dims = [{"Name": "TopicName", "Value": name}]
     aname = f"Janitor-SNS-{name}-NotificationsFailed"
-    if _ensure_alarm(
+    status = _ensure_alarm(
         cw,
         {
             "alarm_name": aname,
@@ -621,11 +557,9 @@ def _ensure_sns_alarm(cw, tarn, topic, mode, out):
             "topic_arn": topic,
         },
         mode,
-    ):
-        out["created"] += 1
-        out["actions"].append({"alarm": aname, "type": "sns"})
-    elif mode == "APPLY":
-        out["failed"] += 1
+        out["existing"],
+    )
+    _tally_alarm(out, status, {"alarm": aname, "type": "sns"})
 
 
 def _sns_topic_matches_prefixes(name, arn, prefixes):
@@ -661,41 +595,197 @@ def _run_sns_alarms(cw, sns_client, config, mode, out):
         _ensure_sns_alarm(cw, tarn, topic, mode, out)
 
 
+def _put_insights_alarm(cw, params, mode, out):
+    """Put one Metrics Insights or composite alarm. Mutates out."""
+    out["scanned"] += 1
+    if mode != "APPLY":
+        return
+    status = _put_alarm(cw, params, out["existing"].get(params["AlarmName"]))
+    _tally_alarm(out, status, {"alarm": params["AlarmName"], "type": "aggregate"})
+
+
+def _aggregate_classes(config):
+    """{resource class: prefixes} for the classes managed by prefix (aggregate alarms)."""
+    prefixes = {
+        "lambda": config.get("critical_lambda_prefixes"),
+        "dynamodb": config.get("ddb_table_prefixes"),
+        "sns": config.get("sns_topic_prefixes"),
+    }
+    return {resource_class: values for resource_class, values in prefixes.items() if values}
+
+
+def _list_class_resources(client, resource_class):
+    """[(name, arn or name)] of every resource of one class in the region.
+    Listing errors propagate, so a partial listing never narrows (or deletes) alarms."""
+    if resource_class == "lambda":
+        pages = client.get_paginator("list_functions").paginate()
+        return [
+            (fn.get("FunctionName", ""), fn.get("FunctionArn", ""))
+            for page in pages
+            for fn in page.get("Functions", [])
+        ]
+    if resource_class == "dynamodb":
+        pages = client.get_paginator("list_tables").paginate()
+        return [(t, t) for page in pages for t in page.get("TableNames", [])]
+    pages = client.get_paginator("list_topics").paginate()
+    return [
+        (t.get("TopicArn", "").split(":")[-1], t.get("TopicArn", ""))
+        for page in pages
+        for t in page.get("Topics", [])
+    ]
+
+
+def _aggregate_alarm_specs(clients, config):
+    """Aggregate alarm kwargs for every prefix-managed class: one set per prefix, over
+    the resources whose name (or ARN) starts with it."""
+    specs = []
+    for resource_class, prefixes in _aggregate_classes(config).items():
+        listed = _list_class_resources(clients[resource_class], resource_class)
+        for prefix in prefixes:
+            names = [
+                name for name, arn in listed if name.startswith(prefix) or arn.startswith(prefix)
+            ]
+            specs.extend(build_aggregate_alarm_specs(resource_class, prefix, names))
+    return specs
+
+
+def _run_aggregate_alarms(cw, clients, config, mode, out):
+    """
+    ALARM_STRATEGY=aggregate: one Metrics Insights alarm per class, prefix and metric for
+    the prefix-managed classes, per-resource alarms only for explicitly listed resources,
+    optional composite.
+    """
+    aggregate_specs = _aggregate_alarm_specs(clients, config)
+    topic = config.get("alarm_sns_topic_arn")
+    explicit = {
+        **config,
+        "critical_lambda_prefixes": [],
+        "ddb_table_prefixes": [],
+        "sns_topic_prefixes": [],
+    }
+    if config.get("critical_lambdas"):
+        _run_lambda_alarms(cw, clients["lambda"], explicit, mode, out)
+    if config.get("ddb_tables"):
+        _run_ddb_alarms(cw, clients["dynamodb"], explicit, mode, out)
+    if config.get("sns_topics"):
+        _run_sns_alarms(cw, clients["sns"], explicit, mode, out)
+    composite = config.get("alarm_composite", False)
+    child_names = []
+    for params in aggregate_specs:
+        if topic and not composite:
+            params["AlarmActions"] = [topic]
+        _put_insights_alarm(cw, params, mode, out)
+        child_names.append(params["AlarmName"])
+    if composite and child_names:
+        params = {"AlarmName": COMPOSITE_ALARM_NAME, "AlarmRule": composite_alarm_rule(child_names)}
+        if topic:
+            params["AlarmActions"] = [topic]
+        _put_insights_alarm(cw, params, mode, out)
+
+
+def _janitor_alarms(cw):
+    """{AlarmName: alarm} for every Janitor-* metric and composite alarm in the region."""
+    found = {}
+    paginator = cw.get_paginator("describe_alarms")
+    for page in paginator.paginate(
+        AlarmNamePrefix="Janitor-", AlarmTypes=["MetricAlarm", "CompositeAlarm"]
+    ):
+        for alarm in page.get("MetricAlarms", []) + page.get("CompositeAlarms", []):
+            found[alarm.get("AlarmName", "")] = alarm
+    return found
+
+
+def _stale_strategy_alarms(existing, config, kept):
+    """
+    Alarms left behind by the other ALARM_STRATEGY. Aggregate runs own every Janitor-*
+    alarm except tripwires, so anything they did not put is stale; per-resource runs
+    only remove the aggregate and composite alarms (a failed resource listing must not
+    delete per-resource alarms).
+    """
+    if config.get("alarm_strategy") == "aggregate":
+        return sorted(
+            n for n in existing if n not in kept and not n.startswith(TRIPWIRE_ALARM_PREFIX)
+        )
+    return sorted(
+        n for n in existing if n.startswith(AGGREGATE_ALARM_PREFIX) or n == COMPOSITE_ALARM_NAME
+    )
+
+
+def _delete_stale_alarms(cw, config, out):
+    """Delete alarms left by a strategy switch, 100 per DeleteAlarms call. Mutates out."""
+    stale = _stale_strategy_alarms(out["existing"], config, out["kept"])
+    for i in range(0, len(stale), 100):
+        chunk = stale[i : i + 100]
+        try:
+            limited_call(cw, "cloudwatch", "delete_alarms", AlarmNames=chunk)
+        except ClientError as e:
+            logger.warning("delete_alarms failed count=%d: %s", len(chunk), e)
+            continue
+        out["deleted"] += len(chunk)
+        out["actions"].extend({"alarm": n, "type": "deleted"} for n in chunk)
+
+
 def _run_alarms_region(region, config, mode):
     """Run alarm creation for Lambda, DynamoDB, SNS in one region."""
-    out = {"scanned": 0, "created": 0, "failed": 0, "actions": []}
-    cw = boto3.client("cloudwatch", region_name=region, config=_RETRY_CONFIG)
+    out = {
+        "scanned": 0,
+        "created": 0,
+        "unchanged": 0,
+        "failed": 0,
+        "deleted": 0,
+        "actions": [],
+        "kept": set(),
+    }
+    cw = boto3.client("cloudwatch", region_name=region, config=_LIMITED_RETRY_CONFIG)
+    out["existing"] = _janitor_alarms(cw)
     lam = boto3.client("lambda", region_name=region, config=_RETRY_CONFIG)
     ddb = boto3.client("dynamodb", region_name=region, config=_RETRY_CONFIG)
     sns = boto3.client("sns", region_name=region, config=_RETRY_CONFIG)
-    _run_lambda_alarms(cw, lam, config, mode, out)
-    _run_ddb_alarms(cw, ddb, config, mode, out)
-    _run_sns_alarms(cw, sns, config, mode, out)
+    if config.get("alarm_strategy") == "aggregate":
+        clients = {"lambda": lam, "dynamodb": ddb, "sns": sns}
+        _run_aggregate_alarms(cw, clients, config, mode, out)
+    else:
+        _run_lambda_alarms(cw, lam, config, mode, out)
+        _run_ddb_alarms(cw, ddb, config, mode, out)
+        _run_sns_alarms(cw, sns, config, mode, out)
+    if mode == "APPLY":
+        _delete_stale_alarms(cw, config, out)
     return out
 
 
 def _run_alarms(regions, config, mode, result):
     """Run alarm creation across regions. Populate result['findings']['alarms']."""
-    aggregated = {"scanned": 0, "created": 0, "failed": 0, "actions": []}
+    aggregated = {
+        "scanned": 0,
+        "created": 0,
+        "unchanged": 0,
+        "failed": 0,
+        "deleted": 0,
+        "actions": [],
+    }
     for region in regions:
         try:
             one = _run_alarms_region(region, config, mode)
             aggregated["scanned"] += one["scanned"]
             aggregated["created"] += one["created"]
+            aggregated["unchanged"] += one["unchanged"]
             aggregated["failed"] += one["failed"]
+            aggregated["deleted"] += one["deleted"]
             aggregated["actions"].extend(one["actions"])
         except ClientError as e:
             logger.error("alarms stage error region=%s: %s", region, e)
             result["errors"].append({"stage": "alarms", "region": region, "error": str(e)})
+    aggregated["strategy"] = config.get("alarm_strategy", "per_resource")
     result["findings"]["alarms"] = aggregated
     for a in aggregated["actions"]:
         logger.info("FIXED alarm=%s type=%s", a.get("alarm"), a.get("type"))
     if aggregated["scanned"] > 0:
         logger.info(
-            "alarms scanned=%d created=%d failed=%d",
+            "alarms scanned=%d created=%d failed=%d deleted=%d",
             aggregated["scanned"],
             aggregated["created"],
             aggregated["failed"],
+            aggregated["deleted"],
         )
 
 
@@ -802,28 +892,33 @@ def _build_sns_message(result, config):
     return "\n".join(_build_sns_parts(result, config))
 
 
-_TRIPWIRE_DEFS = [
-    {"name": "RootLogin", "pattern": '{ $.userIdentity.type = "Root" }'},
-    {
-        "name": "StopLoggingOrDeleteTrail",
-        "pattern": '{ ($.eventName = "StopLogging") || ($.eventName = "DeleteTrail") }',
-    },
-    {
-        "name": "IAMPolicyChange",
-        "pattern": '{ ($.eventName = "AttachRolePolicy") || ($.eventName = "DetachRolePolicy") || ($.eventName = "PutRolePolicy") || ($.eventName = "DeleteRolePolicy") }',
-    },
-    {
-        "name": "IoTPolicyChange",
-        "pattern": '{ ($.eventName = "CreatePolicy") || ($.eventName = "DeletePolicy") || ($.eventName = "AttachPolicy") || ($.eventName = "DetachPolicy") }',
-    },
-    {"name": "DeleteLogGroup", "pattern": '{ $.eventName = "DeleteLogGroup" }'},
-]
+_TRIPWIRE_MAX_WORKERS = 4
+
+
+def _cloudtrail_tripwire_targets(config, primary_region):
+    """
+    Parse CLOUDTRAIL_LOG_GROUP_NAME (comma list; 'region:logGroup' or bare 'logGroup' for
+    the primary region) into {region: [log group names]}.
+    """
+    raw = config.get("cloudtrail_log_group_name") or ""
+    targets: dict = {}
+    for entry in (e.strip() for e in raw.split(",")):
+        if not entry:
+            continue
+        region, _, name = entry.rpartition(":") if ":" in entry else ("", "", entry)
+        names = targets.setdefault(region.strip() or primary_region, [])
+        if name.strip() and name.strip() not in names:
+            names.append(name.strip())
+    return {r: names for r, names in targets.items() if names}
 
 
 def _run_cloudtrail_tripwires(region, config, mode, result):
-    """Create CloudTrail metric filters + alarms. Skip if CLOUDTRAIL_LOG_GROUP_NAME unset."""
-    log_group = config.get("cloudtrail_log_group_name")
-    if not log_group:
+    """
+    Reconcile CloudTrail metric filters + alarms: read existing ones in bulk and write only
+    what differs. Regions run in parallel. Skip if CLOUDTRAIL_LOG_GROUP_NAME unset.
+    """
+    targets = _cloudtrail_tripwire_targets(config, region)
+    if not targets:
         result["findings"]["cloudtrail_tripwires"] = {
             "skipped": True,
             "reason": "CLOUDTRAIL_LOG_GROUP_NAME not set",
@@ -832,54 +927,41 @@ def _run_cloudtrail_tripwires(region, config, mode, result):
         return
     namespace = config.get("cloudtrail_metric_namespace", "Security/CloudTrail")
     topic = config.get("alarm_sns_topic_arn") or config.get("sns_topic_arn")
-    cw = boto3.client("cloudwatch", region_name=region, config=_RETRY_CONFIG)
-    logs = boto3.client("logs", region_name=region, config=_RETRY_CONFIG)
-    out = {"scanned": 0, "created": 0, "failed": 0, "actions": []}
-    for tw in _TRIPWIRE_DEFS:
-        mname = f"CloudTrail-{tw['name']}"
-        out["scanned"] += 1
-        if mode == "APPLY":
-            try:
-                logs.put_metric_filter(
-                    logGroupName=log_group,
-                    filterName=mname,
-                    filterPattern=tw["pattern"],
-                    metricTransformations=[
-                        {
-                            "metricName": tw["name"],
-                            "metricNamespace": namespace,
-                            "metricValue": 1,
-                        }
-                    ],
-                )
-                dims = []
-                aname = f"Janitor-{mname}"
-                if _ensure_alarm(
-                    cw,
-                    {
-                        "alarm_name": aname,
-                        "namespace": namespace,
-                        "metric_name": tw["name"],
-                        "dimensions": dims,
-                        "topic_arn": topic,
-                    },
-                    mode,
-                ):
-                    out["created"] += 1
-                    out["actions"].append({"filter": mname, "alarm": aname})
-            except ClientError as e:
-                logger.error("cloudtrail_tripwires error filter=%s: %s", mname, e)
-                out["failed"] += 1
-                result["errors"].append(
-                    {"stage": "cloudtrail_tripwires", "filter": mname, "error": str(e)}
-                )
+    # Clients are created up front: boto3's default session is not thread-safe.
+    jobs = [
+        (
+            {
+                "logs": boto3.client("logs", region_name=r, config=_LIMITED_RETRY_CONFIG),
+                "cloudwatch": boto3.client(
+                    "cloudwatch", region_name=r, config=_LIMITED_RETRY_CONFIG
+                ),
+            },
+            groups,
+            {"region": r, "namespace": namespace, "topic": topic},
+        )
+        for r, groups in targets.items()
+    ]
+    out = {**dict.fromkeys(TRIPWIRE_COUNTERS, 0), "actions": []}
+    with ThreadPoolExecutor(max_workers=min(len(jobs), _TRIPWIRE_MAX_WORKERS)) as pool:
+        futures = [pool.submit(reconcile_region, *job, mode) for job in jobs]
+        for future in futures:
+            one = future.result()
+            for k in TRIPWIRE_COUNTERS:
+                out[k] += one["out"][k]
+            out["actions"].extend(one["out"]["actions"])
+            result["errors"].extend(one["errors"])
     result["findings"]["cloudtrail_tripwires"] = out
     for a in out.get("actions", []):
         logger.info("FIXED tripwire filter=%s alarm=%s", a.get("filter"), a.get("alarm"))
     if out["scanned"] > 0:
         logger.info(
-            "cloudtrail_tripwires scanned=%d created=%d failed=%d",
+            "cloudtrail_tripwires scanned=%d filters=%d alarms=%d unchanged=%d drifted=%d "
+            "created=%d failed=%d",
             out["scanned"],
+            out["filters_scanned"],
+            out["alarms_scanned"],
+            out["unchanged"],
+            out["drifted"],
             out["created"],
             out["failed"],
         )
@@ -929,22 +1011,54 @@ def _filter_valid_dashboard_names(names):
     return [n for n in names if (n and isinstance(n, str) and n.strip())]
 
 
-def _run_dashboard(region, config, mode, result):
-    """Create or update Ops dashboard."""
+def _build_per_resource_widgets(region, config):
+    """Legacy per-resource widgets: one per Lambda (max 12) and per table (max 6)."""
     lam = boto3.client("lambda", region_name=region, config=_RETRY_CONFIG)
     ddb = boto3.client("dynamodb", region_name=region, config=_RETRY_CONFIG)
     sns = boto3.client("sns", region_name=region, config=_RETRY_CONFIG)
     lambdas_list = _filter_valid_dashboard_names(_collect_critical_lambdas(lam, config))[:12]
     tables = _filter_valid_dashboard_names(_collect_tables_for_dashboard(ddb, config))[:6]
     topic_names = _collect_sns_names_for_dashboard(sns, config)
-    widgets = build_dashboard_widgets(config, region, lambdas_list, tables, topic_names)
+    return build_dashboard_widgets(config, region, lambdas_list, tables, topic_names)
+
+
+def _existing_dashboard_hash(cw, dashboard_name):
+    """Return body hash of the deployed dashboard, or None if missing/unreadable."""
+    try:
+        resp = cw.get_dashboard(DashboardName=dashboard_name)
+        return dashboard_body_hash(resp.get("DashboardBody"))
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ResourceNotFound":
+            logger.warning("get_dashboard failed for %s: %s", dashboard_name, e)
+    except (TypeError, ValueError):
+        logger.warning("dashboard %s has unparseable body; rewriting", dashboard_name)
+    return None
+
+
+def _run_dashboard(region, config, mode, result):
+    """Create or update Ops dashboard; skip PutDashboard when the body hash is unchanged."""
+    if config.get("dashboard_strategy") == "insights":
+        widgets = build_insights_dashboard_widgets(config, region)
+    else:
+        widgets = _build_per_resource_widgets(region, config)
     dashboard_name = _sanitize_dashboard_name(config.get("dashboard_name", "MotherHen-Ops"))
-    out = {"created": False, "error": None}
+    body = {"widgets": widgets}
+    body_hash = dashboard_body_hash(body)
+    out = {"created": False, "unchanged": False, "widgets": len(widgets), "error": None}
     if mode == "APPLY":
         try:
-            cw = boto3.client("cloudwatch", region_name=region, config=_RETRY_CONFIG)
-            cw.put_dashboard(
-                DashboardName=dashboard_name, DashboardBody=json.dumps({"widgets": widgets})
+            cw = boto3.client("cloudwatch", region_name=region, config=_LIMITED_RETRY_CONFIG)
+            if _existing_dashboard_hash(cw, dashboard_name) == body_hash:
+                out["unchanged"] = True
+                logger.info("OK dashboard=%s unchanged hash=%s", dashboard_name, body_hash[:12])
+                result["findings"]["dashboard"] = out
+                return
+            limited_call(
+                cw,
+                "cloudwatch",
+                "put_dashboard",
+                DashboardName=dashboard_name,
+                DashboardBody=json.dumps(body),
             )
             out["created"] = True
             logger.info("FIXED dashboard=%s", dashboard_name)
@@ -958,6 +1072,45 @@ def _run_dashboard(region, config, mode, result):
     result["findings"]["dashboard"] = out
 
 
+def _s3_posture_targets(ct_client, s3_client, config):
+    """Return [(bucket, is trail bucket)]: the CloudTrail bucket plus prefix-matched buckets."""
+    trail_bucket = _resolve_cloudtrail_bucket(ct_client, config)
+    if not trail_bucket:
+        logger.info("SKIPPED s3_bucket=no CloudTrail bucket found")
+    targets = [(trail_bucket, True)] if trail_bucket else []
+    prefixes = config.get("s3_posture_bucket_prefixes") or []
+    for name in s3_posture.list_prefixed_buckets(s3_client, prefixes):
+        if name != trail_bucket:
+            targets.append((name, False))
+    return targets
+
+
+def _run_s3_posture(ct_client, config, mode, result):
+    """Audit every posture bucket with one S3 client per bucket region; log findings/actions."""
+    s3_client = boto3.client("s3", config=_LIMITED_RETRY_CONFIG)
+    targets = _s3_posture_targets(ct_client, s3_client, config)
+    workers = config.get("s3_posture_max_workers") or 1
+    regions = s3_posture.bucket_regions(s3_client, [name for name, _ in targets], workers)
+    # Regional clients are built here, not in worker threads (boto3 sessions aren't thread-safe).
+    clients = {
+        r: boto3.client("s3", region_name=r, config=_LIMITED_RETRY_CONFIG)
+        for r in set(regions.values())
+        if r
+    }
+    jobs = [(name, clients.get(regions.get(name), s3_client), trail) for name, trail in targets]
+    s3_findings, s3_actions = s3_posture.audit_buckets(jobs, config, mode, workers)
+    result["findings"]["s3_bucket"] = s3_findings
+    result["actions_taken"].extend(s3_actions)
+    for f in s3_findings:
+        if "error" in f:
+            logger.error("DRIFT bucket=%s error=%s", f.get("bucket", "?"), f.get("error"))
+        else:
+            logger.info("DRIFT bucket=%s issue=%s", f.get("bucket", "?"), f.get("issue", f))
+    for a in s3_actions:
+        logger.info("FIXED bucket=%s action=%s", a.get("bucket", "?"), a.get("action", "?"))
+    logger.info("s3_posture buckets=%d regions=%d", len(targets), len(clients))
+
+
 def _run_cloudtrail_s3_with_logging(regions, config, mode, result):
     """Run CloudTrail and S3 audits, populate result, log all findings and actions."""
     primary_region = regions[0] if regions else "us-east-2"
@@ -972,20 +1125,7 @@ def _run_cloudtrail_s3_with_logging(regions, config, mode, result):
             else:
                 logger.info("DRIFT category=cloudtrail %s", f)
 
-        bucket_name = _resolve_cloudtrail_bucket(ct_client, config)
-        if not bucket_name:
-            logger.info("SKIPPED s3_bucket=no CloudTrail bucket found")
-        s3_client = boto3.client("s3", config=_RETRY_CONFIG)
-        s3_findings, s3_actions = _run_s3_bucket_audit(s3_client, bucket_name, config, mode)
-        result["findings"]["s3_bucket"] = s3_findings
-        result["actions_taken"].extend(s3_actions)
-        for f in s3_findings:
-            if "error" in f:
-                logger.error("DRIFT bucket=%s error=%s", f.get("bucket", "?"), f.get("error"))
-            else:
-                logger.info("DRIFT bucket=%s issue=%s", f.get("bucket", "?"), f.get("issue", f))
-        for a in s3_actions:
-            logger.info("FIXED bucket=%s action=%s", a.get("bucket", "?"), a.get("action", "?"))
+        _run_s3_posture(ct_client, config, mode, result)
     except ClientError as e:
         result["errors"].append({"stage": "cloudtrail_s3", "error": str(e)})
         logger.exception("CloudTrail/S3 error: %s", e)
@@ -1006,12 +1146,66 @@ def _publish_sns_summary(config, result):
         logger.exception("Failed to publish SNS: %s", e)
 
 
+def _retention_rules_hash(config):
+    """Fingerprint of the config that decides log group scope and target retention."""
+    keys = (
+        "log_group_include_prefixes",
+        "log_group_exclude_patterns",
+        "log_group_exceptions",
+        "high_risk_patterns",
+        "default_retention_days",
+        "high_risk_retention_days",
+    )
+    return state_snapshot.config_hash({k: config.get(k) for k in keys})
+
+
+def _begin_state_snapshot(config):
+    """Load the previous snapshot and start tracking. Returns it ({} when disabled)."""
+    bucket = config.get("state_snapshot_bucket")
+    if not bucket:
+        state_snapshot.stop_tracking()
+        return {}
+    s3 = boto3.client("s3", config=_RETRY_CONFIG)
+    snapshot = state_snapshot.load_snapshot(s3, bucket, config["state_snapshot_key"])
+    state_snapshot.start_run(snapshot, _retention_rules_hash(config))
+    return snapshot
+
+
+def _finish_state_snapshot(config, snapshot, result):
+    """Save the new snapshot and report unchanged/new/changed/removed and drift trend."""
+    bucket = config.get("state_snapshot_bucket")
+    if not bucket:
+        result["findings"]["state_snapshot"] = {"skipped": True}
+        return
+    retention = result["findings"].get("retention", {})
+    run_info = {"at": result["execution_metadata"]["end"], "drifted": retention.get("drifted", 0)}
+    new_snapshot, report = state_snapshot.finish_run(
+        snapshot, _retention_rules_hash(config), run_info
+    )
+    s3 = boto3.client("s3", config=_LIMITED_RETRY_CONFIG)
+    report["saved"] = state_snapshot.save_snapshot(
+        s3, bucket, config["state_snapshot_key"], new_snapshot
+    )
+    state_snapshot.stop_tracking()
+    result["findings"]["state_snapshot"] = report
+    logger.info(
+        "state_snapshot tracked=%d unchanged=%d new=%d changed=%d removed=%d saved=%s",
+        report["tracked"],
+        report["unchanged"],
+        report["new"],
+        report["changed"],
+        report["removed"],
+        report["saved"],
+    )
+
+
 def lambda_handler(event, context):
     """
     Entrypoint. Load config, run logs retention then CloudTrail then S3 audit;
     build result; optionally publish SNS; return JSON result.
     """
     start = datetime.now(UTC).isoformat()
+    reset_limiters()
     config = _get_config()
     mode = config["mode"]
     if mode not in ("AUDIT", "APPLY"):
@@ -1019,6 +1213,7 @@ def lambda_handler(event, context):
         config["mode"] = mode
 
     regions = _get_regions(config)
+    snapshot = _begin_state_snapshot(config)
     result = {
         "execution_metadata": {"mode": mode, "regions": regions, "start": start, "end": None},
         "findings": {},
@@ -1085,6 +1280,8 @@ def lambda_handler(event, context):
         logger.info("SKIPPED dashboard=ENABLE_DASHBOARD is false")
 
     result["execution_metadata"]["end"] = datetime.now(UTC).isoformat()
+    _finish_state_snapshot(config, snapshot, result)
+    result["execution_metadata"]["rate_limiter"] = limiter_stats()
     logger.info(
         "complete mode=%s actions_taken=%d errors=%d",
         mode,
@@ -3,6 +3,10 @@ CloudWatch dashboard widget builders for log-janitor.
 Extracted to keep app.py under 1000 lines.
 """
 
+import hashlib
+import json
+import re
+
 
 def build_dashboard_widgets(
     config: dict,
@@ -57,27 +61,157 @@ def build_dashboard_widgets(
                 },
             }
         )
-    ns = config.get("cloudtrail_metric_namespace", "Security/CloudTrail")
-    widgets.append(
-        {
-            "type": "metric",
-            "x": 0,
-            "y": 20,
-            "width": 12,
-            "height": 6,
-            "properties": {
-                "region": region,
-                "title": "CloudTrail Tripwires",
-                "metrics": [
-                    [ns, "RootLogin"],
-                    [".", "StopLoggingOrDeleteTrail"],
-                    [".", "IAMPolicyChange"],
-                    [".", "IoTPolicyChange"],
-                    [".", "DeleteLogGroup"],
-                ],
-                "view": "timeSeries",
-                "period": 300,
-            },
-        }
+    widgets.append(_tripwire_widget(config, region, 0, 20))
+    return widgets
+
+
+_INSIGHTS_TOP_N_DEFAULT = 10
+_INSIGHTS_PERIOD = 300
+
+# (title, namespace, dimension, metric, SEARCH statistic) per top-N widget, two per row.
+_INSIGHTS_PANELS = [
+    ("Lambda Errors", "AWS/Lambda", "FunctionName", "Errors", "Sum"),
+    ("Lambda Throttles", "AWS/Lambda", "FunctionName", "Throttles", "Sum"),
+    ("DynamoDB ThrottledRequests", "AWS/DynamoDB", "TableName", "ThrottledRequests", "Sum"),
+    ("DynamoDB SystemErrors", "AWS/DynamoDB", "TableName", "SystemErrors", "Sum"),
+    ("SNS NotificationsFailed", "AWS/SNS", "TopicName", "NumberOfNotificationsFailed", "Sum"),
+]
+
+
+def quote_insights_label(value: str) -> str:
+    """Single-quote a dimension value for a Metrics Insights WHERE clause."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _search_terms(prefix: str) -> list:
+    """
+    Split a name prefix into SEARCH tokens.
+
+    SEARCH splits dimension values at non-alphanumeric characters and matches whole
+    tokens, so only the alphanumeric runs of a prefix are usable; keeping nothing else
+    also means quotes or parentheses in a prefix cannot break the expression.
+    """
+    return re.findall(r"[A-Za-z0-9]+", prefix)
+
+
+def _search_clause(dim: str, prefixes: list) -> str:
+    """OR of per-prefix clauses, each requiring every token of that prefix."""
+    clauses = []
+    for prefix in prefixes:
+        terms = _search_terms(prefix)
+        if terms:
+            clauses.append("(" + " AND ".join(f"{dim}={t}" for t in terms) + ")")
+    return " OR ".join(clauses)
+
+
+def insights_expression(panel: tuple, names: list, prefixes: list, top_n: int) -> str:
+    """
+    Build the metric expression for one top-N panel.
+
+    Explicit names become an exact-match Metrics Insights WHERE clause; prefixes become a
+    SEARCH wrapped in SORT; with neither the query covers the whole namespace. All three
+    forms stay one widget regardless of how many resources exist.
+
+    SEARCH has token, not prefix, semantics: `foo-bar-` matches any resource whose name
+    contains the tokens `foo` and `bar` anywhere, so a prefix panel may also rank
+    unrelated resources sharing those tokens. Use explicit names when the scope must be
+    exact.
+    """
+    _title, namespace, dim, metric, stat = panel
+    if names:
+        where = " OR ".join(f"{dim} = {quote_insights_label(n)}" for n in names)
+        return (
+            f'SELECT SUM({metric}) FROM SCHEMA("{namespace}", {dim}) WHERE {where} '  # noqa: S608
+            f"GROUP BY {dim} ORDER BY SUM() DESC LIMIT {top_n}"
+        )
+    match = _search_clause(dim, prefixes)
+    if match:
+        search = f"SEARCH('{{{namespace},{dim}}} MetricName=\"{metric}\" ({match})', '{stat}', {_INSIGHTS_PERIOD})"
+        return f"SORT({search}, SUM, DESC, {top_n})"
+    return (
+        f'SELECT SUM({metric}) FROM SCHEMA("{namespace}", {dim}) '  # noqa: S608
+        f"GROUP BY {dim} ORDER BY SUM() DESC LIMIT {top_n}"
     )
+
+
+def _panel_filters(config: dict, namespace: str) -> tuple:
+    """Return (explicit names, prefixes) from config for a panel's namespace."""
+    if namespace == "AWS/Lambda":
+        return config.get("critical_lambdas") or [], config.get("critical_lambda_prefixes") or []
+    if namespace == "AWS/DynamoDB":
+        return config.get("ddb_tables") or [], config.get("ddb_table_prefixes") or []
+    topics = [t.split(":")[-1] for t in config.get("sns_topics") or []]
+    return topics, config.get("sns_topic_prefixes") or []
+
+
+def _tripwire_widget(config: dict, region: str, x: int, y: int) -> dict:
+    """CloudTrail tripwire metrics widget (fixed set of five metrics)."""
+    ns = config.get("cloudtrail_metric_namespace", "Security/CloudTrail")
+    return {
+        "type": "metric",
+        "x": x,
+        "y": y,
+        "width": 12,
+        "height": 6,
+        "properties": {
+            "region": region,
+            "title": "CloudTrail Tripwires",
+            "metrics": [
+                [ns, "RootLogin"],
+                [".", "StopLoggingOrDeleteTrail"],
+                [".", "IAMPolicyChange"],
+                [".", "IoTPolicyChange"],
+                [".", "DeleteLogGroup"],
+            ],
+            "view": "timeSeries",
+            "period": _INSIGHTS_PERIOD,
+        },
+    }
+
+
+def build_insights_dashboard_widgets(config: dict, region: str) -> list:
+    """Build a fixed-size dashboard of top-N query widgets plus the tripwire widget.
+
+    Widget count does not depend on how many functions, tables or topics exist.
+    """
+    top_n = config.get("dashboard_top_n") or _INSIGHTS_TOP_N_DEFAULT
+    widgets = []
+    for i, panel in enumerate(_INSIGHTS_PANELS):
+        names, prefixes = _panel_filters(config, panel[1])
+        names = [n for n in names if n and n.strip()]
+        widgets.append(
+            {
+                "type": "metric",
+                "x": (i % 2) * 12,
+                "y": (i // 2) * 6,
+                "width": 12,
+                "height": 6,
+                "properties": {
+                    "region": region,
+                    "title": f"{panel[0]} (top {top_n})",
+                    "metrics": [
+                        [
+                            {
+                                "expression": insights_expression(panel, names, prefixes, top_n),
+                                "id": f"q{i}",
+                                "period": _INSIGHTS_PERIOD,
+                            }
+                        ]
+                    ],
+                    "view": "timeSeries",
+                    "stat": panel[4],
+                    "period": _INSIGHTS_PERIOD,
+                },
+            }
+        )
+    n = len(_INSIGHTS_PANELS)
+    widgets.append(_tripwire_widget(config, region, (n % 2) * 12, (n // 2) * 6))
     return widgets
+
+
+def dashboard_body_hash(body) -> str:
+    """SHA-256 of a dashboard body (dict or JSON string) in canonical key order."""
+    if isinstance(body, str):
+        body = json.loads(body)
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
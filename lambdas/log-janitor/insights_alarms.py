@@ -0,0 +1,105 @@
+"""
+Alarm parameter builders for log-janitor.
+
+Holds the static single-metric alarm shape shared by per-resource and tripwire alarms,
+and the aggregate specs for ALARM_STRATEGY=aggregate: instead of one or two alarms per
+resource, each resource class and configured prefix gets one Metrics Insights alarm per
+metric (the maximum across the matching series), optionally rolled up under a single
+composite alarm.
+
+Metrics Insights WHERE clauses only compare whole dimension values, so a name prefix
+cannot be expressed in the query. Each aggregate query instead names the resources that
+matched the prefix when the janitor last listed them; resources created since are
+picked up (and the query re-put) on the next run. A MetricDataQuery expression holds at
+most 2048 characters, so a long name list is split across numbered alarms.
+"""
+
+ALARM_PERIOD = 300
+AGGREGATE_ALARM_PREFIX = "Janitor-Agg-"
+COMPOSITE_ALARM_NAME = "Janitor-Composite"
+_MAX_EXPRESSION_CHARS = 2048
+
+# Resource class -> (namespace, SCHEMA dimensions, metrics)
+AGGREGATE_CLASSES = {
+    "lambda": ("AWS/Lambda", ["FunctionName"], ["Errors", "Throttles"]),
+    "dynamodb": ("AWS/DynamoDB", ["TableName", "Operation"], ["ThrottledRequests", "SystemErrors"]),
+    "sns": ("AWS/SNS", ["TopicName"], ["NumberOfNotificationsFailed"]),
+}
+
+
+def metric_alarm_params(spec: dict) -> dict:
+    """PutMetricAlarm kwargs for a Sum > 0 alarm over one 5-minute period.
+    spec: alarm_name, namespace, metric_name, dimensions, topic_arn (optional)."""
+    params = {
+        "AlarmName": spec["alarm_name"],
+        "MetricName": spec["metric_name"],
+        "Namespace": spec["namespace"],
+        "Dimensions": spec["dimensions"],
+        "Period": ALARM_PERIOD,
+        "EvaluationPeriods": 1,
+        "Threshold": 0,
+        "ComparisonOperator": "GreaterThanThreshold",
+        "Statistic": "Sum",
+        "TreatMissingData": "notBreaching",
+    }
+    if spec.get("topic_arn"):
+        params["AlarmActions"] = [spec["topic_arn"]]
+    return params
+
+
+def aggregate_query(resource_class: str, metric: str, names: list) -> str:
+    """Metrics Insights query for the maximum of one metric across the named resources."""
+    namespace, dims, _metrics = AGGREGATE_CLASSES[resource_class]
+    where = " OR ".join(f"{dims[0]} = '{name}'" for name in names)
+    schema = f'SCHEMA("{namespace}", {", ".join(dims)})'
+    return f"SELECT MAX({metric}) FROM {schema} WHERE {where}"  # noqa: S608
+
+
+def _query_chunks(resource_class: str, metric: str, names: list) -> list:
+    """Split sorted names into runs whose query fits in one expression."""
+    chunks: list[list] = [[]]
+    for name in sorted(names):
+        candidate = chunks[-1] + [name]
+        if chunks[-1] and len(aggregate_query(resource_class, metric, candidate)) > (
+            _MAX_EXPRESSION_CHARS
+        ):
+            chunks.append([name])
+        else:
+            chunks[-1] = candidate
+    return chunks
+
+
+def build_aggregate_alarm_specs(resource_class: str, prefix: str, names: list) -> list:
+    """Return put_metric_alarm kwargs (without actions) for one class and prefix: one alarm
+    per metric over the names matching the prefix, numbered -2, -3... past the first."""
+    _namespace, _dims, metrics = AGGREGATE_CLASSES[resource_class]
+    if not names:
+        return []
+    base = f"{AGGREGATE_ALARM_PREFIX}{resource_class}-{prefix.rstrip('-_.')}"
+    specs = []
+    for metric in metrics:
+        for index, chunk in enumerate(_query_chunks(resource_class, metric, names)):
+            suffix = f"-{index + 1}" if index else ""
+            specs.append(
+                {
+                    "AlarmName": f"{base}-{metric}{suffix}",
+                    "Metrics": [
+                        {
+                            "Id": "q1",
+                            "Expression": aggregate_query(resource_class, metric, chunk),
+                            "Period": ALARM_PERIOD,
+                            "ReturnData": True,
+                        }
+                    ],
+                    "EvaluationPeriods": 1,
+                    "Threshold": 0,
+                    "ComparisonOperator": "GreaterThanThreshold",
+                    "TreatMissingData": "notBreaching",
+                }
+            )
+    return specs
+
+
+def composite_alarm_rule(alarm_names: list) -> str:
+    """AlarmRule that fires when any child alarm is in ALARM."""
+    return " OR ".join(f'ALARM("{n}")' for n in sorted(alarm_names))
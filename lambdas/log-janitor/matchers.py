@@ -0,0 +1,83 @@
+"""
+Precompiled log group scope and retention matchers for log-janitor.
+
+Built once per run from config so per-log-group checks do no string rebuilding:
+include prefixes become one tuple for str.startswith (a C-level scan, faster in CPython
+than walking a Python trie), exclude and high-risk substrings each become a single
+alternation regex over lowercased patterns (matched against the name lowercased once,
+which benchmarks faster than re.IGNORECASE), and exceptions become a name -> int dict.
+See scripts/bench_log_janitor_matchers.py.
+"""
+
+import logging
+import re
+
+logger = logging.getLogger()
+
+
+def _substring_pattern(substrings: list):
+    """Compile lowercased substrings into one alternation, or None if empty."""
+    parts = sorted({s.lower() for s in substrings if s}, key=len, reverse=True)
+    if not parts:
+        return None
+    return re.compile("|".join(re.escape(p) for p in parts))
+
+
+def _exception_days(exceptions: dict) -> dict:
+    """Return {log group: retention days}, dropping entries that are not integers."""
+    days = {}
+    for name, value in (exceptions or {}).items():
+        try:
+            days[name] = int(value)
+        except (TypeError, ValueError):
+            logger.warning("ignoring LOG_GROUP_EXCEPTIONS_JSON entry %r=%r", name, value)
+    return days
+
+
+def compile_matchers(config: dict) -> dict:
+    """Compile scope/retention rules from config into reusable matchers."""
+    return {
+        "include": tuple(config.get("log_group_include_prefixes") or []),
+        "exclude": _substring_pattern(config.get("log_group_exclude_patterns") or []),
+        "high_risk": _substring_pattern(config.get("high_risk_patterns") or []),
+        "exceptions": _exception_days(config.get("log_group_exceptions") or {}),
+        "default_days": config.get("default_retention_days"),
+        "high_risk_days": config.get("high_risk_retention_days"),
+    }
+
+
+def _excluded(lowered: str, matchers: dict) -> bool:
+    """True if the lowercased name contains an exclude pattern."""
+    exclude = matchers["exclude"]
+    return exclude is not None and exclude.search(lowered) is not None
+
+
+def _target_for(name: str, lowered: str, matchers: dict):
+    """Target retention given the name and its lowercased form."""
+    days = matchers["exceptions"].get(name)
+    if days is not None:
+        return days
+    high_risk = matchers["high_risk"]
+    if high_risk is not None and high_risk.search(lowered) is not None:
+        return matchers["high_risk_days"]
+    return matchers["default_days"]
+
+
+def in_scope(name: str, matchers: dict) -> bool:
+    """True if name starts with an include prefix and contains no exclude pattern."""
+    return name.startswith(matchers["include"]) and not _excluded(name.lower(), matchers)
+
+
+def target_retention_days(name: str, matchers: dict):
+    """Target retention for name: exception, then high-risk, then default."""
+    return _target_for(name, name.lower(), matchers)
+
+
+def scoped_target_days(name: str, matchers: dict):
+    """Target retention if name is in scope, else None. Lowercases the name once."""
+    if not name.startswith(matchers["include"]):
+        return None
+    lowered = name.lower()
+    if _excluded(lowered, matchers):
+        return None
+    return _target_for(name, lowered, matchers)
@@ -0,0 +1,155 @@
+"""
+Adaptive token-bucket rate limiting for log-janitor mutating calls.
+
+One bucket per (service, region). The refill rate follows AIMD: it is halved on every
+throttling error and creeps back up by a fixed step on every success, capped at the
+service's starting rate. Buckets are shared across threads; state lives in plain dicts.
+Clients passed to limited_call should be built with botocore retries near off (standard
+mode, max_attempts 2), so throttles reach the limiter instead of being retried inside
+botocore.
+"""
+
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+THROTTLE_ERROR_CODES = frozenset(
+    {
+        "ThrottlingException",
+        "Throttling",
+        "TooManyRequestsException",
+        "RequestLimitExceeded",
+        "SlowDown",
+    }
+)
+
+# Starting (and maximum) calls/second per service; roughly the documented control-plane TPS.
+_SERVICE_RATES = {"logs": 5.0, "cloudwatch": 3.0, "s3": 10.0}
+_DEFAULT_RATE = 5.0
+_MIN_RATE = 0.2
+_DECREASE_FACTOR = 0.5
+_INCREASE_STEP = 0.1
+_MAX_ATTEMPTS = 6
+
+_LIMITERS: dict[str, dict] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _new_limiter(rate: float) -> dict:
+    """Return a full bucket refilling at `rate` tokens/second."""
+    return {
+        "lock": threading.Lock(),
+        "max_rate": rate,
+        "rate": rate,
+        "capacity": max(1.0, rate),
+        "tokens": max(1.0, rate),
+        "updated": time.monotonic(),
+        "stats": {
+            "calls": 0,
+            "throttles": 0,
+            "retries": 0,
+            "failures": 0,
+            "waited_secs": 0.0,
+            "min_rate": rate,
+        },
+    }
+
+
+def get_limiter(service: str, region: str) -> dict:
+    """Return the shared limiter for (service, region), creating it on first use."""
+    key = f"{service}:{region}"
+    with _REGISTRY_LOCK:
+        if key not in _LIMITERS:
+            _LIMITERS[key] = _new_limiter(_SERVICE_RATES.get(service, _DEFAULT_RATE))
+        return _LIMITERS[key]
+
+
+def reset_limiters() -> None:
+    """Drop all limiters so each run starts with fresh rates and stats."""
+    with _REGISTRY_LOCK:
+        _LIMITERS.clear()
+
+
+def _reserve(limiter: dict) -> float:
+    """Take one token (possibly going into debt) and return seconds to wait before calling."""
+    with limiter["lock"]:
+        now = time.monotonic()
+        elapsed = now - limiter["updated"]
+        limiter["updated"] = now
+        limiter["tokens"] = min(limiter["capacity"], limiter["tokens"] + elapsed * limiter["rate"])
+        limiter["tokens"] -= 1.0
+        wait = 0.0 if limiter["tokens"] >= 0 else -limiter["tokens"] / limiter["rate"]
+        limiter["stats"]["waited_secs"] += wait
+        return wait
+
+
+def _on_success(limiter: dict) -> None:
+    """Additive increase after a successful call."""
+    with limiter["lock"]:
+        limiter["stats"]["calls"] += 1
+        limiter["rate"] = min(limiter["max_rate"], limiter["rate"] + _INCREASE_STEP)
+
+
+def _on_throttle(limiter: dict) -> None:
+    """Multiplicative decrease after a throttling error; drains the bucket."""
+    with limiter["lock"]:
+        stats = limiter["stats"]
+        stats["calls"] += 1
+        stats["throttles"] += 1
+        limiter["rate"] = max(_MIN_RATE, limiter["rate"] * _DECREASE_FACTOR)
+        limiter["tokens"] = min(limiter["tokens"], 0.0)
+        stats["min_rate"] = min(stats["min_rate"], limiter["rate"])
+
+
+def _bump(limiter: dict, stat: str) -> None:
+    """Increment one counter in a limiter's stats."""
+    with limiter["lock"]:
+        limiter["stats"][stat] += 1
+
+
+def is_throttle_error(err: ClientError) -> bool:
+    """True if a ClientError is a throttling response."""
+    return err.response.get("Error", {}).get("Code") in THROTTLE_ERROR_CODES
+
+
+def limited_call(client, service: str, method: str, **kwargs):
+    """
+    Call client.<method>(**kwargs) through the (service, client region) limiter.
+    Retries throttling errors up to _MAX_ATTEMPTS times; other ClientErrors propagate.
+    """
+    region = getattr(client.meta, "region_name", None) or "global"
+    limiter = get_limiter(service, str(region))
+    for attempt in range(_MAX_ATTEMPTS):
+        wait = _reserve(limiter)
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            response = getattr(client, method)(**kwargs)
+        except ClientError as e:
+            if not is_throttle_error(e):
+                raise
+            _on_throttle(limiter)
+            if attempt == _MAX_ATTEMPTS - 1:
+                _bump(limiter, "failures")
+                raise
+            _bump(limiter, "retries")
+            continue
+        _on_success(limiter)
+        return response
+    return None
+
+
+def limiter_stats() -> dict:
+    """Snapshot of every limiter's stats and current rate, keyed by 'service:region'."""
+    with _REGISTRY_LOCK:
+        items = list(_LIMITERS.items())
+    out = {}
+    for key, limiter in items:
+        with limiter["lock"]:
+            stats = dict(limiter["stats"])
+            stats["rate"] = round(limiter["rate"], 3)
+        stats["waited_secs"] = round(stats["waited_secs"], 3)
+        stats["min_rate"] = round(stats["min_rate"], 3)
+        out[key] = stats
+    return out
@@ -0,0 +1,212 @@
+"""
+S3 bucket posture audit for log-janitor.
+
+Checks Block Public Access, versioning, encryption and lifecycle on the CloudTrail bucket
+and on every bucket whose name matches S3_POSTURE_BUCKET_PREFIXES. Buckets are listed
+once, each bucket's region is resolved so checks go to one regional client per region
+(no cross-region redirects), and buckets are audited concurrently in a bounded pool.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from rate_limiter import limited_call
+
+logger = logging.getLogger()
+
+# GetBucketLocation returns None for us-east-1 and "EU" for very old eu-west-1 buckets.
+_LEGACY_LOCATIONS = {None: "us-east-1", "": "us-east-1", "EU": "eu-west-1"}
+
+_PAB_CONFIG = {
+    "BlockPublicAcls": True,
+    "BlockPublicPolicy": True,
+    "IgnorePublicAcls": True,
+    "RestrictPublicBuckets": True,
+}
+
+
+def _check_block_public_access(s3_client, bucket_name, config, mode):
+    """Check/apply Block Public Access. Returns (findings, actions)."""
+    findings = []
+    actions: list[dict] = []
+    try:
+        pab = s3_client.get_public_access_block(Bucket=bucket_name)
+        block = pab.get("PublicAccessBlockConfiguration", {})
+        if not all(block.get(k, False) for k in _PAB_CONFIG):
+            findings.append({"bucket": bucket_name, "issue": "block_public_access_not_full"})
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchPublicAccessBlockConfiguration":
+            findings.append({"bucket": bucket_name, "issue": "block_public_access_not_set"})
+        else:
+            findings.append({"bucket": bucket_name, "error": str(e)})
+            return findings, actions
+    if findings and mode == "APPLY" and config["require_block_public_access"]:
+        limited_call(
+            s3_client,
+            "s3",
+            "put_public_access_block",
+            Bucket=bucket_name,
+            PublicAccessBlockConfiguration=_PAB_CONFIG,
+        )
+        actions.append({"bucket": bucket_name, "action": "put_public_access_block"})
+    return findings, actions
+
+
+def _check_versioning(s3_client, bucket_name, config, mode):
+    """Check/apply versioning. Returns (findings, actions)."""
+    findings = []
+    actions: list[dict] = []
+    ver = s3_client.get_bucket_versioning(Bucket=bucket_name)
+    if ver.get("Status") != "Enabled" and config["require_bucket_versioning"]:
+        findings.append({"bucket": bucket_name, "issue": "versioning_disabled"})
+        if mode == "APPLY":
+            limited_call(
+                s3_client,
+                "s3",
+                "put_bucket_versioning",
+                Bucket=bucket_name,
+                VersioningConfiguration={"Status": "Enabled"},
+            )
+            actions.append({"bucket": bucket_name, "action": "put_bucket_versioning"})
+    return findings, actions
+
+
+def _check_encryption(s3_client, bucket_name, config, mode):
+    """Check/apply bucket encryption. Returns (findings, actions)."""
+    findings = []
+    actions: list[dict] = []
+    enc_set = False
+    try:
+        enc = s3_client.get_bucket_encryption(Bucket=bucket_name)
+        enc_set = bool(enc.get("ServerSideEncryptionConfiguration", {}).get("Rules"))
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ServerSideEncryptionConfigurationNotFoundError":
+            findings.append({"bucket": bucket_name, "error": str(e)})
+    if not enc_set and config["require_bucket_encryption"]:
+        findings.append({"bucket": bucket_name, "issue": "encryption_not_set"})
+        if mode == "APPLY":
+            try:
+                limited_call(
+                    s3_client,
+                    "s3",
+                    "put_bucket_encryption",
+                    Bucket=bucket_name,
+                    ServerSideEncryptionConfiguration={
+                        "Rules": [
+                            {"ApplyServerSideEncryptionByDefault": {"SSEAlgorithm": "AES256"}}
+                        ]
+                    },
+                )
+                actions.append({"bucket": bucket_name, "action": "put_bucket_encryption"})
+            except ClientError as err:
+                findings.append({"bucket": bucket_name, "error": str(err)})
+    return findings, actions
+
+
+def _check_lifecycle(s3_client, bucket_name, config, mode):
+    """Check/apply lifecycle. Returns (findings, actions)."""
+    findings = []
+    actions: list[dict] = []
+    try:
+        lc = s3_client.get_bucket_lifecycle_configuration(Bucket=bucket_name)
+        rules = lc.get("Rules", [])
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchLifecycleConfiguration":
+            rules = []
+        else:
+            findings.append({"bucket": bucket_name, "error": str(e)})
+            return findings, actions
+    if config["require_bucket_lifecycle"] and not rules:
+        findings.append({"bucket": bucket_name, "issue": "lifecycle_not_set"})
+        if mode == "APPLY":
+            limited_call(
+                s3_client,
+                "s3",
+                "put_bucket_lifecycle_configuration",
+                Bucket=bucket_name,
+                LifecycleConfiguration={
+                    "Rules": [
+                        {
+                            "ID": "CloudTrailRetention",
+                            "Status": "Enabled",
+                            "Filter": {"Prefix": config["cloudtrail_s3_prefix"] or ""},
+                            "Expiration": {"Days": config["cloudtrail_retention_years"] * 365},
+                        }
+                    ]
+                },
+            )
+            actions.append({"bucket": bucket_name, "action": "put_bucket_lifecycle"})
+    return findings, actions
+
+
+_CHECKS = (_check_block_public_access, _check_versioning, _check_encryption)
+
+
+def audit_bucket(s3_client, bucket_name, config, mode, trail_bucket=True):
+    """
+    Audit (and optionally apply) one bucket: Block Public Access, versioning, encryption,
+    lifecycle. The CloudTrail retention lifecycle rule is only applied to the trail bucket;
+    on other buckets a missing lifecycle is reported, never remediated (it would expire data).
+    Returns (findings, actions_taken).
+    """
+    if not bucket_name:
+        return [], []
+    findings = []
+    actions_taken = []
+    try:
+        for check in _CHECKS:
+            f, a = check(s3_client, bucket_name, config, mode)
+            findings.extend(f)
+            actions_taken.extend(a)
+        f, a = _check_lifecycle(s3_client, bucket_name, config, mode if trail_bucket else "AUDIT")
+        findings.extend(f)
+        actions_taken.extend(a)
+    except ClientError as e:
+        findings.append({"bucket": bucket_name, "error": str(e)})
+    return findings, actions_taken
+
+
+def list_prefixed_buckets(s3_client, prefixes):
+    """Bucket names starting with any prefix, from one ListBuckets call."""
+    if not prefixes:
+        return []
+    response = s3_client.list_buckets()
+    names = [b.get("Name", "") for b in response.get("Buckets", [])]
+    return sorted(n for n in names if n.startswith(tuple(prefixes)))
+
+
+def bucket_region(s3_client, bucket_name):
+    """Region of a bucket, or None if it cannot be read (the default client is used)."""
+    try:
+        loc = s3_client.get_bucket_location(Bucket=bucket_name).get("LocationConstraint")
+    except ClientError as e:
+        logger.warning("get_bucket_location failed bucket=%s: %s", bucket_name, e)
+        return None
+    return _LEGACY_LOCATIONS.get(loc, loc)
+
+
+def bucket_regions(s3_client, names, max_workers):
+    """Return {bucket: region or None}, looking locations up concurrently."""
+    if not names:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(names), max_workers))) as pool:
+        regions = list(pool.map(lambda n: bucket_region(s3_client, n), names))
+    return dict(zip(names, regions, strict=True))
+
+
+def audit_buckets(targets, config, mode, max_workers):
+    """
+    Audit many buckets concurrently. targets: [(bucket, s3 client, is trail bucket)].
+    Returns (findings, actions_taken) in target order.
+    """
+    if not targets:
+        return [], []
+    with ThreadPoolExecutor(max_workers=max(1, min(len(targets), max_workers))) as pool:
+        results = list(
+            pool.map(lambda t: audit_bucket(t[1], t[0], config, mode, trail_bucket=t[2]), targets)
+        )
+    findings = [f for bucket_findings, _ in results for f in bucket_findings]
+    actions = [a for _, bucket_actions in results for a in bucket_actions]
+    return findings, actions
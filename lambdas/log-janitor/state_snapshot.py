@@ -0,0 +1,156 @@
+"""
+Incremental state snapshots for log-janitor.
+
+After each run the janitor saves a compact map of resource key -> fingerprint of its
+last verified config (e.g. a compliant log group's retentionInDays, or a hash of an
+alarm's PutMetricAlarm parameters) to S3. Fingerprints are only recorded: whether an
+alarm needs a put is decided from its live describe_alarms config, so out-of-band
+edits are repaired. The snapshot keeps a short per-run history so unchanged/new/
+changed/removed counts and drift trends can be reported.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+
+from botocore.exceptions import ClientError
+from rate_limiter import limited_call
+
+logger = logging.getLogger()
+
+SNAPSHOT_VERSION = 1
+_HISTORY_LIMIT = 30
+_TREND_RUNS = 7
+
+_STATE: dict = {"enabled": False, "previous": {}, "current": {}, "kinds": set(), "unchanged": 0}
+_LOCK = threading.Lock()
+
+
+def config_hash(obj) -> str:
+    """Short SHA-256 fingerprint of a JSON-serializable object in canonical key order."""
+    canonical = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def load_snapshot(s3_client, bucket: str, key: str) -> dict:
+    """Return the stored snapshot, or an empty one if missing or unreadable."""
+    try:
+        obj = s3_client.get_object(Bucket=bucket, Key=key)
+        snapshot = json.loads(obj["Body"].read())
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+            logger.warning("state snapshot load failed s3://%s/%s: %s", bucket, key, e)
+        return {}
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning("state snapshot unreadable s3://%s/%s: %s", bucket, key, e)
+        return {}
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        return {}
+    return snapshot
+
+
+def start_run(snapshot: dict, rules_hash: str) -> None:
+    """
+    Begin tracking a run against a previous snapshot. Log-group entries are dropped when
+    the retention/scope rules changed, since their fingerprints no longer prove compliance.
+    """
+    previous = dict(snapshot.get("resources") or {})
+    if snapshot.get("rules_hash") != rules_hash:
+        previous = {k: v for k, v in previous.items() if not k.startswith("logs:")}
+    with _LOCK:
+        _STATE.update(
+            {"enabled": True, "previous": previous, "current": {}, "kinds": set(), "unchanged": 0}
+        )
+
+
+def stop_tracking() -> None:
+    """Disable tracking (snapshots off for this run)."""
+    with _LOCK:
+        _STATE.update(
+            {"enabled": False, "previous": {}, "current": {}, "kinds": set(), "unchanged": 0}
+        )
+
+
+def _kind(key: str) -> str:
+    """Resource kind prefix of a snapshot key ('logs', 'alarm', ...)."""
+    return key.split(":", 1)[0]
+
+
+def is_unchanged(key: str, fingerprint: str) -> bool:
+    """True if key was verified with this fingerprint last run; carries it forward if so."""
+    with _LOCK:
+        if not _STATE["enabled"]:
+            return False
+        _STATE["kinds"].add(_kind(key))
+        if _STATE["previous"].get(key) != fingerprint:
+            return False
+        _STATE["current"][key] = fingerprint
+        _STATE["unchanged"] += 1
+        return True
+
+
+def record(key: str, fingerprint: str) -> None:
+    """Record a resource verified (or remediated) to this fingerprint in the current run."""
+    with _LOCK:
+        if _STATE["enabled"]:
+            _STATE["kinds"].add(_kind(key))
+            _STATE["current"][key] = fingerprint
+
+
+def _diff_counts(previous: dict, current: dict, kinds: set) -> dict:
+    """Count new/changed/removed keys for the kinds touched this run."""
+    new = sum(1 for k in current if k not in previous)
+    changed = sum(1 for k, v in current.items() if k in previous and previous[k] != v)
+    removed = sum(1 for k in previous if _kind(k) in kinds and k not in current)
+    return {"new": new, "changed": changed, "removed": removed}
+
+
+def finish_run(snapshot: dict, rules_hash: str, run_info: dict) -> tuple:
+    """
+    Return (new snapshot, report). Entries of kinds not touched this run (stage disabled)
+    are carried forward unchanged. run_info: {"at": iso time, "drifted": int}.
+    """
+    with _LOCK:
+        previous = dict(_STATE["previous"])
+        current = dict(_STATE["current"])
+        kinds = set(_STATE["kinds"])
+        unchanged = _STATE["unchanged"]
+    counts = _diff_counts(previous, current, kinds)
+    resources = {k: v for k, v in previous.items() if _kind(k) not in kinds}
+    resources.update(current)
+    entry = {**run_info, **counts}
+    history = (list(snapshot.get("history") or []) + [entry])[-_HISTORY_LIMIT:]
+    new_snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "updated": run_info.get("at"),
+        "rules_hash": rules_hash,
+        "resources": resources,
+        "history": history,
+    }
+    report = {
+        "tracked": len(resources),
+        "unchanged": unchanged,
+        **counts,
+        "drift_trend": [h.get("drifted", 0) for h in history[-_TREND_RUNS:]],
+    }
+    return new_snapshot, report
+
+
+def save_snapshot(s3_client, bucket: str, key: str, snapshot: dict) -> bool:
+    """Write the snapshot as compact JSON through the shared S3 limiter."""
+    body = json.dumps(snapshot, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    try:
+        limited_call(
+            s3_client,
+            "s3",
+            "put_object",
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ContentType="application/json",
+        )
+        return True
+    except ClientError as e:
+        logger.warning("state snapshot save failed s3://%s/%s: %s", bucket, key, e)
+        return False
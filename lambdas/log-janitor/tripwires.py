@@ -0,0 +1,206 @@
+"""
+CloudTrail tripwire reconciliation for log-janitor.
+
+Per region, reads the existing CloudTrail-* metric filters of each CloudTrail log group
+(one paginated DescribeMetricFilters each) and the existing Janitor-CloudTrail-* alarms
+(one paginated DescribeAlarms), then writes only the filters and alarms that are missing
+or differ from the desired definitions. AUDIT mode reports the same drift without writing.
+"""
+
+import logging
+
+from botocore.exceptions import ClientError
+
+import state_snapshot
+from insights_alarms import metric_alarm_params
+from rate_limiter import limited_call
+
+logger = logging.getLogger()
+
+FILTER_PREFIX = "CloudTrail-"
+ALARM_PREFIX = "Janitor-CloudTrail-"
+
+TRIPWIRE_DEFS = [
+    {"name": "RootLogin", "pattern": '{ $.userIdentity.type = "Root" }'},
+    {
+        "name": "StopLoggingOrDeleteTrail",
+        "pattern": '{ ($.eventName = "StopLogging") || ($.eventName = "DeleteTrail") }',
+    },
+    {
+        "name": "IAMPolicyChange",
+        "pattern": '{ ($.eventName = "AttachRolePolicy") || ($.eventName = "DetachRolePolicy") || ($.eventName = "PutRolePolicy") || ($.eventName = "DeleteRolePolicy") }',
+    },
+    {
+        "name": "IoTPolicyChange",
+        "pattern": '{ ($.eventName = "CreatePolicy") || ($.eventName = "DeletePolicy") || ($.eventName = "AttachPolicy") || ($.eventName = "DetachPolicy") }',
+    },
+    {"name": "DeleteLogGroup", "pattern": '{ $.eventName = "DeleteLogGroup" }'},
+]
+
+
+def desired_filter(tw: dict, log_group: str, namespace: str) -> dict:
+    """PutMetricFilter kwargs for one tripwire on one log group."""
+    return {
+        "logGroupName": log_group,
+        "filterName": f"{FILTER_PREFIX}{tw['name']}",
+        "filterPattern": tw["pattern"],
+        "metricTransformations": [
+            {"metricName": tw["name"], "metricNamespace": namespace, "metricValue": "1"}
+        ],
+    }
+
+
+def desired_alarm(tw: dict, namespace: str, topic) -> dict:
+    """PutMetricAlarm kwargs for one tripwire metric."""
+    return metric_alarm_params(
+        {
+            "alarm_name": f"{ALARM_PREFIX}{tw['name']}",
+            "namespace": namespace,
+            "metric_name": tw["name"],
+            "dimensions": [],
+            "topic_arn": topic,
+        }
+    )
+
+
+def _transformations(flt: dict) -> list:
+    """Comparable (name, namespace, value) tuples of a filter's metric transformations."""
+    return [
+        (t.get("metricName"), t.get("metricNamespace"), str(t.get("metricValue")))
+        for t in flt.get("metricTransformations") or []
+    ]
+
+
+def filter_in_sync(existing, desired: dict) -> bool:
+    """True if an existing metric filter matches the desired pattern and transformation."""
+    if not existing:
+        return False
+    return existing.get("filterPattern") == desired["filterPattern"] and _transformations(
+        existing
+    ) == _transformations(desired)
+
+
+def alarm_in_sync(existing, desired: dict) -> bool:
+    """True if every desired alarm parameter equals the existing alarm's value."""
+    if not existing:
+        return False
+    return all(existing.get(k) == v for k, v in desired.items() if k != "AlarmName")
+
+
+def _existing_filters(logs, log_group: str) -> dict:
+    """Return {filterName: filter} for CloudTrail-* filters on log_group."""
+    found = {}
+    paginator = logs.get_paginator("describe_metric_filters")
+    for page in paginator.paginate(logGroupName=log_group, filterNamePrefix=FILTER_PREFIX):
+        for flt in page.get("metricFilters", []):
+            found[flt.get("filterName")] = flt
+    return found
+
+
+def _existing_alarms(cw) -> dict:
+    """Return {AlarmName: alarm} for Janitor-CloudTrail-* metric alarms."""
+    found = {}
+    paginator = cw.get_paginator("describe_alarms")
+    for page in paginator.paginate(AlarmNamePrefix=ALARM_PREFIX, AlarmTypes=["MetricAlarm"]):
+        for alarm in page.get("MetricAlarms", []):
+            found[alarm.get("AlarmName")] = alarm
+    return found
+
+
+COUNTERS = (
+    "scanned",
+    "filters_scanned",
+    "alarms_scanned",
+    "created",
+    "unchanged",
+    "drifted",
+    "failed",
+)
+
+
+def _new_out() -> dict:
+    """Empty counters for one reconciliation pass. scanned counts tripwires per log group,
+    as it always has; filters_scanned and alarms_scanned count the items checked."""
+    return {**dict.fromkeys(COUNTERS, 0), "actions": []}
+
+
+def _apply(ctx: dict, call: tuple, action: dict) -> bool:
+    """Run one limited put call; count it and collect errors. call: (client, service, method, kwargs)."""
+    client, service, method, kwargs = call
+    try:
+        limited_call(client, service, method, **kwargs)
+    except ClientError as e:
+        logger.error("cloudtrail_tripwires error %s: %s", action, e)
+        ctx["out"]["failed"] += 1
+        ctx["errors"].append({"stage": "cloudtrail_tripwires", **action, "error": str(e)})
+        return False
+    ctx["out"]["created"] += 1
+    ctx["out"]["actions"].append(action)
+    return True
+
+
+def _reconcile_item(ctx: dict, in_sync: bool, call: tuple, action: dict) -> bool:
+    """Count one filter/alarm and write it in APPLY mode if it drifted. True if now in sync."""
+    ctx["out"]["alarms_scanned" if "alarm" in action else "filters_scanned"] += 1
+    if in_sync:
+        ctx["out"]["unchanged"] += 1
+        return True
+    ctx["out"]["drifted"] += 1
+    logger.info("DRIFT tripwire %s", action)
+    if ctx["mode"] != "APPLY":
+        return False
+    return _apply(ctx, call, action)
+
+
+def _reconcile_filters(ctx: dict, logs, log_group: str) -> None:
+    """Reconcile every tripwire filter on one log group."""
+    region = ctx["settings"]["region"]
+    ctx["out"]["scanned"] += len(TRIPWIRE_DEFS)
+    try:
+        existing = _existing_filters(logs, log_group)
+    except ClientError as e:
+        logger.error("describe_metric_filters failed log_group=%s: %s", log_group, e)
+        ctx["errors"].append(
+            {"stage": "cloudtrail_tripwires", "log_group": log_group, "error": str(e)}
+        )
+        return
+    for tw in TRIPWIRE_DEFS:
+        want = desired_filter(tw, log_group, ctx["settings"]["namespace"])
+        action = {"filter": want["filterName"], "log_group": log_group, "region": region}
+        in_sync = filter_in_sync(existing.get(want["filterName"]), want)
+        _reconcile_item(ctx, in_sync, (logs, "logs", "put_metric_filter", want), action)
+
+
+def _reconcile_alarms(ctx: dict, cw) -> None:
+    """Reconcile the region's tripwire alarms (shared by all log groups in the region)."""
+    settings = ctx["settings"]
+    try:
+        existing = _existing_alarms(cw)
+    except ClientError as e:
+        logger.error("describe_alarms failed region=%s: %s", settings["region"], e)
+        ctx["errors"].append(
+            {"stage": "cloudtrail_tripwires", "region": settings["region"], "error": str(e)}
+        )
+        return
+    for tw in TRIPWIRE_DEFS:
+        want = desired_alarm(tw, settings["namespace"], settings["topic"])
+        name = want["AlarmName"]
+        action = {"alarm": name, "region": settings["region"]}
+        in_sync = alarm_in_sync(existing.get(name), want)
+        if _reconcile_item(ctx, in_sync, (cw, "cloudwatch", "put_metric_alarm", want), action):
+            # Same key format as app._alarm_key so the snapshot sees tripwire alarms as tracked.
+            key = f"alarm:{settings['region']}:{name}"
+            state_snapshot.record(key, state_snapshot.config_hash(want))
+
+
+def reconcile_region(clients: dict, log_groups: list, settings: dict, mode: str) -> dict:
+    """
+    Reconcile tripwire filters on each log group and the tripwire alarms of one region.
+    clients: {"logs", "cloudwatch"}; settings: region, namespace, topic.
+    Returns {"out": counters, "errors": [...]}; safe to run one region per thread.
+    """
+    ctx = {"out": _new_out(), "errors": [], "mode": mode, "settings": settings}
+    for log_group in log_groups:
+        _reconcile_filters(ctx, clients["logs"], log_group)
+    _reconcile_alarms(ctx, clients["cloudwatch"])
+    return {"out": ctx["out"], "errors": ctx["errors"]}
@@ -8,13 +8,22 @@ cognito-rest-api shape: CORS-enabled GETs, optional API Gateway
 authorizer gate, JSON-only responses.
 """
 
+import base64
 import contextlib
+import contextvars
+import gzip
+import hashlib
 import json
 import logging
+import math
 import os
+import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import partial
 
 import boto3
 from botocore.exceptions import ClientError
@@ -26,6 +35,7 @@ from common.constants import (
     DEFAULT_REGION,
     HTTP_BAD_REQUEST,
     HTTP_NO_CONTENT,
+    HTTP_NOT_MODIFIED,
     HTTP_OK,
     HTTP_UNAUTHORIZED,
 )
@@ -48,17 +58,113 @@ _RUM_JS_ERROR_EVENT_TYPE = "com.amazon.rum.js_error_event"
 # weekly on the Lambda side.
 SECONDS_PER_DAY = 86400
 
-# Logs Insights polling
-_QUERY_POLL_INTERVAL_SECS = 1
+# Logs Insights polling. Queries run concurrently (up to _MAX_CONCURRENT_QUERIES, well
+# under the account's concurrent-query quota) and share one deadline; the poll interval
+# backs off while nothing finishes and resets when a query completes.
+_QUERY_POLL_MIN_SECS = 0.25
+_QUERY_POLL_MAX_SECS = 2.0
+_QUERY_POLL_BACKOFF = 1.5
 _QUERY_TIMEOUT_SECS = 10
-
-# In-process response cache. Warm starts reuse it; cold starts re-query.
+_MAX_CONCURRENT_QUERIES = 10
+_QUERY_DONE_STATUSES = ("Complete", "Failed", "Cancelled", "Timeout")
+# Queries are keyed by (source, index of the span piece) within one round.
+_QueryKey = tuple[str, int]
+
+# Logs Insights instrumentation: every query is recorded (statistics, poll count, wall
+# time, outcome) and emitted as one CloudWatch Embedded Metric Format line dimensioned by
+# endpoint and window; ?debug=timing also returns the records in the response body.
+_EMF_NAMESPACE = "Suigetsukan/UsageApi"
+_EMF_METRICS = (
+    ("InsightsBytesScanned", "Bytes", "bytes_scanned"),
+    ("InsightsRecordsScanned", "Count", "records_scanned"),
+    ("InsightsRecordsMatched", "Count", "records_matched"),
+    ("InsightsPolls", "Count", "polls"),
+    ("InsightsQueryTime", "Milliseconds", "wall_ms"),
+    ("InsightsPartial", "Count", "partial"),
+)
+_TRACE: contextvars.ContextVar[dict | None] = contextvars.ContextVar("usage_trace", default=None)
+
+# Response cache. L1 is an in-process LRU dict (warm starts reuse it). L2 is an optional
+# DynamoDB table (USAGE_CACHE_TABLE) shared by every container, keyed by endpoint, days
+# and the UTC day the window ends on. Entries older than _CACHE_TTL_SECS are stale: L2
+# still serves them for up to _CACHE_STALE_SECS while an async self-invoke refreshes them.
+# iam_policy.json grants the table as suigetsukan-usage-rest-api-cache and the invoke on
+# this function only, so USAGE_CACHE_TABLE must name that table; create it (pk/sk keys,
+# TTL on expires_at) with scripts/setup_usage_cache_table.py.
 _CACHE_TTL_SECS = 300
-_CACHE: dict[tuple[str, int], tuple[float, dict]] = {}
+_CACHE_STALE_SECS = 86400
+_CACHE_REFRESH_LOCK_SECS = 120
+_L1_MAX_ENTRIES = 64
+_CACHE: OrderedDict[tuple[str, int, str], tuple[float, dict]] = OrderedDict()
+_REFRESH_EVENT_KEY = "usage_cache_refresh"
+
+# HTTP validators. Bodies served through the cache carry a private _HTTP_KEY entry
+# (ETag of the cached body, seconds of TTL left) that lambda_handler turns into ETag /
+# Cache-Control headers and If-None-Match 304s; bodies of at least _GZIP_MIN_BYTES are
+# gzip-encoded (base64, isBase64Encoded) for clients that accept it.
+_HTTP_KEY = "_http"
+_GZIP_MIN_BYTES = 1024
+_ZERO_QVALUES = ("q=0", "q=0.", "q=0.0", "q=0.00", "q=0.000")
+
+# Per-day memo for additive endpoints. Each source (one Insights query or the Cognito
+# sign-in metric) is fetched with daily bins; a settled UTC day never changes, so its rows
+# are kept indefinitely: in-process (LRU-bounded) and, when USAGE_CACHE_TABLE is set, in
+# the same table under pk "usageday:<source>". RUM and CloudWatch ingestion can lag by
+# hours, so a day only counts as settled _DAY_SETTLE_SECS after it closes; more recent
+# closed days are re-queried with today, as are unmemoized days.
+_DAY_SETTLE_SECS = 86400
+_DAY_CACHE_MAX_ENTRIES = 4096
+_DAY_CACHE: OrderedDict[tuple[str, str], list[dict]] = OrderedDict()
+_DDB_BATCH_GET_MAX = 100
+_DDB_BATCH_WRITE_MAX = 25
+_DDB_ITEM_MAX_BYTES = 350_000
+_INSIGHTS_DAY_FIELD = "bin(1d)"
+_DAILY_ROW_LIMIT = 10000
+# A span whose result reaches the row cap is halved and re-queried, down to an hour.
+_SPLIT_MIN_SECS = 3600
+
+# Approximate mode. When more than USAGE_APPROX_MAX_DAYS closed days are unmemoized
+# (0 disables), only evenly spread blocks of _APPROX_BLOCK_DAYS consecutive days (fewer
+# if the budget is smaller) are queried, as concurrent sub-queries; counts from the known days are scaled up by the
+# closed-day coverage and the response is marked approximate with its sampling_ratio.
+# Responses missing rows (a query cut off at the deadline, or still at the row cap after
+# splitting) are marked approximate and partial.
+_DEFAULT_APPROX_MAX_DAYS = 31
+_APPROX_BLOCK_DAYS = 7
+_WEIGHT_FIELD = "_weight"
+
+# Rows of today and the unsettled closed days per source, reused for _CACHE_TTL_SECS so
+# endpoints sharing a source (the combined PageView query) scan them once per Statistics
+# page load. Entries: (fetched at, today, {day: rows}).
+_RECENT_CACHE: dict[str, tuple[float, str, dict[str, list[dict]]]] = {}
+
+# Scheduled rollup. A daily EventBridge rule (config.json) materializes the day memo in
+# L2 for every additive source over the widest window, so requests read settled days from
+# DynamoDB and only query Logs Insights for the days still settling and today. Its queries get a longer deadline.
+_ROLLUP_DAYS = 90
+_ROLLUP_QUERY_TIMEOUT_SECS = 45
+_SCHEDULED_DETAIL_TYPE = "Scheduled Event"
+
+# Warm mode. A second EventBridge rule (config.json) invokes the Lambda with
+# {"usage_cache_warm": {"days": [...]}} before admins arrive; every endpoint is recomputed
+# for each window and written to both response cache tiers, so the first page load of
+# the day hits the cache (and later ones get stale-while-revalidate from L2).
+_WARM_EVENT_KEY = "usage_cache_warm"
+_DEFAULT_WARM_WINDOWS = (7, 30, 90)
+
+# /usage/all computes several sections concurrently in one invocation.
+_ALL_PATH = "/usage/all"
+_SECTION_PREFIX = "/usage/"
+_ALL_MAX_WORKERS = 9
 
 # Lazy client cache so module import never touches the network.
 _CLIENTS: dict[str, object] = {}
 
+# Guards _CLIENTS and the in-process caches for /usage/all worker threads. Per-source
+# locks make concurrent sections that share a daily source wait for one fetch.
+_LOCK = threading.RLock()
+_SOURCE_LOCKS: dict[str, threading.Lock] = {}
+
 
 def _cors_origin() -> str:
     return os.environ.get("CORS_ALLOWED_ORIGIN", CORS_ORIGIN_ALL)
@@ -88,6 +194,64 @@ def _options_response() -> dict:
     return {"statusCode": HTTP_NO_CONTENT, "headers": _cors_headers(), "body": ""}
 
 
+def _request_header(event: dict, name: str) -> str:
+    """Case-insensitive request header lookup ("" when absent)."""
+    wanted = name.lower()
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == wanted:
+            return value or ""
+    return ""
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """True if Accept-Encoding lists gzip (or *) without q=0."""
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        if params.replace(" ", "").lower() in _ZERO_QVALUES:
+            continue
+        return True
+    return False
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison: True if If-None-Match names this tag (or is *)."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag in ("*", etag):
+            return True
+    return False
+
+
+def _http_response(event: dict, body: dict, http: dict | None) -> dict:
+    """200 with ETag / Cache-Control (gzip-encoded when accepted), or 304 when the
+    client already holds this body. Bodies without cache validators go out plain."""
+    if http is None:
+        return _success_response(body)
+    payload = json.dumps(body)
+    compress = len(payload) >= _GZIP_MIN_BYTES and _accepts_gzip(
+        _request_header(event, "Accept-Encoding")
+    )
+    headers = {
+        **_cors_headers(),
+        "ETag": f'W/"{http["etag"]}"',
+        "Cache-Control": f"private, max-age={http['max_age']}",
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(_request_header(event, "If-None-Match"), http["etag"]):
+        return {"statusCode": HTTP_NOT_MODIFIED, "headers": headers, "body": ""}
+    if not compress:
+        return {"statusCode": HTTP_OK, "headers": headers, "body": payload}
+    encoded = base64.b64encode(gzip.compress(payload.encode("utf-8"))).decode("ascii")
+    return {
+        "statusCode": HTTP_OK,
+        "headers": {**headers, "Content-Encoding": "gzip"},
+        "body": encoded,
+        "isBase64Encoded": True,
+    }
+
+
 def _require_authorizer(event: dict) -> dict | None:
     """Off by default; flip REQUIRE_AUTHORIZER=true once API Gateway auth is wired."""
     if os.environ.get("REQUIRE_AUTHORIZER", "false").lower() != "true":
@@ -100,18 +264,20 @@ def _require_authorizer(event: dict) -> dict | None:
     return None
 
 
+def _client(key: str, service: str, region: str):
+    """Shared boto3 client, created once under the lock (client creation is not thread-safe)."""
+    with _LOCK:
+        if key not in _CLIENTS:
+            _CLIENTS[key] = boto3.client(service, region_name=region)
+        return _CLIENTS[key]
+
+
 def _cloudwatch_client():
-    if "cloudwatch" not in _CLIENTS:
-        region = os.environ.get("RUM_REGION", DEFAULT_RUM_REGION)
-        _CLIENTS["cloudwatch"] = boto3.client("cloudwatch", region_name=region)
-    return _CLIENTS["cloudwatch"]
+    return _client("cloudwatch", "cloudwatch", os.environ.get("RUM_REGION", DEFAULT_RUM_REGION))
 
 
 def _logs_client():
-    if "logs" not in _CLIENTS:
-        region = os.environ.get("RUM_REGION", DEFAULT_RUM_REGION)
-        _CLIENTS["logs"] = boto3.client("logs", region_name=region)
-    return _CLIENTS["logs"]
+    return _client("logs", "logs", os.environ.get("RUM_REGION", DEFAULT_RUM_REGION))
 
 
 def _cognito_metrics_client():
@@ -121,13 +287,23 @@ def _cognito_metrics_client():
     to RUM_REGION since today they share us-west-1, but keep it
     overridable via COGNITO_METRICS_REGION if the user pool moves.
     """
-    if "cognito_metrics" not in _CLIENTS:
-        region = os.environ.get(
-            "COGNITO_METRICS_REGION",
-            os.environ.get("RUM_REGION", DEFAULT_RUM_REGION),
-        )
-        _CLIENTS["cognito_metrics"] = boto3.client("cloudwatch", region_name=region)
-    return _CLIENTS["cognito_metrics"]
+    region = os.environ.get(
+        "COGNITO_METRICS_REGION",
+        os.environ.get("RUM_REGION", DEFAULT_RUM_REGION),
+    )
+    return _client("cognito_metrics", "cloudwatch", region)
+
+
+def _dynamodb_client():
+    return _client("dynamodb", "dynamodb", os.environ.get("AWS_REGION", DEFAULT_REGION))
+
+
+def _lambda_client():
+    return _client("lambda", "lambda", os.environ.get("AWS_REGION", DEFAULT_REGION))
+
+
+def _cache_table() -> str | None:
+    return os.environ.get("USAGE_CACHE_TABLE") or None
 
 
 def _rum_app_monitor() -> str:
@@ -149,8 +325,10 @@ def _parse_days(qs: dict | None) -> int:
 
 
 def _window(days: int) -> tuple[datetime, datetime]:
+    """Day-aligned window: the `days - 1` closed UTC days before today, plus today so far."""
     end = datetime.now(timezone.utc)  # noqa: UP017
-    return end - timedelta(days=days), end
+    midnight = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight - timedelta(days=days - 1), end
 
 
 # ---------------------------------------------------------------------
@@ -158,22 +336,57 @@ def _window(days: int) -> tuple[datetime, datetime]:
 # ---------------------------------------------------------------------
 
 
-def _get_metric_daily(metric_name: str, days: int, statistic: str) -> list[dict]:
-    """Daily series for a single AWS/RUM metric over the window."""
+def _rum_metric_query(query_id: str, metric_name: str, statistic: str) -> dict:
+    """GetMetricData query for one daily AWS/RUM metric statistic."""
+    return {
+        "Id": query_id,
+        "MetricStat": {
+            "Metric": {
+                "Namespace": "AWS/RUM",
+                "MetricName": metric_name,
+                "Dimensions": [{"Name": "application_name", "Value": _rum_app_monitor()}],
+            },
+            "Period": SECONDS_PER_DAY,
+            "Stat": statistic,
+        },
+        "ReturnData": True,
+    }
+
+
+def _get_metrics_daily(specs: dict[str, tuple[str, str]], days: int) -> dict[str, list[dict]]:
+    """Daily series for several AWS/RUM metrics in one GetMetricData round trip.
+
+    `specs` maps a query id (lowercase, used as the result key) to
+    (metric name, statistic). Returns {query id: [{"date", "value"}]}.
+    """
     start, end = _window(days)
-    resp = _cloudwatch_client().get_metric_statistics(
-        Namespace="AWS/RUM",
-        MetricName=metric_name,
-        Dimensions=[{"Name": "application_name", "Value": _rum_app_monitor()}],
-        StartTime=start,
-        EndTime=end,
-        Period=86400,
-        Statistics=[statistic],
-    )
-    points = sorted(resp.get("Datapoints", []), key=lambda p: p["Timestamp"])
-    return [
-        {"date": p["Timestamp"].strftime("%Y-%m-%d"), "value": float(p[statistic])} for p in points
-    ]
+    kwargs = {
+        "MetricDataQueries": [
+            _rum_metric_query(qid, metric, stat) for qid, (metric, stat) in specs.items()
+        ],
+        "StartTime": start,
+        "EndTime": end,
+        "ScanBy": "TimestampAscending",
+    }
+    points: dict[str, dict[datetime, float]] = {qid: {} for qid in specs}
+    while True:
+        resp = _cloudwatch_client().get_metric_data(**kwargs)
+        for result in resp.get("MetricDataResults", []):
+            series = points.get(result.get("Id", ""))
+            if series is None:
+                continue
+            for ts, value in zip(
+                result.get("Timestamps", []), result.get("Values", []), strict=False
+            ):
+                series[ts] = float(value)
+        next_token = resp.get("NextToken")
+        if not next_token:
+            break
+        kwargs["NextToken"] = next_token
+    return {
+        qid: [{"date": ts.strftime("%Y-%m-%d"), "value": v} for ts, v in sorted(series.items())]
+        for qid, series in points.items()
+    }
 
 
 def _sum_series(series: list[dict]) -> float:
@@ -195,39 +408,513 @@ def _row_to_dict(row: list[dict]) -> dict[str, str]:
     return {cell["field"]: cell["value"] for cell in row}
 
 
-def _run_insights_query(query_string: str, days: int) -> list[dict]:
-    """Submit a Logs Insights query and return result rows (may be partial)."""
-    client = _logs_client()
-    start, end = _window(days)
-    start_ts = int(start.timestamp())
-    end_ts = int(end.timestamp())
-    start_resp = client.start_query(
-        logGroupName=_rum_log_group(),
-        startTime=start_ts,
-        endTime=end_ts,
-        queryString=query_string,
-    )
-    query_id = start_resp["queryId"]
-    deadline = time.monotonic() + _QUERY_TIMEOUT_SECS
-    last_results: list[list[dict]] = []
-    while time.monotonic() < deadline:
+@contextlib.contextmanager
+def _traced(endpoint: str, days: int) -> Iterator[dict]:
+    """Collect the Insights query records made while computing one endpoint/window."""
+    trace = {"endpoint": endpoint, "days": days, "queries": []}
+    token = _TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _TRACE.reset(token)
+
+
+def _emit_emf(trace: dict, record: dict) -> None:
+    """Write one Embedded Metric Format line (stdout, so no logger prefix breaks the JSON)."""
+    doc = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": _EMF_NAMESPACE,
+                    "Dimensions": [["Endpoint", "Window"]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, unit, _f in _EMF_METRICS],
+                }
+            ],
+        },
+        "Endpoint": trace["endpoint"],
+        "Window": f"{trace['days']}d",
+        "Source": record["source"],
+        "Status": record["status"],
+        **{name: record[field] for name, _unit, field in _EMF_METRICS},
+    }
+    print(json.dumps(doc), flush=True)
+
+
+def _record_query(run: dict, key: _QueryKey, status: str) -> None:
+    """Record one finished, cancelled or never-started query on the current trace."""
+    stats = run["stats"].get(key, {})
+    started = run["started"].get(key)
+    record = {
+        "source": key[0],
+        "status": status,
+        "polls": run["polls"].get(key, 0),
+        "wall_ms": int((time.monotonic() - started) * 1000) if started is not None else 0,
+        "bytes_scanned": stats.get("bytesScanned", 0),
+        "records_scanned": stats.get("recordsScanned", 0),
+        "records_matched": stats.get("recordsMatched", 0),
+        "partial": int(status != "Complete"),
+    }
+    trace = _TRACE.get() or {"endpoint": "untraced", "days": 0, "queries": []}
+    trace["queries"].append(record)
+    _emit_emf(trace, record)
+
+
+def _submit_waiting(client, run: dict) -> None:
+    """Start waiting queries while there is room; LimitExceeded leaves them queued."""
+    while run["waiting"] and len(run["running"]) < _MAX_CONCURRENT_QUERIES:
+        key, (query_string, start, end) = run["waiting"][0]
+        try:
+            resp = client.start_query(
+                logGroupName=_rum_log_group(),
+                startTime=int(start.timestamp()),
+                endTime=int(end.timestamp()),
+                queryString=query_string,
+            )
+        except ClientError as err:
+            if err.response.get("Error", {}).get("Code") != "LimitExceededException":
+                raise
+            logger.info("Logs Insights concurrency limit hit; %d queued", len(run["waiting"]))
+            return
+        run["waiting"].pop(0)
+        run["running"].append((key, resp["queryId"]))
+        run["started"][key] = time.monotonic()
+
+
+def _poll_running(client, run: dict) -> list[tuple[_QueryKey, list[dict], bool]]:
+    """Poll every running query once; return (key, rows, complete) for those that finished."""
+    finished = []
+    for key, query_id in list(run["running"]):
         result = client.get_query_results(queryId=query_id)
-        last_results = result.get("results", [])
+        run["partial"][key] = result.get("results", [])
+        run["polls"][key] = run["polls"].get(key, 0) + 1
+        run["stats"][key] = result.get("statistics") or {}
         status = result.get("status")
-        if status == "Complete":
-            return [_row_to_dict(r) for r in last_results]
-        if status in ("Failed", "Cancelled", "Timeout"):
+        if status not in _QUERY_DONE_STATUSES:
+            continue
+        if status != "Complete":
             logger.warning("Logs Insights query %s ended with status %s", query_id, status)
-            return [_row_to_dict(r) for r in last_results]
-        time.sleep(_QUERY_POLL_INTERVAL_SECS)
-    logger.info(
-        "Logs Insights query %s exceeded %ss, returning partial",
-        query_id,
-        _QUERY_TIMEOUT_SECS,
+        run["running"].remove((key, query_id))
+        _record_query(run, key, status)
+        rows = [_row_to_dict(r) for r in run["partial"][key]]
+        finished.append((key, rows, status == "Complete"))
+    return finished
+
+
+def _cancel_outstanding(client, run: dict) -> list[tuple[_QueryKey, list[dict], bool]]:
+    """Stop queries still running at the deadline; return their partial rows."""
+    leftovers = []
+    for key, query_id in run["running"]:
+        logger.info("Logs Insights query %s hit the deadline, returning partial", query_id)
+        with contextlib.suppress(ClientError):
+            client.stop_query(queryId=query_id)
+        _record_query(run, key, "Deadline")
+        leftovers.append((key, [_row_to_dict(r) for r in run["partial"].get(key, [])], False))
+    for key, _job in run["waiting"]:
+        _record_query(run, key, "NotStarted")
+        leftovers.append((key, [], False))
+    return leftovers
+
+
+def _iter_insights_results(
+    jobs: dict[_QueryKey, tuple[str, datetime, datetime]], timeout: float = _QUERY_TIMEOUT_SECS
+) -> Iterator[tuple[_QueryKey, list[dict], bool]]:
+    """Run several Logs Insights queries at once; yield (key, rows, complete) as each finishes.
+
+    jobs maps a key to (query string, start, end). All queries share one deadline.
+    Whatever is still running when it passes is cancelled and yielded with its partial
+    rows; queries never started yield []. `complete` is True only for status Complete.
+    """
+    client = _logs_client()
+    run: dict = {
+        "waiting": list(jobs.items()),
+        "running": [],
+        "partial": {},
+        "started": {},
+        "polls": {},
+        "stats": {},
+    }
+    deadline = time.monotonic() + timeout
+    delay = _QUERY_POLL_MIN_SECS
+    while True:
+        _submit_waiting(client, run)
+        finished = _poll_running(client, run)
+        yield from finished
+        remaining = deadline - time.monotonic()
+        if not (run["waiting"] or run["running"]) or remaining <= 0:
+            break
+        delay = (
+            _QUERY_POLL_MIN_SECS
+            if finished
+            else min(_QUERY_POLL_MAX_SECS, delay * _QUERY_POLL_BACKOFF)
+        )
+        time.sleep(min(delay, remaining))
+    yield from _cancel_outstanding(client, run)
+
+
+def _row_day(row: dict, today: str) -> str:
+    """UTC day of a bin(1d) row, popping the bin field; rows without one count as today."""
+    stamp = row.pop(_INSIGHTS_DAY_FIELD, "")
+    return stamp[:10] if stamp else today
+
+
+def _span_days(start: datetime, end: datetime) -> list[str]:
+    """ISO days a midnight-aligned [start, end) span touches."""
+    days = []
+    day = start
+    while day < end:
+        days.append(day.strftime("%Y-%m-%d"))
+        day += timedelta(days=1)
+    return days
+
+
+def _split_span(start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    """Two adjoining halves of a query span: cut at a midnight when it covers more than a
+    day, else at its midpoint; [] once it is no longer than _SPLIT_MIN_SECS.
+
+    The first half ends a second before the cut because Logs Insights end times are
+    inclusive, so no event lands in both halves.
+    """
+    length = end - start
+    if length > timedelta(days=1):
+        cut = start + timedelta(days=math.ceil(length / timedelta(days=1)) // 2)
+    elif length.total_seconds() > _SPLIT_MIN_SECS:
+        cut = start + timedelta(seconds=int(length.total_seconds()) // 2)
+    else:
+        return []
+    return [(start, cut - timedelta(seconds=1)), (cut, end)]
+
+
+def _fetch_round(
+    queries: dict[str, str],
+    pieces: list[tuple[str, datetime, datetime]],
+    timeout: float,
+    fetched: dict[str, tuple[dict[str, list[dict]], set[str], set[str]]],
+    today: str,
+) -> list[tuple[str, datetime, datetime]]:
+    """Run every (source, start, end) piece at once into fetched; return pieces to re-query.
+
+    fetched[source] is (rows by ISO day, days covered, days seen incomplete). A piece whose
+    result reaches _DAILY_ROW_LIMIT was truncated: it is split and its rows are dropped, or,
+    once too small to split, kept and its days marked incomplete.
+    """
+    jobs: dict[_QueryKey, tuple[str, datetime, datetime]] = {
+        (source, i): (queries[source], start, end) for i, (source, start, end) in enumerate(pieces)
+    }
+    again: list[tuple[str, datetime, datetime]] = []
+    for (source, i), rows, complete in _iter_insights_results(jobs, timeout):
+        _source, start, end = pieces[i]
+        truncated = len(rows) >= _DAILY_ROW_LIMIT
+        halves = _split_span(start, end) if truncated else []
+        if truncated:
+            logger.warning(
+                "Logs Insights source %s hit the %s row limit over %s..%s; %s",
+                source,
+                _DAILY_ROW_LIMIT,
+                start.isoformat(),
+                end.isoformat(),
+                "splitting" if halves else "keeping truncated rows",
+            )
+        if halves:
+            again.extend((source, half_start, half_end) for half_start, half_end in halves)
+            continue
+        by_day, covered, incomplete = fetched[source]
+        for row in rows:
+            by_day[_row_day(row, today)].append(row)
+        days = _span_days(start, end)
+        (covered if complete and not truncated else incomplete).update(days)
+    return again
+
+
+def _bounded_spans(
+    spans: list[tuple[datetime, datetime]], max_days: int
+) -> list[tuple[datetime, datetime]]:
+    """Cut midnight-aligned spans into pieces of at most max_days days (0 = unbounded).
+
+    Each piece but the last of a span ends a second before the next starts, since Logs
+    Insights end times are inclusive.
+    """
+    if max_days <= 0:
+        return spans
+    step = timedelta(days=max_days)
+    pieces = []
+    for start, end in spans:
+        while end - start > step:
+            pieces.append((start, start + step - timedelta(seconds=1)))
+            start += step
+        pieces.append((start, end))
+    return pieces
+
+
+def _fetch_insights_days(
+    queries: dict[str, str],
+    timeout: float,
+    sources: list[str],
+    spans: list[tuple[datetime, datetime]],
+    span_days: dict[str, int] | None = None,
+) -> dict[str, tuple[dict[str, list[dict]], set[str]]]:
+    """Run each source's bin(1d) query over every span at once; split rows by UTC day.
+
+    span_days caps how many days one query of a source covers, for sources whose rows
+    per day would otherwise reach the row cap over a wide span. Spans whose results still
+    hit the cap are split and re-queried in further rounds, all within the one `timeout`.
+    Returns {source: (rows by ISO day, days covered only by queries that completed under
+    the cap)}; truncated or unfinished days are left out so they are never memoized.
+    """
+    span_days = span_days or {}
+    fetched: dict[str, tuple[dict[str, list[dict]], set[str], set[str]]] = {
+        source: (defaultdict(list), set(), set()) for source in sources
+    }
+    pieces = [
+        (source, start, end)
+        for source in sources
+        for start, end in _bounded_spans(spans, span_days.get(source, 0))
+    ]
+    today = spans[-1][1].strftime("%Y-%m-%d")
+    deadline = time.monotonic() + timeout
+    while pieces:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            for source, start, end in pieces:
+                fetched[source][2].update(_span_days(start, end))
+            break
+        pieces = _fetch_round(queries, pieces, remaining, fetched, today)
+    return {
+        source: (by_day, covered - incomplete)
+        for source, (by_day, covered, incomplete) in fetched.items()
+    }
+
+
+# ---------------------------------------------------------------------
+# Per-day memoization
+# ---------------------------------------------------------------------
+
+
+def _source_id(name: str, *definition: str) -> str:
+    """Memo namespace for a daily source; changes whenever its query or target changes."""
+    digest = hashlib.sha256("\n".join(definition).encode("utf-8")).hexdigest()[:12]
+    return f"{name}:{digest}"
+
+
+def _day_l1_put(source: str, day: str, rows: list[dict]) -> None:
+    with _LOCK:
+        _DAY_CACHE[(source, day)] = rows
+        _DAY_CACHE.move_to_end((source, day))
+        while len(_DAY_CACHE) > _DAY_CACHE_MAX_ENTRIES:
+            _DAY_CACHE.popitem(last=False)
+
+
+def _day_item_key(source: str, day: str) -> dict:
+    return {"pk": {"S": f"usageday:{source}"}, "sk": {"S": day}}
+
+
+def _day_l2_get(wanted: list[tuple[str, str]]) -> dict[tuple[str, str], list[dict]]:
+    """Memoized (source, day) rows from L2. Unprocessed keys and failures count as misses."""
+    table = _cache_table()
+    if not table or not wanted:
+        return {}
+    found: dict[tuple[str, str], list[dict]] = {}
+    try:
+        for i in range(0, len(wanted), _DDB_BATCH_GET_MAX):
+            keys = [_day_item_key(*k) for k in wanted[i : i + _DDB_BATCH_GET_MAX]]
+            resp = _dynamodb_client().batch_get_item(RequestItems={table: {"Keys": keys}})
+            for item in resp.get("Responses", {}).get(table, []):
+                source = item["pk"]["S"].removeprefix("usageday:")
+                found[(source, item["sk"]["S"])] = json.loads(item["rows"]["S"])
+    except (ClientError, KeyError, ValueError) as err:
+        logger.warning("usage day cache read failed: %s", err)
+    return found
+
+
+def _day_l2_put(source: str, rows_by_day: dict[str, list[dict]]) -> None:
+    """Write closed days to L2 in batches. Oversized days and failures are skipped."""
+    table = _cache_table()
+    if not table:
+        return
+    puts = []
+    for day, rows in rows_by_day.items():
+        encoded = json.dumps(rows)
+        if len(encoded) > _DDB_ITEM_MAX_BYTES:
+            logger.info("usage day cache: %s %s too large for L2", source, day)
+            continue
+        puts.append(
+            {"PutRequest": {"Item": {**_day_item_key(source, day), "rows": {"S": encoded}}}}
+        )
+    try:
+        for i in range(0, len(puts), _DDB_BATCH_WRITE_MAX):
+            _dynamodb_client().batch_write_item(
+                RequestItems={table: puts[i : i + _DDB_BATCH_WRITE_MAX]}
+            )
+    except ClientError as err:
+        logger.warning("usage day cache write failed for %s: %s", source, err)
+
+
+def _memoized_days(sources: list[str], closed: list[str]) -> dict[str, dict[str, list[dict]]]:
+    """{source: {day: rows}} for the closed days already memoized in L1, then L2."""
+    memo: dict[str, dict[str, list[dict]]] = {source: {} for source in sources}
+    misses = []
+    with _LOCK:
+        for source in sources:
+            for day in closed:
+                rows = _DAY_CACHE.get((source, day))
+                if rows is None:
+                    misses.append((source, day))
+                else:
+                    _DAY_CACHE.move_to_end((source, day))
+                    memo[source][day] = rows
+    for (source, day), rows in _day_l2_get(misses).items():
+        _day_l1_put(source, day, rows)
+        memo[source][day] = rows
+    return memo
+
+
+def _memoize_days(source: str, rows_by_day: dict[str, list[dict]]) -> None:
+    for day, rows in rows_by_day.items():
+        _day_l1_put(source, day, rows)
+    if rows_by_day:
+        _day_l2_put(source, rows_by_day)
+
+
+def _recent_rows(
+    sources: list[str], recent: list[str], today: str, now: float
+) -> dict[str, dict[str, list[dict]]] | None:
+    """Fresh cached rows of the recent days for every source, or None if any is missing
+    or stale."""
+    found = {}
+    for source in sources:
+        with _LOCK:
+            entry = _RECENT_CACHE.get(source)
+        if (
+            entry is None
+            or entry[1] != today
+            or now - entry[0] >= _CACHE_TTL_SECS
+            or any(day not in entry[2] for day in recent)
+        ):
+            return None
+        found[source] = entry[2]
+    return found
+
+
+def _remember_recent(fetched: dict, recent: list[str], today: str) -> None:
+    """Keep each source's recent days, when all of them completed."""
+    now = time.time()
+    with _LOCK:
+        for source, (by_day, done) in fetched.items():
+            if all(day in done for day in recent):
+                _RECENT_CACHE[source] = (now, today, {day: by_day.get(day, []) for day in recent})
+
+
+@contextlib.contextmanager
+def _sources_locked(sources: list[str]) -> Iterator[None]:
+    """Hold the per-source locks (in sorted order, so overlapping sets cannot deadlock)."""
+    with _LOCK:
+        locks = [_SOURCE_LOCKS.setdefault(source, threading.Lock()) for source in sorted(sources)]
+    with contextlib.ExitStack() as stack:
+        for lock in locks:
+            stack.enter_context(lock)
+        yield
+
+
+def _approx_max_days() -> int:
+    try:
+        return int(os.environ.get("USAGE_APPROX_MAX_DAYS", _DEFAULT_APPROX_MAX_DAYS))
+    except ValueError:
+        return _DEFAULT_APPROX_MAX_DAYS
+
+
+def _sample_days(missing: list[str], budget: int) -> tuple[list[str], list[str]]:
+    """(days to query, days to skip): all missing days, or evenly spread blocks of them.
+
+    Blocks are cut from the newest day backwards, so the most recent block is always
+    whole and always sampled. A budget smaller than a block shrinks the block to fit.
+    """
+    if budget <= 0 or len(missing) <= budget:
+        return missing, []
+    size = min(_APPROX_BLOCK_DAYS, budget)
+    blocks = [missing[max(0, i - size) : i] for i in range(len(missing), 0, -size)][::-1]
+    picks = max(1, budget // size)
+    last = len(blocks) - 1
+    chosen = {last} if picks == 1 else {round(i * last / (picks - 1)) for i in range(picks)}
+    sampled = [day for i, block in enumerate(blocks) if i in chosen for day in block]
+    return sampled, [day for day in missing if day not in sampled]
+
+
+def _day_spans(days: list[str], end: datetime) -> list[tuple[datetime, datetime]]:
+    """Contiguous runs of `days` plus today as query windows; the last one ends at `end`."""
+    midnight = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    starts = sorted(
+        {datetime.strptime(d, "%Y-%m-%d").replace(tzinfo=timezone.utc) for d in days}  # noqa: UP017
+        | {midnight}
     )
-    with contextlib.suppress(ClientError):
-        client.stop_query(queryId=query_id)
-    return [_row_to_dict(r) for r in last_results]
+    spans: list[tuple[datetime, datetime]] = []
+    for day in starts:
+        if spans and spans[-1][1] == day:
+            spans[-1] = (spans[-1][0], day + timedelta(days=1))
+        else:
+            spans.append((day, day + timedelta(days=1)))
+    spans[-1] = (spans[-1][0], end)
+    return spans
+
+
+def _daily_rows(
+    sources: list[str], days: int, fetch, budget: int
+) -> tuple[dict[str, list[dict]], float, bool]:
+    """Serialized per source: a concurrent caller waits, then reuses the first fetch."""
+    with _sources_locked(sources):
+        return _load_daily_rows(sources, days, fetch, budget)
+
+
+def _weighted(rows: list[dict], closed: int, skipped: int) -> tuple[list[dict], float]:
+    """Scale closed-day rows up for skipped days; returns (rows, closed-day coverage)."""
+    if not skipped:
+        return rows, 1.0
+    coverage = (closed - skipped) / closed
+    return [{**row, _WEIGHT_FIELD: 1 / coverage} for row in rows], coverage
+
+
+def _load_daily_rows(
+    sources: list[str], days: int, fetch, budget: int
+) -> tuple[dict[str, list[dict]], float, bool]:
+    """Rows for each source over the window, the sampled share of closed days, and
+    whether any fetched day came back incomplete (deadline or row cap).
+
+    fetch(sources, spans) returns {source: (rows by ISO day, completed days)}; it runs once
+    over the missing settled days (sampled down to `budget` days, 0 = exact) plus the
+    recent days: closed days still within _DAY_SETTLE_SECS, and today. Completed settled
+    days are memoized (empty days included); recent days are only reused for
+    _CACHE_TTL_SECS, and only when no settled day needs fetching.
+    """
+    start, end = _window(days)
+    closed = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days - 1)]
+    today = end.strftime("%Y-%m-%d")
+    last_settled = (end - timedelta(seconds=_DAY_SETTLE_SECS, days=1)).strftime("%Y-%m-%d")
+    settled = [day for day in closed if day <= last_settled]
+    recent = [day for day in closed if day > last_settled] + [today]
+    memo = _memoized_days(sources, settled)
+    missing = [day for day in settled if any(day not in memo[s] for s in sources)]
+    sampled, skipped = _sample_days(missing, budget)
+    cached = None if sampled else _recent_rows(sources, recent, today, time.time())
+    if cached is None:
+        fetched = fetch(sources, _day_spans(sampled + recent[:-1], end))
+        _remember_recent(fetched, recent, today)
+    else:
+        fetched = {source: (by_day, set(by_day)) for source, by_day in cached.items()}
+    out = {}
+    coverage = 1.0
+    partial_days = False
+    for source in sources:
+        by_day, done = fetched.get(source, ({}, set()))
+        fresh = {day: by_day.get(day, []) for day in sampled if day not in memo[source]}
+        _memoize_days(source, {day: rows for day, rows in fresh.items() if day in done})
+        partial_days = partial_days or any(d not in done for d in [*fresh, *recent])
+        known = {**memo[source], **fresh, **{day: by_day.get(day, []) for day in recent}}
+        unknown = sum(1 for day in skipped if day not in known)
+        rows, source_coverage = _weighted(
+            [row for day in closed for row in known.get(day, [])], len(closed), unknown
+        )
+        coverage = min(coverage, source_coverage)
+        out[source] = rows + by_day.get(today, [])
+    return out, coverage, partial_days
 
 
 # ---------------------------------------------------------------------
@@ -235,39 +922,50 @@ def _run_insights_query(query_string: str, days: int) -> list[dict]:
 # ---------------------------------------------------------------------
 
 
+_SUMMARY_METRICS = {
+    "sessions": ("SessionCount", "Sum"),
+    "page_views": ("PageViewCount", "Sum"),
+    "avg_duration": ("SessionDuration", "Average"),
+    "pvps": ("PageViewCountPerSession", "Average"),
+    "js_errors": ("JsErrorCount", "Sum"),
+    "http_4xx": ("Http4xxCountPerPageView", "Average"),
+    "http_5xx": ("Http5xxCountPerPageView", "Average"),
+}
+
+# FID is fetched alongside INP and only used when INP has no datapoints.
+_WEBVITALS_METRICS = {
+    "lcp": ("WebVitalsLargestContentfulPaint", "Average"),
+    "cls": ("WebVitalsCumulativeLayoutShift", "Average"),
+    "inp": ("WebVitalsInteractionToNextPaint", "Average"),
+    "fid": ("WebVitalsFirstInputDelay", "Average"),
+}
+
+
 def _summary(days: int) -> dict:
-    sessions_series = _get_metric_daily("SessionCount", days, "Sum")
-    page_views_series = _get_metric_daily("PageViewCount", days, "Sum")
-    avg_duration_series = _get_metric_daily("SessionDuration", days, "Average")
-    pvps_series = _get_metric_daily("PageViewCountPerSession", days, "Average")
-    js_errors_series = _get_metric_daily("JsErrorCount", days, "Sum")
-    http_4xx_series = _get_metric_daily("Http4xxCountPerPageView", days, "Average")
-    http_5xx_series = _get_metric_daily("Http5xxCountPerPageView", days, "Average")
-
-    sessions = int(_sum_series(sessions_series))
-    page_views = int(_sum_series(page_views_series))
+    series = _get_metrics_daily(_SUMMARY_METRICS, days)
+    sessions = int(_sum_series(series["sessions"]))
+    page_views = int(_sum_series(series["page_views"]))
     return {
         "data": {
             "sessions": sessions,
             "page_views": page_views,
-            "avg_session_duration_seconds": _avg_series(avg_duration_series),
-            "page_views_per_session": _avg_series(pvps_series),
-            "js_error_count": int(_sum_series(js_errors_series)),
-            "http_4xx_per_page_view": _avg_series(http_4xx_series),
-            "http_5xx_per_page_view": _avg_series(http_5xx_series),
+            "avg_session_duration_seconds": _avg_series(series["avg_duration"]),
+            "page_views_per_session": _avg_series(series["pvps"]),
+            "js_error_count": int(_sum_series(series["js_errors"])),
+            "http_4xx_per_page_view": _avg_series(series["http_4xx"]),
+            "http_5xx_per_page_view": _avg_series(series["http_5xx"]),
             "daily": {
-                "sessions": sessions_series,
-                "page_views": page_views_series,
+                "sessions": series["sessions"],
+                "page_views": series["page_views"],
             },
         }
     }
 
 
 def _webvitals(days: int) -> dict:
-    lcp = _get_metric_daily("WebVitalsLargestContentfulPaint", days, "Average")
-    cls = _get_metric_daily("WebVitalsCumulativeLayoutShift", days, "Average")
-    inp = _get_metric_daily("WebVitalsInteractionToNextPaint", days, "Average")
-    interaction = inp if inp else _get_metric_daily("WebVitalsFirstInputDelay", days, "Average")
+    series = _get_metrics_daily(_WEBVITALS_METRICS, days)
+    lcp, cls, inp = series["lcp"], series["cls"], series["inp"]
+    interaction = inp if inp else series["fid"]
     return {
         "data": {
             "lcp_seconds": _avg_series(lcp),
@@ -282,38 +980,122 @@ def _webvitals(days: int) -> dict:
     }
 
 
-def _top_pages(days: int) -> dict:
-    query = (
+# PageView dimensions (output alias -> RUM field). Pages, sections, devices and geography
+# all roll up from one query grouped by every dimension, so they share a single scan.
+_PAGEVIEW_DIMENSIONS = {
+    "page": "event_details.page",
+    "section": "event_details.section",
+    "device": "metadata.deviceType",
+    "browser": "metadata.browserName",
+    "country": "metadata.countryCode",
+    "region": "metadata.subdivisionCode",
+}
+
+
+def _pageview_daily_query() -> str:
+    # coalesce keeps events missing a dimension in the other dimensions' totals.
+    aliases = ", ".join(
+        f'coalesce({field}, "") as {alias}' for alias, field in _PAGEVIEW_DIMENSIONS.items()
+    )
+    return (
         f'filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"\n'
         f'| filter event_details.event_type = "PageView"\n'
-        f"| stats count() as views by event_details.page\n"
-        f"| sort views desc\n"
-        f"| limit 20"
+        f"| fields {aliases}\n"
+        f"| stats count() as views by {_INSIGHTS_DAY_FIELD}, {', '.join(_PAGEVIEW_DIMENSIONS)}\n"
+        f"| limit {_DAILY_ROW_LIMIT}"
     )
-    rows = _run_insights_query(query, days)
-    items = [
-        {"page": r.get("event_details.page", ""), "views": _safe_int(r.get("views"))}
-        for r in rows
-        if r.get("event_details.page")
-    ]
-    return _list_payload(items)
 
 
-def _top_sections(days: int) -> dict:
-    query = (
+# The combined PageView query returns one row per day and dimension combination, so a
+# wide cold span could reach _DAILY_ROW_LIMIT; each of its queries covers at most this
+# many days (they run concurrently, so a cold 90-day window costs no extra latency).
+_QUERY_SPAN_DAYS = {"pageviews": 7}
+
+# Additive Insights sources, each grouped by UTC day so closed days can be memoized.
+_DAILY_QUERIES = {
+    "pageviews": _pageview_daily_query(),
+    "videos": (
         f'filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"\n'
-        f'| filter event_details.event_type = "PageView"\n'
-        f"| stats count() as views by event_details.section\n"
-        f"| sort views desc\n"
-        f"| limit 20"
-    )
-    rows = _run_insights_query(query, days)
-    items = [
-        {"section": r.get("event_details.section", ""), "views": _safe_int(r.get("views"))}
-        for r in rows
-        if r.get("event_details.section")
-    ]
-    return _list_payload(items)
+        f'| filter event_details.event_type in ["VideoPlay","VideoComplete","VideoPause"]\n'
+        f"| stats count() as cnt, avg(event_details.watchedSeconds) as avg_watched\n"
+        f"  by {_INSIGHTS_DAY_FIELD}, event_details.event_type, event_details.technique\n"
+        f"| limit {_DAILY_ROW_LIMIT}"
+    ),
+    "errors": (
+        f'filter event_type = "{_RUM_JS_ERROR_EVENT_TYPE}"\n'
+        f"| stats count() as count by {_INSIGHTS_DAY_FIELD}, "
+        f"event_details.message, metadata.pageId\n"
+        f"| limit {_DAILY_ROW_LIMIT}"
+    ),
+}
+
+
+def _insights_daily(
+    names: list[str], days: int, timeout: float = _QUERY_TIMEOUT_SECS, exact: bool = False
+) -> tuple[dict[str, list[dict]], float, bool]:
+    """Per-day rows of the named _DAILY_QUERIES over the window, plus closed-day coverage
+    and whether any day came back incomplete.
+
+    Queries run together. Unless `exact`, wide cold windows are sampled (see
+    _sample_days) and the returned rows carry a scale-up weight.
+    """
+    log_group = _rum_log_group()
+    ids = {name: _source_id(name, _DAILY_QUERIES[name], log_group) for name in names}
+    queries = {ids[name]: _DAILY_QUERIES[name] for name in names}
+    span_days = {ids[name]: _QUERY_SPAN_DAYS[name] for name in names if name in _QUERY_SPAN_DAYS}
+    fetch = partial(_fetch_insights_days, queries, timeout, span_days=span_days)
+    budget = 0 if exact else _approx_max_days()
+    rows, coverage, incomplete = _daily_rows(list(queries), days, fetch, budget)
+    return {name: rows[source] for name, source in ids.items()}, coverage, incomplete
+
+
+def _row_weight(row: dict) -> float:
+    return float(row.get(_WEIGHT_FIELD, 1.0))
+
+
+def _approximate(body: dict, coverage: float, incomplete: bool = False) -> dict:
+    """Mark a body computed from sampled days with its sampling ratio, and one missing
+    rows (a query cut off or truncated at the row cap) as partial."""
+    if coverage < 1.0:
+        body["approximate"] = True
+        body["sampling_ratio"] = round(coverage, 3)
+    if incomplete:
+        body["approximate"] = True
+        body["partial"] = True
+    return body
+
+
+def _sum_rows(
+    rows: list[dict], group_by: tuple[str, ...], count_field: str, limit: int
+) -> list[dict]:
+    """Merge per-day rows: total count_field per group, top `limit` by total.
+
+    Rows with an empty leading group field are dropped.
+    """
+    totals: dict[tuple[str, ...], float] = defaultdict(float)
+    for r in rows:
+        if r.get(group_by[0]):
+            key = tuple(r.get(f, "") for f in group_by)
+            totals[key] += _safe_int(r.get(count_field)) * _row_weight(r)
+    ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return [{**dict(zip(group_by, key, strict=True)), count_field: round(n)} for key, n in ranked]
+
+
+def _pageview_rows(days: int) -> tuple[list[dict], float, bool]:
+    rows, coverage, incomplete = _insights_daily(["pageviews"], days)
+    return rows["pageviews"], coverage, incomplete
+
+
+def _top_pages(days: int) -> dict:
+    rows, coverage, incomplete = _pageview_rows(days)
+    body = _list_payload(_sum_rows(rows, ("page",), "views", 20))
+    return _approximate(body, coverage, incomplete)
+
+
+def _top_sections(days: int) -> dict:
+    rows, coverage, incomplete = _pageview_rows(days)
+    body = _list_payload(_sum_rows(rows, ("section",), "views", 20))
+    return _approximate(body, coverage, incomplete)
 
 
 _VIDEO_EVT_TO_FIELD = {
@@ -327,7 +1109,7 @@ def _new_video_bucket() -> dict[str, float]:
     return {"plays": 0, "completes": 0, "pauses": 0, "_watched_sum": 0.0, "_watched_n": 0}
 
 
-def _aggregate_video_row(bucket: dict[str, float], evt: str, cnt: int, avg_watched: str) -> None:
+def _aggregate_video_row(bucket: dict[str, float], evt: str, cnt: float, avg_watched: str) -> None:
     field = _VIDEO_EVT_TO_FIELD.get(evt)
     if field is not None:
         bucket[field] += cnt
@@ -348,154 +1130,136 @@ def _video_row(tech: str, b: dict[str, float]) -> dict:
 
 
 def _top_videos(days: int) -> dict:
-    """Aggregate VideoPlay/Complete/Pause per technique into a single row each."""
-    query = (
-        f'filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"\n'
-        f'| filter event_details.event_type in ["VideoPlay","VideoComplete","VideoPause"]\n'
-        f"| stats count() as cnt, avg(event_details.watchedSeconds) as avg_watched\n"
-        f"  by event_details.event_type, event_details.technique\n"
-        f"| sort cnt desc\n"
-        f"| limit 200"
-    )
-    rows = _run_insights_query(query, days)
+    """Aggregate VideoPlay/Complete/Pause per technique into a single row each.
+
+    Per-day rows of the same technique merge here too; watch time stays count-weighted.
+    """
+    rows, coverage, incomplete = _insights_daily(["videos"], days)
     by_tech: dict[str, dict[str, float]] = defaultdict(_new_video_bucket)
-    for r in rows:
+    for r in rows["videos"]:
         tech = r.get("event_details.technique") or ""
         if not tech:
             continue
         _aggregate_video_row(
             by_tech[tech],
             r.get("event_details.event_type", ""),
-            _safe_int(r.get("cnt")),
+            _safe_int(r.get("cnt")) * _row_weight(r),
             r.get("avg_watched", ""),
         )
     items: list[dict] = [_video_row(tech, b) for tech, b in by_tech.items()]
     items.sort(key=lambda x: int(x["plays"]), reverse=True)
-    return _list_payload(items[:20])
+    return _approximate(_list_payload(items[:20]), coverage, incomplete)
 
 
 def _top_errors(days: int) -> dict:
-    query = (
-        f'filter event_type = "{_RUM_JS_ERROR_EVENT_TYPE}"\n'
-        f"| stats count() as count by event_details.message, metadata.pageId\n"
-        f"| sort count desc\n"
-        f"| limit 20"
-    )
-    rows = _run_insights_query(query, days)
+    daily, coverage, incomplete = _insights_daily(["errors"], days)
+    rows = _sum_rows(daily["errors"], ("event_details.message", "metadata.pageId"), "count", 20)
     items = [
-        {
-            "message": r.get("event_details.message", ""),
-            "page": r.get("metadata.pageId", ""),
-            "count": _safe_int(r.get("count")),
-        }
+        {"message": r["event_details.message"], "page": r["metadata.pageId"], "count": r["count"]}
         for r in rows
-        if r.get("event_details.message")
     ]
-    return _list_payload(items)
+    return _approximate(_list_payload(items), coverage, incomplete)
 
 
 def _devices(days: int) -> dict:
-    device_query = (
-        f'filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"\n'
-        f'| filter event_details.event_type = "PageView"\n'
-        f"| stats count() as views by metadata.deviceType\n"
-        f"| sort views desc\n"
-        f"| limit 20"
-    )
-    browser_query = (
-        f'filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"\n'
-        f'| filter event_details.event_type = "PageView"\n'
-        f"| stats count() as views by metadata.browserName\n"
-        f"| sort views desc\n"
-        f"| limit 20"
-    )
-    devices = _label_rows(_run_insights_query(device_query, days), "metadata.deviceType", "device")
-    browsers = _label_rows(
-        _run_insights_query(browser_query, days), "metadata.browserName", "browser"
-    )
+    rows, coverage, incomplete = _pageview_rows(days)
+    devices = _sum_rows(rows, ("device",), "views", 20)
+    browsers = _sum_rows(rows, ("browser",), "views", 20)
     if not devices and not browsers:
         return {"data": {"devices": [], "browsers": []}, "note": "no events in window"}
-    return {"data": {"devices": devices, "browsers": browsers}}
+    return _approximate({"data": {"devices": devices, "browsers": browsers}}, coverage, incomplete)
 
 
 def _geography(days: int) -> dict:
-    country_query = (
-        f'filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"\n'
-        f'| filter event_details.event_type = "PageView"\n'
-        f"| stats count() as views by metadata.countryCode\n"
-        f"| sort views desc\n"
-        f"| limit 20"
-    )
-    region_query = (
-        f'filter event_type = "{_RUM_CUSTOM_EVENT_TYPE}"\n'
-        f'| filter event_details.event_type = "PageView"\n'
-        f"| stats count() as views by metadata.countryCode, metadata.subdivisionCode\n"
-        f"| sort views desc\n"
-        f"| limit 50"
-    )
-    countries = _label_rows(
-        _run_insights_query(country_query, days), "metadata.countryCode", "country"
-    )
-    region_rows = _run_insights_query(region_query, days)
-    regions = [
-        {
-            "country": r.get("metadata.countryCode", ""),
-            "region": r.get("metadata.subdivisionCode", ""),
-            "views": _safe_int(r.get("views")),
-        }
-        for r in region_rows
-        if r.get("metadata.countryCode")
-    ]
+    rows, coverage, incomplete = _pageview_rows(days)
+    countries = _sum_rows(rows, ("country",), "views", 20)
+    regions = _sum_rows(rows, ("country", "region"), "views", 50)
     if not countries and not regions:
         return {"data": {"countries": [], "regions": []}, "note": "no events in window"}
-    return {"data": {"countries": countries, "regions": regions}}
+    body = {"data": {"countries": countries, "regions": regions}}
+    return _approximate(body, coverage, incomplete)
+
+
+def _sign_in_query(user_pool_id: str) -> dict:
+    # SignInSuccesses is published per (UserPool, UserPoolClient). A
+    # Metrics Insights SELECT with SUM aggregates across UserPoolClient
+    # without us having to enumerate app clients ourselves.
+    return {
+        "Id": "signins",
+        # CloudWatch Metrics Insights, not SQL; user_pool_id sourced from Lambda env.
+        "Expression": (
+            f"SELECT SUM(SignInSuccesses) "  # noqa: S608
+            f'FROM SCHEMA("AWS/Cognito", UserPool, UserPoolClient) '
+            f"WHERE UserPool = '{user_pool_id}'"
+        ),
+        "Period": SECONDS_PER_DAY,
+        "ReturnData": True,
+    }
+
+
+def _fetch_sign_in_span(user_pool_id: str, start: datetime, end: datetime, by_day: dict) -> bool:
+    """Add daily SignInSuccesses over [start, end) to by_day; True if every result completed."""
+    kwargs = {
+        "MetricDataQueries": [_sign_in_query(user_pool_id)],
+        "StartTime": start,
+        "EndTime": end,
+        "ScanBy": "TimestampAscending",
+    }
+    complete = True
+    while True:
+        resp = _cognito_metrics_client().get_metric_data(**kwargs)
+        for result in resp.get("MetricDataResults", []):
+            complete = complete and result.get("StatusCode", "Complete") == "Complete"
+            for ts, v in zip(result.get("Timestamps", []), result.get("Values", []), strict=False):
+                day = ts.strftime("%Y-%m-%d")
+                by_day[day] = [{"day": day, "value": float(v)}]
+        next_token = resp.get("NextToken")
+        if not next_token:
+            return complete
+        kwargs["NextToken"] = next_token
+
+
+def _fetch_sign_in_days(
+    user_pool_id: str, sources: list[str], spans: list[tuple[datetime, datetime]]
+) -> dict[str, tuple[dict[str, list[dict]], set[str]]]:
+    """Daily SignInSuccesses per span, one {"day", "value"} row per day."""
+    by_day: dict[str, list[dict]] = {}
+    done: set[str] = set()
+    for start, end in spans:
+        if _fetch_sign_in_span(user_pool_id, start, end, by_day):
+            done.update(_span_days(start, end))
+    return dict.fromkeys(sources, (by_day, done))
+
+
+def _sign_in_daily(user_pool_id: str, days: int) -> list[dict]:
+    """Per-day {"day", "value"} SignInSuccesses rows over the window (never sampled)."""
+    source = _source_id("signins", user_pool_id)
+    fetch = partial(_fetch_sign_in_days, user_pool_id)
+    rows, _coverage, _incomplete = _daily_rows([source], days, fetch, 0)
+    return rows[source]
 
 
 def _cognito_weekly_sign_ins(days: int) -> dict:
     """Return weekly SignInSuccesses totals for the user pool, plus the trailing average.
 
     `days` is the lookup window; we floor it to whole weeks (>=1) so each
-    bucket is a full 7 days. Daily datapoints are fetched then summed
-    into weekly buckets on the Lambda side — simpler and less brittle
-    than asking CloudWatch for a 7-day Period.
+    bucket is a full 7 days. Daily datapoints (closed days memoized) are
+    summed into weekly buckets on the Lambda side — simpler and less
+    brittle than asking CloudWatch for a 7-day Period.
     """
     user_pool_id = os.environ.get("AWS_COGNITO_USER_POOL_ID")
     if not user_pool_id:
         return {"data": None, "error": "AWS_COGNITO_USER_POOL_ID not configured"}
 
     weeks = max(1, days // 7)
-    end = datetime.now(timezone.utc)  # noqa: UP017
-    start = end - timedelta(days=weeks * 7)
-
-    # SignInSuccesses is published per (UserPool, UserPoolClient). A
-    # Metrics Insights SELECT with SUM aggregates across UserPoolClient
-    # without us having to enumerate app clients ourselves.
-    resp = _cognito_metrics_client().get_metric_data(
-        MetricDataQueries=[
-            {
-                "Id": "signins",
-                # CloudWatch Metrics Insights, not SQL; user_pool_id sourced from Lambda env.
-                "Expression": (
-                    f"SELECT SUM(SignInSuccesses) "  # noqa: S608
-                    f'FROM SCHEMA("AWS/Cognito", UserPool, UserPoolClient) '
-                    f"WHERE UserPool = '{user_pool_id}'"
-                ),
-                "Period": SECONDS_PER_DAY,
-                "ReturnData": True,
-            }
-        ],
-        StartTime=start,
-        EndTime=end,
-        ScanBy="TimestampAscending",
-    )
-    results = resp.get("MetricDataResults", [])
-    points = results[0] if results else {"Timestamps": [], "Values": []}
+    start, _end = _window(weeks * 7)
+    rows = _sign_in_daily(user_pool_id, weeks * 7)
 
     buckets: list[float] = [0.0] * weeks
-    for ts, v in zip(points.get("Timestamps", []), points.get("Values", []), strict=False):
-        offset_days = (ts - start).days
-        idx = min(weeks - 1, max(0, offset_days // 7))
-        buckets[idx] += float(v)
+    for row in rows:
+        day = datetime.strptime(row["day"], "%Y-%m-%d").replace(tzinfo=timezone.utc)  # noqa: UP017
+        idx = min(weeks - 1, max(0, (day - start).days // 7))
+        buckets[idx] += float(row["value"])
 
     series = [
         {
@@ -508,12 +1272,6 @@ def _cognito_weekly_sign_ins(days: int) -> dict:
     return {"data": {"weeks": series, "average_per_week": avg, "weeks_counted": weeks}}
 
 
-def _label_rows(rows: list[dict], field: str, label: str) -> list[dict]:
-    return [
-        {label: r.get(field, ""), "views": _safe_int(r.get("views"))} for r in rows if r.get(field)
-    ]
-
-
 def _list_payload(items: list[dict]) -> dict:
     if not items:
         return {"data": [], "note": "no events in window"}
@@ -552,23 +1310,236 @@ _ENDPOINTS = {
 }
 
 
-def _cached(endpoint: str, days: int, fn) -> dict:
-    """Return cached body if present and unexpired; otherwise compute, cache, return."""
-    key = (endpoint, days)
-    now = time.monotonic()
-    entry = _CACHE.get(key)
-    if entry and entry[0] > now:
-        cached: dict = entry[1]
-        return cached
+def _cache_key(endpoint: str, days: int) -> tuple[str, int, str]:
+    """(endpoint, days, UTC day the window ends on)."""
+    return endpoint, days, datetime.now(timezone.utc).strftime("%Y-%m-%d")  # noqa: UP017
+
+
+def _l1_get(key: tuple[str, int, str], now: float) -> tuple[float, dict] | None:
+    """Fresh L1 entry (computed_at, body), refreshing its LRU position; else None."""
+    with _LOCK:
+        entry = _CACHE.get(key)
+        if entry is None or now - entry[0] >= _CACHE_TTL_SECS:
+            return None
+        _CACHE.move_to_end(key)
+        return entry
+
+
+def _l1_put(key: tuple[str, int, str], computed_at: float, body: dict) -> None:
+    with _LOCK:
+        _CACHE[key] = (computed_at, body)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _L1_MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+
+
+def _l2_item_key(key: tuple[str, int, str]) -> dict:
+    endpoint, days, window_day = key
+    return {"pk": {"S": f"usage:{endpoint}:{days}"}, "sk": {"S": window_day}}
+
+
+def _l2_get(key: tuple[str, int, str]) -> tuple[float, dict] | None:
+    """L2 entry (computed_at, body) or None. Read failures degrade to a miss."""
+    table = _cache_table()
+    if not table:
+        return None
+    try:
+        resp = _dynamodb_client().get_item(
+            TableName=table, Key=_l2_item_key(key), ConsistentRead=False
+        )
+        item = resp.get("Item")
+        if not item:
+            return None
+        return float(item["computed_at"]["N"]), json.loads(item["body"]["S"])
+    except (ClientError, KeyError, ValueError) as err:
+        logger.warning("usage cache read failed for %s: %s", key, err)
+        return None
+
+
+def _l2_put(key: tuple[str, int, str], computed_at: float, body: dict) -> None:
+    """Write an L2 entry (clearing any refresh lock). Failures are logged, not raised."""
+    table = _cache_table()
+    if not table:
+        return
+    item = {
+        **_l2_item_key(key),
+        "computed_at": {"N": str(computed_at)},
+        "body": {"S": json.dumps(body)},
+        "expires_at": {"N": str(int(computed_at + _CACHE_STALE_SECS))},
+    }
+    try:
+        _dynamodb_client().put_item(TableName=table, Item=item)
+    except ClientError as err:
+        logger.warning("usage cache write failed for %s: %s", key, err)
+
+
+def _claim_refresh(key: tuple[str, int, str], now: float) -> bool:
+    """Set a short refresh lock on the L2 item; False if another refresh holds it."""
+    try:
+        _dynamodb_client().update_item(
+            TableName=_cache_table(),
+            Key=_l2_item_key(key),
+            UpdateExpression="SET refreshing_until = :until",
+            ConditionExpression=(
+                "attribute_exists(pk) AND "
+                "(attribute_not_exists(refreshing_until) OR refreshing_until < :now)"
+            ),
+            ExpressionAttributeValues={
+                ":until": {"N": str(int(now + _CACHE_REFRESH_LOCK_SECS))},
+                ":now": {"N": str(int(now))},
+            },
+        )
+        return True
+    except ClientError as err:
+        if err.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            logger.warning("usage cache refresh lock failed for %s: %s", key, err)
+        return False
+
+
+def _trigger_refresh(endpoint: str, days: int, key: tuple[str, int, str], now: float) -> bool:
+    """Async self-invoke to recompute a stale entry. True if a refresh was started."""
+    function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+    if not function_name or not _claim_refresh(key, now):
+        return False
+    payload = {_REFRESH_EVENT_KEY: {"path": endpoint, "days": days}}
+    try:
+        _lambda_client().invoke(
+            FunctionName=function_name,
+            InvocationType="Event",
+            Payload=json.dumps(payload).encode("utf-8"),
+        )
+        return True
+    except ClientError as err:
+        logger.warning("usage cache refresh invoke failed for %s: %s", key, err)
+        return False
+
+
+def _etag(body: dict) -> str:
+    """Validator for a cached body's data: same data, same tag, whenever it was computed.
+    Sent weak (W/), since the cache metadata in the body and its encoding vary."""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _with_cache_meta(body: dict, layer: str, computed_at: float, now: float, **extra) -> dict:
+    age = int(max(0.0, now - computed_at))
+    meta = {"layer": layer, "age_seconds": age, **extra}
+    max_age = 0 if extra.get("stale") else max(0, _CACHE_TTL_SECS - age)
+    return {**body, "cache": meta, _HTTP_KEY: {"etag": _etag(body), "max_age": max_age}}
+
+
+def _compute_and_store(endpoint: str, days: int, fn) -> tuple[float, dict]:
+    key = _cache_key(endpoint, days)
     body: dict = fn(days)
-    _CACHE[key] = (now + _CACHE_TTL_SECS, body)
-    return body
+    computed_at = time.time()
+    _l1_put(key, computed_at, body)
+    if "error" not in body:
+        _l2_put(key, computed_at, body)
+    return computed_at, body
+
 
+def _cached(endpoint: str, days: int, fn) -> dict:
+    """Serve from L1, then L2 (stale-while-revalidate), else compute and fill both.
 
-def _dispatch(path: str, days: int) -> dict:
+    The returned body carries a "cache" object: layer (l1 / l2 / miss), age_seconds,
+    and for L2 hits whether the entry was stale and a refresh was triggered.
+    """
+    key = _cache_key(endpoint, days)
+    now = time.time()
+    entry = _l1_get(key, now)
+    if entry:
+        return _with_cache_meta(entry[1], "l1", entry[0], now)
+    entry = _l2_get(key)
+    if entry and now - entry[0] < _CACHE_STALE_SECS:
+        computed_at, body = entry
+        if now - computed_at < _CACHE_TTL_SECS:
+            _l1_put(key, computed_at, body)
+            return _with_cache_meta(body, "l2", computed_at, now, stale=False)
+        refreshing = _trigger_refresh(endpoint, days, key, now)
+        return _with_cache_meta(body, "l2", computed_at, now, stale=True, refreshing=refreshing)
+    computed_at, body = _compute_and_store(endpoint, days, fn)
+    return _with_cache_meta(body, "miss", computed_at, now)
+
+
+def _refresh(event: dict) -> dict:
+    """Async refresh invocation: recompute one endpoint/window and rewrite both cache tiers."""
+    request = event.get(_REFRESH_EVENT_KEY) or {}
+    path = request.get("path", "")
     handler = _ENDPOINTS.get(path)
     if handler is None:
-        return {"data": None, "error": f"Unknown endpoint: {path}"}
+        return {"refreshed": False, "error": f"Unknown endpoint: {path}"}
+    days = _parse_days({"days": str(request.get("days", ""))})
+    try:
+        with _traced(path, days):
+            _compute_and_store(path, days, handler)
+    except ClientError as err:
+        logger.warning("usage cache refresh failed for %s: %s", path, err)
+        return {"refreshed": False, "error": str(err)}
+    return {"refreshed": True, "path": path, "days": days}
+
+
+def _materialize_rollups() -> dict:
+    """Scheduled run: fill the L2 day memo of every additive source over _ROLLUP_DAYS.
+
+    Days already memoized are read, not queried, so after the first run each invocation
+    only scans the days still settling (plus today). Partial queries store nothing and
+    are retried by the next run.
+    """
+    if not _cache_table():
+        return {"materialized": False, "error": "USAGE_CACHE_TABLE not configured"}
+    try:
+        with _traced("rollup", _ROLLUP_DAYS):
+            rows, _coverage, incomplete = _insights_daily(
+                list(_DAILY_QUERIES), _ROLLUP_DAYS, _ROLLUP_QUERY_TIMEOUT_SECS, exact=True
+            )
+            counts = {name: len(r) for name, r in rows.items()}
+            user_pool_id = os.environ.get("AWS_COGNITO_USER_POOL_ID")
+            if user_pool_id:
+                counts["signins"] = len(_sign_in_daily(user_pool_id, _ROLLUP_DAYS))
+    except ClientError as err:
+        logger.warning("usage rollup failed: %s", err)
+        return {"materialized": False, "error": str(err)}
+    logger.info("usage rollup rows over %s days: %s", _ROLLUP_DAYS, counts)
+    return {"materialized": True, "days": _ROLLUP_DAYS, "rows": counts, "partial": incomplete}
+
+
+def _warm_one(path: str, days: int) -> str | None:
+    """Recompute one endpoint/window into the response cache; the error text on failure."""
+    try:
+        with _traced(path, days):
+            _computed_at, body = _compute_and_store(path, days, _ENDPOINTS[path])
+    except Exception as err:  # noqa: BLE001
+        logger.warning("usage cache warm failed for %s %sd: %s", path, days, err)
+        return str(err)
+    return body.get("error")
+
+
+def _warm(event: dict) -> dict:
+    """Scheduled warm-up: every endpoint for each configured window, windows narrowest first.
+
+    Endpoints of one window run concurrently; narrower windows fill the day memo that
+    wider ones then reuse. Requires USAGE_CACHE_TABLE: without L2 only the L1 of whichever
+    container the schedule reaches would be warmed, which real requests rarely hit.
+    """
+    if not _cache_table():
+        return {"warmed": [], "error": "USAGE_CACHE_TABLE not configured"}
+    request = event.get(_WARM_EVENT_KEY) or {}
+    raw = request.get("days") or _DEFAULT_WARM_WINDOWS
+    if not isinstance(raw, list | tuple):
+        raw = [raw]
+    windows = sorted({_parse_days({"days": str(d)}) for d in raw})
+    errors = {}
+    with ThreadPoolExecutor(max_workers=_ALL_MAX_WORKERS) as pool:
+        for days in windows:
+            futures = {path: pool.submit(_warm_one, path, days) for path in _ENDPOINTS}
+            for path, future in futures.items():
+                error = future.result()
+                if error:
+                    errors[f"{path}?days={days}"] = error
+    return {"warmed": windows, "endpoints": len(_ENDPOINTS), "errors": errors}
+
+
+def _serve(path: str, days: int, handler) -> dict:
     try:
         return _cached(path, days, handler)
     except ClientError as err:
@@ -579,8 +1550,76 @@ def _dispatch(path: str, days: int) -> dict:
         return {"data": None, "error": str(err)}
 
 
+def _dispatch(path: str, days: int, debug_timing: bool = False) -> dict:
+    handler = _ENDPOINTS.get(path)
+    if handler is None:
+        return {"data": None, "error": f"Unknown endpoint: {path}"}
+    started = time.monotonic()
+    with _traced(path, days) as trace:
+        body = _serve(path, days, handler)
+    if debug_timing:
+        wall_ms = int((time.monotonic() - started) * 1000)
+        body["timing"] = {"wall_ms": wall_ms, "queries": trace["queries"]}
+    return body
+
+
+def _parse_debug_timing(qs: dict | None) -> bool:
+    """True for ?debug=timing."""
+    return (qs or {}).get("debug") == "timing"
+
+
+def _parse_sections(qs: dict | None) -> list[str]:
+    """Read ?sections=summary,devices (default: every endpoint), de-duplicated."""
+    raw = (qs or {}).get("sections") or ""
+    wanted = [name.strip() for name in raw.split(",") if name.strip()]
+    if not wanted:
+        return [path.removeprefix(_SECTION_PREFIX) for path in _ENDPOINTS]
+    return list(dict.fromkeys(wanted))
+
+
+def _combined_http(parts: dict[str, dict | None]) -> dict | None:
+    """Validators for a multi-section body: one tag over every section's tag, the
+    shortest remaining TTL. None if any section was not served from the cache."""
+    cached = {name: http for name, http in parts.items() if http is not None}
+    if not cached or len(cached) != len(parts):
+        return None
+    tags = json.dumps({name: http["etag"] for name, http in cached.items()}, sort_keys=True)
+    return {
+        "etag": hashlib.sha256(tags.encode("utf-8")).hexdigest()[:32],
+        "max_age": min(http["max_age"] for http in cached.values()),
+    }
+
+
+def _all_sections(days: int, sections: list[str], debug_timing: bool = False) -> dict:
+    """Compute sections concurrently; each one succeeds or fails on its own.
+
+    data maps section -> the body its own endpoint would return; failed sections
+    are also listed under errors.
+    """
+    with ThreadPoolExecutor(max_workers=min(_ALL_MAX_WORKERS, len(sections))) as pool:
+        futures = {
+            name: pool.submit(_dispatch, _SECTION_PREFIX + name, days, debug_timing)
+            for name in sections
+        }
+    data = {name: future.result() for name, future in futures.items()}
+    body: dict = {"data": data}
+    http = _combined_http({name: section.pop(_HTTP_KEY, None) for name, section in data.items()})
+    if http:
+        body[_HTTP_KEY] = http
+    errors = {name: section["error"] for name, section in data.items() if section.get("error")}
+    if errors:
+        body["errors"] = errors
+    return body
+
+
 def lambda_handler(event: dict, _context) -> dict:
-    """API Gateway proxy handler for /usage/* GET endpoints."""
+    """API Gateway proxy handler for /usage/* GETs, plus cache refresh, warm and rollup events."""
+    if _REFRESH_EVENT_KEY in event:
+        return _refresh(event)
+    if _WARM_EVENT_KEY in event:
+        return _warm(event)
+    if event.get("detail-type") == _SCHEDULED_DETAIL_TYPE:
+        return _materialize_rollups()
     method = event.get("httpMethod")
     path = event.get("path", "")
     if method == "OPTIONS":
@@ -590,7 +1629,14 @@ def lambda_handler(event: dict, _context) -> dict:
         return auth_err
     if method != "GET":
         return _error_response(HTTP_BAD_REQUEST, f"Unsupported method: {method}")
-    days = _parse_days(event.get("queryStringParameters"))
-    body = _dispatch(path, days)
+    qs = event.get("queryStringParameters")
+    days = _parse_days(qs)
+    debug_timing = _parse_debug_timing(qs)
+    if path == _ALL_PATH:
+        body = _all_sections(days, _parse_sections(qs), debug_timing)
+    else:
+        body = _dispatch(path, days, debug_timing)
+    http = body.pop(_HTTP_KEY, None)
     body["days"] = days
-    return _success_response(body)
+    # Timing output is per request, so it is never validated or cached by the client.
+    return _http_response(event, body, None if debug_timing else http)
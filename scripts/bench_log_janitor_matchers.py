@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark log-janitor scope/retention matching over a synthetic log group inventory.
+
+Compares the original per-call loops (lowercasing every pattern for every group) with the
+precompiled matchers in lambdas/log-janitor/matchers.py. Pure CPU; no AWS calls.
+
+Usage:
+  python scripts/bench_log_janitor_matchers.py [--count 100000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "lambdas" / "log-janitor"))
+
+from matchers import compile_matchers, scoped_target_days  # noqa: E402
+
+_PREFIXES = ["/aws/lambda/", "/aws/iot/", "/aws/apigateway/", "/ecs/", "/aws/rds/", "/custom/"]
+_WORDS = ["billing", "cognito", "video", "auth", "prod", "dev", "ota", "report", "sync", "token"]
+
+
+def build_config(exception_count: int) -> dict:
+    """Janitor config resembling production defaults, plus exceptions."""
+    return {
+        "log_group_include_prefixes": ["/aws/lambda/", "/aws/iot/"],
+        "log_group_exclude_patterns": ["dev", "test", "sandbox", "experimental"],
+        "high_risk_patterns": ["cognito", "provision", "ota", "auth", "signup", "token"],
+        "log_group_exceptions": {f"/aws/lambda/exception-{i}": 365 for i in range(exception_count)},
+        "default_retention_days": 90,
+        "high_risk_retention_days": 180,
+    }
+
+
+def build_inventory(count: int, seed: int) -> list[str]:
+    """Synthetic log group names with realistic prefixes and word mixes."""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        words = "-".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 3)))
+        names.append(f"{rng.choice(_PREFIXES)}suigetsukan-{words}-{i}")
+    return names
+
+
+def naive_in_scope(name: str, config: dict) -> bool:
+    """Original _is_log_group_in_scope."""
+    if not any(name.startswith(p) for p in config["log_group_include_prefixes"]):
+        return False
+    return not any(pat.lower() in name.lower() for pat in config["log_group_exclude_patterns"])
+
+
+def naive_target(name: str, config: dict):
+    """Original _get_target_retention_days."""
+    exceptions = config["log_group_exceptions"]
+    if name in exceptions:
+        return int(exceptions[name])
+    if any(pat.lower() in name.lower() for pat in config["high_risk_patterns"]):
+        return config["high_risk_retention_days"]
+    return config["default_retention_days"]
+
+
+def run_naive(names: list[str], config: dict) -> list:
+    """Evaluate every name with the original functions."""
+    return [naive_target(n, config) if naive_in_scope(n, config) else None for n in names]
+
+
+def run_compiled(names: list[str], config: dict) -> list:
+    """Compile once, then evaluate every name."""
+    m = compile_matchers(config)
+    return [scoped_target_days(n, m) for n in names]
+
+
+def best_of(fn, names: list[str], config: dict, repeat: int) -> tuple[float, list]:
+    """Best wall time over repeat runs, plus the last result."""
+    best = float("inf")
+    out: list = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(names, config)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark log-janitor log group matchers.")
+    parser.add_argument("--count", type=int, default=100_000, help="Synthetic log groups")
+    parser.add_argument("--exceptions", type=int, default=500, help="Exception entries")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (best kept)")
+    parser.add_argument("--seed", type=int, default=7, help="RNG seed")
+    args = parser.parse_args()
+
+    config = build_config(args.exceptions)
+    names = build_inventory(args.count, args.seed)
+    naive_secs, naive_out = best_of(run_naive, names, config, args.repeat)
+    compiled_secs, compiled_out = best_of(run_compiled, names, config, args.repeat)
+    if naive_out != compiled_out:
+        print("ERROR: compiled matchers disagree with the original logic", file=sys.stderr)
+        sys.exit(1)
+
+    in_scope_count = sum(1 for r in compiled_out if r is not None)
+    print(f"log groups: {args.count}  in scope: {in_scope_count}")
+    print(f"naive:    {naive_secs * 1000:8.1f} ms  ({naive_secs / args.count * 1e6:.2f} us/group)")
+    print(
+        f"compiled: {compiled_secs * 1000:8.1f} ms  "
+        f"({compiled_secs / args.count * 1e6:.2f} us/group)"
+    )
+    print(f"speedup:  {naive_secs / compiled_secs:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
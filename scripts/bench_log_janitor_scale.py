@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Scale benchmark for log-janitor against an in-memory fake AWS account.
+
+Builds fake logs, cloudwatch, lambda, dynamodb, sns, cloudtrail and s3 clients with
+configurable inventories (e.g. 50k log groups, 2k Lambdas), paginated listings,
+injected per-call latency and injected throttling on writes, then runs lambda_handler
+in each requested mode against the same account (so APPLY leaves it remediated for the
+next run). Reports wall time, simulated time, API calls per service and peak memory.
+
+By default time is virtual: injected latency and rate-limiter waits advance a simulated
+clock instead of sleeping, so "sim" is the serial time the calls would take and "wall"
+is the janitor's own CPU cost. Use --real-time to actually sleep. No AWS calls are made.
+
+Usage:
+  python scripts/bench_log_janitor_scale.py [--log-groups 50000] [--functions 2000]
+      [--modes AUDIT,APPLY,APPLY] [--latency-ms 20] [--throttle-rate 0.01]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "lambdas" / "log-janitor"))
+
+import app as janitor  # noqa: E402
+
+_PAGE_SIZES = {
+    "describe_log_groups": 50,
+    "describe_metric_filters": 50,
+    "describe_alarms": 100,
+    "list_functions": 50,
+    "list_tables": 100,
+    "list_topics": 100,
+}
+_TRAIL_LOG_GROUP = "aws-cloudtrail-logs"
+_TRAIL_BUCKET = "bench-cloudtrail"
+_PAB_KEYS = ("BlockPublicAcls", "BlockPublicPolicy", "IgnorePublicAcls", "RestrictPublicBuckets")
+
+
+def _error(code: str, op: str) -> ClientError:
+    """ClientError with the given code, as botocore would raise it."""
+    return ClientError({"Error": {"Code": code, "Message": code}}, op)
+
+
+# ---------------------------------------------------------------------------
+# Fake account state
+# ---------------------------------------------------------------------------
+
+
+def _split(total: int, regions: list[str]) -> dict:
+    """Spread total items across regions as evenly as possible."""
+    base, extra = divmod(total, len(regions))
+    return {r: base + (1 if i < extra else 0) for i, r in enumerate(regions)}
+
+
+def _region_inventory(region: str, counts: dict, rng: random.Random, drift: float) -> dict:
+    """Inventory for one region; `drift` of in-scope log groups get a wrong retention."""
+    groups = {}
+    for i in range(counts["log_groups"]):
+        prefix = "/aws/lambda/" if i % 4 else "/ecs/"
+        groups[f"{prefix}bench-{region}-{i}"] = 90 if rng.random() >= drift else None
+    groups[_TRAIL_LOG_GROUP] = 365
+    return {
+        "log_groups": groups,
+        "functions": [f"suigetsukan-fn-{region}-{i}" for i in range(counts["functions"])],
+        "tables": [f"mother-hen-{region}-{i}" for i in range(counts["tables"])],
+        "topics": [f"arn:aws:sns:{region}:123:bench-{i}" for i in range(counts["topics"])],
+        "alarms": {},
+        "filters": {},
+        "dashboards": {},
+    }
+
+
+def _bucket(region: str, hardened: bool) -> dict:
+    """One fake bucket's posture settings."""
+    return {"region": region, "pab": hardened, "versioning": hardened, "encryption": hardened}
+
+
+def build_account(args: argparse.Namespace) -> dict:
+    """Populate a fake account from the CLI inventory sizes."""
+    rng = random.Random(args.seed)
+    regions = args.regions
+    per_region = {
+        key: _split(getattr(args, key), regions)
+        for key in ("log_groups", "functions", "tables", "topics")
+    }
+    buckets = {_TRAIL_BUCKET: _bucket(regions[0], True)}
+    for i in range(args.buckets):
+        buckets[f"backup-bench-{i}"] = _bucket(regions[i % len(regions)], rng.random() >= 0.5)
+    return {
+        "regions": {
+            r: _region_inventory(r, {k: v[r] for k, v in per_region.items()}, rng, args.drift)
+            for r in regions
+        },
+        "buckets": buckets,
+        "objects": {},
+        "calls": Counter(),
+        "lock": threading.Lock(),
+        "rng": rng,
+        "latency": args.latency_ms / 1000.0,
+        "throttle_rate": args.throttle_rate,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Operation handlers: fn(account, region, **kwargs) -> response
+# ---------------------------------------------------------------------------
+
+
+def _put_retention(acct, region, logGroupName, retentionInDays):
+    acct["regions"][region]["log_groups"][logGroupName] = retentionInDays
+    return {}
+
+
+def _put_metric_filter(acct, region, **kw):
+    filters = acct["regions"][region]["filters"].setdefault(kw["logGroupName"], {})
+    filters[kw["filterName"]] = kw
+    return {}
+
+
+def _put_alarm(acct, region, **kw):
+    acct["regions"][region]["alarms"][kw["AlarmName"]] = kw
+    return {}
+
+
+def _get_dashboard(acct, region, DashboardName):
+    body = acct["regions"][region]["dashboards"].get(DashboardName)
+    if body is None:
+        raise _error("ResourceNotFound", "GetDashboard")
+    return {"DashboardBody": body}
+
+
+def _put_dashboard(acct, region, DashboardName, DashboardBody):
+    acct["regions"][region]["dashboards"][DashboardName] = DashboardBody
+    return {"DashboardValidationMessages": []}
+
+
+def _describe_trails(acct, _region, **_kw):
+    home = next(iter(acct["regions"]))
+    trail = {
+        "Name": "bench-trail",
+        "S3BucketName": _TRAIL_BUCKET,
+        "IsMultiRegionTrail": True,
+        "LogFileValidationEnabled": True,
+        "HomeRegion": home,
+    }
+    return {"trailList": [trail]}
+
+
+def _list_buckets(acct, _region):
+    return {"Buckets": [{"Name": name} for name in sorted(acct["buckets"])]}
+
+
+def _bucket_state(acct, bucket):
+    if bucket not in acct["buckets"]:
+        raise _error("NoSuchBucket", "GetBucket")
+    return acct["buckets"][bucket]
+
+
+def _get_bucket_location(acct, _region, Bucket):
+    region = _bucket_state(acct, Bucket)["region"]
+    return {"LocationConstraint": None if region == "us-east-1" else region}
+
+
+def _get_public_access_block(acct, _region, Bucket):
+    if not _bucket_state(acct, Bucket)["pab"]:
+        raise _error("NoSuchPublicAccessBlockConfiguration", "GetPublicAccessBlock")
+    return {"PublicAccessBlockConfiguration": dict.fromkeys(_PAB_KEYS, True)}
+
+
+def _get_bucket_versioning(acct, _region, Bucket):
+    return {"Status": "Enabled"} if _bucket_state(acct, Bucket)["versioning"] else {}
+
+
+def _get_bucket_encryption(acct, _region, Bucket):
+    if not _bucket_state(acct, Bucket)["encryption"]:
+        raise _error("ServerSideEncryptionConfigurationNotFoundError", "GetBucketEncryption")
+    return {"ServerSideEncryptionConfiguration": {"Rules": [{}]}}
+
+
+def _get_bucket_lifecycle(acct, _region, Bucket):
+    rules = _bucket_state(acct, Bucket).get("lifecycle")
+    if not rules:
+        raise _error("NoSuchLifecycleConfiguration", "GetBucketLifecycleConfiguration")
+    return {"Rules": rules}
+
+
+def _set_bucket(field, value_of):
+    """Handler that stores value_of(kwargs) into one bucket field."""
+
+    def handler(acct, _region, Bucket, **kw):
+        _bucket_state(acct, Bucket)[field] = value_of(kw)
+        return {}
+
+    return handler
+
+
+def _get_object(acct, _region, Bucket, Key):
+    body = acct["objects"].get((Bucket, Key))
+    if body is None:
+        raise _error("NoSuchKey", "GetObject")
+    return {"Body": io.BytesIO(body)}
+
+
+def _put_object(acct, _region, Bucket, Key, Body, **_kw):
+    acct["objects"][(Bucket, Key)] = Body
+    return {}
+
+
+_HANDLERS: dict[str, dict[str, Callable[..., dict]]] = {
+    "logs": {
+        "put_retention_policy": _put_retention,
+        "put_metric_filter": _put_metric_filter,
+    },
+    "cloudwatch": {
+        "put_metric_alarm": _put_alarm,
+        "put_composite_alarm": _put_alarm,
+        "get_dashboard": _get_dashboard,
+        "put_dashboard": _put_dashboard,
+    },
+    "cloudtrail": {
+        "describe_trails": _describe_trails,
+        "get_trail_status": lambda _a, _r, **_kw: {"IsLogging": True},
+    },
+    "sns": {"publish": lambda _a, _r, **_kw: {"MessageId": "bench"}},
+    "s3": {
+        "list_buckets": _list_buckets,
+        "get_bucket_location": _get_bucket_location,
+        "get_public_access_block": _get_public_access_block,
+        "get_bucket_versioning": _get_bucket_versioning,
+        "get_bucket_encryption": _get_bucket_encryption,
+        "get_bucket_lifecycle_configuration": _get_bucket_lifecycle,
+        "put_public_access_block": _set_bucket("pab", lambda _kw: True),
+        "put_bucket_versioning": _set_bucket("versioning", lambda _kw: True),
+        "put_bucket_encryption": _set_bucket("encryption", lambda _kw: True),
+        "put_bucket_lifecycle_configuration": _set_bucket(
+            "lifecycle", lambda kw: kw["LifecycleConfiguration"]["Rules"]
+        ),
+        "get_object": _get_object,
+        "put_object": _put_object,
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# Paginated listings: fn(account, region, **kwargs) -> (result key, items)
+# ---------------------------------------------------------------------------
+
+
+def _list_log_groups(acct, region):
+    groups = acct["regions"][region]["log_groups"]
+    return "logGroups", [{"logGroupName": n, "retentionInDays": d} for n, d in groups.items()]
+
+
+def _list_metric_filters(acct, region, logGroupName, filterNamePrefix=""):
+    filters = acct["regions"][region]["filters"].get(logGroupName, {})
+    return "metricFilters", [f for n, f in filters.items() if n.startswith(filterNamePrefix)]
+
+
+def _list_alarms(acct, region, AlarmNamePrefix="", AlarmTypes=("MetricAlarm",)):
+    alarms = acct["regions"][region]["alarms"]
+    matched = [a for n, a in alarms.items() if n.startswith(AlarmNamePrefix)]
+    if "MetricAlarm" not in AlarmTypes:
+        return "MetricAlarms", []
+    return "MetricAlarms", [a for a in matched if "AlarmRule" not in a]
+
+
+_LISTINGS: dict[tuple[str, str], Callable[..., tuple]] = {
+    ("logs", "describe_log_groups"): _list_log_groups,
+    ("logs", "describe_metric_filters"): _list_metric_filters,
+    ("cloudwatch", "describe_alarms"): _list_alarms,
+    ("lambda", "list_functions"): lambda a, r: (
+        "Functions",
+        [{"FunctionName": n} for n in a["regions"][r]["functions"]],
+    ),
+    ("dynamodb", "list_tables"): lambda a, r: ("TableNames", list(a["regions"][r]["tables"])),
+    ("sns", "list_topics"): lambda a, r: (
+        "Topics",
+        [{"TopicArn": t} for t in a["regions"][r]["topics"]],
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Fake clients
+# ---------------------------------------------------------------------------
+
+
+def _record_call(acct: dict, service: str, op: str, write: bool) -> None:
+    """Count one call, apply injected latency and maybe raise an injected throttle."""
+    with acct["lock"]:
+        acct["calls"][f"{service}.{op}"] += 1
+        throttled = write and acct["rng"].random() < acct["throttle_rate"]
+    if acct["latency"]:
+        time.sleep(acct["latency"])
+    if throttled:
+        with acct["lock"]:
+            acct["calls"][f"{service}.{op}:throttled"] += 1
+        raise _error("ThrottlingException", op)
+
+
+def _call(acct, service, region, op, handler, **kwargs):
+    """Dispatch one fake API call."""
+    write = op.startswith(("put_", "delete_", "publish"))
+    _record_call(acct, service, op, write)
+    with acct["lock"]:
+        return handler(acct, region, **kwargs)
+
+
+def _paginate(acct, service, region, op, **kwargs):
+    """Yield pages of a listing; each page counts as one API call."""
+    key, items = _LISTINGS[(service, op)](acct, region, **kwargs)
+    size = _PAGE_SIZES[op]
+    for start in range(0, max(len(items), 1), size):
+        _record_call(acct, service, op, write=False)
+        yield {key: items[start : start + size]}
+
+
+def _paginator(acct, service, region, op):
+    """Fake get_paginator; unknown listings fail loudly so new janitor calls get a fake."""
+    if (service, op) not in _LISTINGS:
+        raise NotImplementedError(f"fake {service} has no paginator {op}")
+    return SimpleNamespace(paginate=partial(_paginate, acct, service, region, op))
+
+
+def make_client_factory(acct: dict, default_region: str):
+    """Return a boto3.client replacement backed by acct."""
+
+    def client(service, region_name=None, **_kw):
+        region = region_name or default_region
+        ops = {
+            op: partial(_call, acct, service, region, op, handler)
+            for op, handler in _HANDLERS.get(service, {}).items()
+        }
+        return SimpleNamespace(
+            meta=SimpleNamespace(region_name=region),
+            get_paginator=partial(_paginator, acct, service, region),
+            **ops,
+        )
+
+    return client
+
+
+# ---------------------------------------------------------------------------
+# Clock, environment and reporting
+# ---------------------------------------------------------------------------
+
+
+def _virtual_clock() -> dict:
+    """monotonic/sleep pair where sleeping only advances a shared counter."""
+    state = {"now": 0.0}
+    lock = threading.Lock()
+
+    def sleep(secs):
+        with lock:
+            state["now"] += max(0.0, secs)
+
+    return {"state": state, "sleep": sleep, "monotonic": lambda: state["now"]}
+
+
+def janitor_env(args: argparse.Namespace, mode: str) -> dict:
+    """Environment for one handler run with every stage enabled."""
+    return {
+        "MODE": mode,
+        "REGIONS": ",".join(args.regions),
+        "LOG_GROUP_INCLUDE_PREFIXES": "/aws/lambda/",
+        "LOG_GROUP_EXCLUDE_PATTERNS": "dev,test,sandbox,experimental",
+        "ENABLE_RETENTION": "true",
+        "ENABLE_ALARMS": "true",
+        "ENABLE_DASHBOARD": "true",
+        "ENABLE_CLOUDTRAIL_TRIPWIRES": "true",
+        "ENABLE_CLOUDTRAIL_S3_POSTURE": "true",
+        "CLOUDTRAIL_LOG_GROUP_NAME": _TRAIL_LOG_GROUP,
+        "S3_POSTURE_BUCKET_PREFIXES": "backup-",
+        "CRITICAL_LAMBDA_PREFIXES": "suigetsukan-",
+        "DDB_TABLE_PREFIXES": "mother-hen-",
+        "SNS_TOPIC_PREFIXES": "bench-",
+        "ALARM_STRATEGY": args.alarm_strategy,
+        "ALARM_SNS_TOPIC_ARN": "arn:aws:sns:us-east-2:123:alarms",
+        "STATE_SNAPSHOT_BUCKET": _TRAIL_BUCKET if args.snapshot else "",
+    }
+
+
+def run_once(args: argparse.Namespace, acct: dict, mode: str) -> dict:
+    """Run lambda_handler once; return timings, call counts and peak memory."""
+    clock = _virtual_clock()
+    patches: list = [
+        patch.dict(os.environ, janitor_env(args, mode)),
+        patch("boto3.client", make_client_factory(acct, args.regions[0])),
+    ]
+    if not args.real_time:
+        patches += [
+            patch("time.sleep", clock["sleep"]),
+            patch("time.monotonic", clock["monotonic"]),
+        ]
+    acct["calls"].clear()
+    for p in patches:
+        p.start()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = janitor.lambda_handler({}, None)
+    finally:
+        wall = time.perf_counter() - start
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        for p in reversed(patches):
+            p.stop()
+    return {
+        "mode": mode,
+        "wall": wall,
+        "sim": clock["state"]["now"],
+        "peak_mb": peak / 1e6,
+        "calls": Counter(acct["calls"]),
+        "result": result,
+    }
+
+
+def _by_service(calls: Counter) -> Counter:
+    """Collapse 'service.op' counts to per-service totals (throttled calls excluded)."""
+    totals: Counter = Counter()
+    for key, n in calls.items():
+        if not key.endswith(":throttled"):
+            totals[key.split(".", 1)[0]] += n
+    return totals
+
+
+def _summary_line(run: dict) -> str:
+    """One-line outcome of a run from the handler result."""
+    f = run["result"]["findings"]
+    ret, alarms = f.get("retention", {}), f.get("alarms", {})
+    tw = f.get("cloudtrail_tripwires", {})
+    return (
+        f"retention scanned={ret.get('scanned', 0)} drifted={ret.get('drifted', 0)} "
+        f"fixed={ret.get('fixed', 0)} | alarms scanned={alarms.get('scanned', 0)} "
+        f"created={alarms.get('created', 0)} | tripwires drifted={tw.get('drifted', 0)} | "
+        f"errors={len(run['result']['errors'])}"
+    )
+
+
+def print_report(run: dict, verbose: bool) -> None:
+    """Print one run's numbers."""
+    calls = run["calls"]
+    throttled = sum(n for k, n in calls.items() if k.endswith(":throttled"))
+    total = sum(calls.values()) - throttled
+    print(f"\n== {run['mode']} ==")
+    print(f"wall: {run['wall']:.2f}s  sim: {run['sim']:.1f}s  peak memory: {run['peak_mb']:.1f} MB")
+    print(f"api calls: {total}  throttled: {throttled}")
+    for service, n in sorted(_by_service(calls).items()):
+        print(f"  {service:<11} {n:>8}")
+    if verbose:
+        for key, n in sorted(calls.items()):
+            print(f"    {key:<50} {n:>8}")
+    print(_summary_line(run))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark log-janitor on a fake account.")
+    parser.add_argument("--log-groups", type=int, default=50_000, help="Total log groups")
+    parser.add_argument("--functions", type=int, default=2_000, help="Total Lambda functions")
+    parser.add_argument("--tables", type=int, default=200, help="Total DynamoDB tables")
+    parser.add_argument("--topics", type=int, default=50, help="Total SNS topics")
+    parser.add_argument("--buckets", type=int, default=100, help="Prefix-matched S3 buckets")
+    parser.add_argument("--regions", default="us-east-2", help="Comma-separated regions")
+    parser.add_argument("--drift", type=float, default=0.05, help="Fraction of drifted groups")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latency per API call")
+    parser.add_argument("--throttle-rate", type=float, default=0.01, help="Write throttle odds")
+    parser.add_argument("--modes", default="AUDIT,APPLY,APPLY", help="Runs, in order")
+    parser.add_argument("--alarm-strategy", default="per_resource", help="ALARM_STRATEGY")
+    parser.add_argument("--snapshot", action="store_true", help="Enable S3 state snapshots")
+    parser.add_argument("--real-time", action="store_true", help="Really sleep")
+    parser.add_argument("--seed", type=int, default=7, help="RNG seed")
+    parser.add_argument("--verbose", action="store_true", help="Per-operation call counts")
+    args = parser.parse_args()
+    args.regions = [r.strip() for r in args.regions.split(",") if r.strip()]
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    acct = build_account(args)
+    print(
+        f"inventory: {args.log_groups} log groups, {args.functions} functions, "
+        f"{args.tables} tables, {args.topics} topics, {args.buckets} buckets "
+        f"in {len(args.regions)} region(s); latency {args.latency_ms}ms, "
+        f"throttle {args.throttle_rate:.1%}, clock {'real' if args.real_time else 'virtual'}"
+    )
+    runs = [run_once(args, acct, m.strip().upper()) for m in args.modes.split(",") if m.strip()]
+    for run in runs:
+        print_report(run, args.verbose)
+    if args.verbose:
+        print(json.dumps(runs[-1]["result"]["execution_metadata"], indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ existing BillingAPI / CognitoAPI:
   - resource:        /usage
   - proxy resource:  /usage/{proxy+}      (ANY method, AWS_PROXY integration)
   - OPTIONS         MOCK integration returning CORS headers
+  - binary media:    */*  (the Lambda returns gzip bodies base64-encoded with
+                     isBase64Encoded; API Gateway only decodes them to bytes when
+                     binary media types cover the response)
   - stage:           prod1
 
 After running, prints the invoke URL to plug into
@@ -39,6 +42,7 @@ LAMBDA_STATEMENT_ID = "UsageAPIInvoke"
 CORS_HEADERS = "'Content-Type,Authorization,X-Amz-Date,X-Api-Key,X-Amz-Security-Token'"
 CORS_METHODS = "'GET,OPTIONS'"
 CORS_ORIGIN = "'*'"
+BINARY_MEDIA_TYPES = ["*/*"]
 
 
 def _get_account_id(session: boto3.Session) -> str:
@@ -54,16 +58,31 @@ def _find_api(apigw, name: str) -> dict | None:
     return None
 
 
+def _ensure_binary_media_types(apigw, api: dict) -> None:
+    missing = [t for t in BINARY_MEDIA_TYPES if t not in api.get("binaryMediaTypes", [])]
+    if not missing:
+        return
+    apigw.update_rest_api(
+        restApiId=api["id"],
+        patchOperations=[
+            {"op": "add", "path": "/binaryMediaTypes/" + t.replace("/", "~1")} for t in missing
+        ],
+    )
+    print(f"  Added binary media types: {', '.join(missing)}")
+
+
 def _ensure_api(apigw) -> str:
     api = _find_api(apigw, API_NAME)
     if api:
         print(f"  Found existing {API_NAME} (id={api['id']})")
+        _ensure_binary_media_types(apigw, api)
         return cast(str, api["id"])
     print(f"  Creating REST API: {API_NAME}")
     resp = apigw.create_rest_api(
         name=API_NAME,
         description="Read-only CloudWatch RUM usage stats for the admin Statistics page.",
         endpointConfiguration={"types": ["REGIONAL"]},
+        binaryMediaTypes=BINARY_MEDIA_TYPES,
     )
     return cast(str, resp["id"])
 
@@ -109,7 +128,6 @@ def _put_proxy_any(apigw, api_id: str, resource_id: str, lambda_arn: str, region
         integrationHttpMethod="POST",
         uri=uri,
         passthroughBehavior="WHEN_NO_MATCH",
-        contentHandling="CONVERT_TO_TEXT",
     )
     print("  Wired ANY → AWS_PROXY → Lambda")
 
@@ -145,6 +163,9 @@ def _put_options_mock(apigw, api_id: str, resource_id: str) -> None:
         type="MOCK",
         requestTemplates={"application/json": '{"statusCode": 200}'},
         passthroughBehavior="WHEN_NO_MATCH",
+        # With */* binary media types the preflight is treated as binary, which
+        # would skip the mapping template above and fail every CORS preflight.
+        contentHandling="CONVERT_TO_TEXT",
     )
     apigw.put_integration_response(
         restApiId=api_id,
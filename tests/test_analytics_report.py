@@ -3,9 +3,14 @@ Tests for analytics-report Lambda.
 """
 
 import importlib.util
+import io
+import json
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 REPO_ROOT = Path(__file__).resolve().parent.parent
 ANALYTICS_APP = REPO_ROOT / "lambdas" / "analytics-report" / "app.py"
 
@@ -36,27 +41,45 @@ def _row(**fields):
 def _make_logs_mock(event_counts=None, sessions=0, unique_video_viewers=0):
     """Build a mock CloudWatch Logs client that returns scripted results.
 
-    ``event_counts`` is a {event_name: count} dict for the first query.
-    Subsequent queries return ``sessions`` then ``unique_video_viewers``.
+    Each started query gets its own id; results are chosen by query kind:
+    ``event_counts`` ({event_name: count}) for the event-count query, then
+    ``sessions`` or ``unique_video_viewers`` for the distinct-count queries.
+    Both weeks (week_index 0 and 1) get the same values.
     """
     logs = MagicMock()
-    logs.start_query.return_value = {"queryId": "q-1"}
-
-    counts_rows = [_row(event_name=k, event_count=v) for k, v in (event_counts or {}).items()]
-    responses = [
-        {"status": "Complete", "results": counts_rows},
-        {"status": "Complete", "results": [_row(n=sessions)]},
-        {"status": "Complete", "results": [_row(n=unique_video_viewers)]},
+    counts_rows = [
+        _row(event_name=k, week_index=week, event_count=v)
+        for k, v in (event_counts or {}).items()
+        for week in (0, 1)
     ]
-    # Two date ranges (this week + prev week) -> 6 total query results
-    logs.get_query_results.side_effect = responses + responses
+    queries: dict[str, str] = {}
+
+    def start_query(**kwargs):
+        query_id = f"q-{len(queries) + 1}"
+        queries[query_id] = kwargs["queryString"]
+        return {"queryId": query_id}
+
+    def get_query_results(queryId):
+        query = queries[queryId]
+        if "event_count" in query:
+            rows = counts_rows
+        elif "VideoPlay" in query:
+            rows = [_row(week_index=week, n=unique_video_viewers) for week in (0, 1)]
+        else:
+            rows = [_row(week_index=week, n=sessions) for week in (0, 1)]
+        return {"status": "Complete", "results": rows}
+
+    logs.start_query.side_effect = start_query
+    logs.get_query_results.side_effect = get_query_results
     return logs
 
 
-def _client_factory(logs_mock, sns_mock):
+def _client_factory(logs_mock, sns_mock, s3_mock=None):
     def factory(service, region_name=None):
         if service == "logs":
             return logs_mock
+        if service == "s3":
+            return s3_mock
         return sns_mock
 
     return factory
@@ -207,3 +230,355 @@ def test_report_contains_all_sections():
     assert "VIDEO ENGAGEMENT" in report_body
     assert "SECTION VIEWS" in report_body
     assert "WEEK-OVER-WEEK COMPARISON" in report_body
+
+
+def test_queries_submitted_before_polling():
+    """All three queries start up front and are polled together in one loop."""
+    logs_mock = _make_logs_mock(event_counts={"PageView": 3}, sessions=2)
+    order: list[str] = []
+    logs_mock.start_query.side_effect = _recording(order, "start", logs_mock.start_query)
+    logs_mock.get_query_results.side_effect = _recording(order, "poll", logs_mock.get_query_results)
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(logs_mock, MagicMock())),
+        patch.dict("os.environ", _TEST_ENV, clear=False),
+    ):
+        app = _load_app()
+        with patch.object(app.time, "sleep") as sleep:
+            result = app.lambda_handler({}, MagicMock())
+
+    assert order == ["start"] * 3 + ["poll"] * 3
+    sleep.assert_not_called()
+    assert result["metrics"]["PageView"] == 3
+    assert result["metrics"]["sessions"] == 2
+
+
+def _recording(order, label, side_effect):
+    """Wrap a mock side effect so each call is appended to ``order``."""
+    inner = side_effect.side_effect
+
+    def wrapped(*args, **kwargs):
+        order.append(label)
+        return inner(*args, **kwargs)
+
+    return wrapped
+
+
+def test_run_queries_backs_off_queues_on_limit_and_stops_at_deadline():
+    """Polling backs off while nothing finishes; LimitExceeded retries; the deadline stops."""
+    from botocore.exceptions import ClientError
+
+    limit = ClientError({"Error": {"Code": "LimitExceededException", "Message": "busy"}}, "Start")
+    logs_mock = MagicMock()
+    logs_mock.start_query.side_effect = [{"queryId": "a"}, limit, {"queryId": "b"}]
+    logs_mock.get_query_results.side_effect = lambda queryId: (
+        {"status": "Complete", "results": [_row(n=1)]}
+        if queryId == "a" and logs_mock.get_query_results.call_count > 2
+        else {"status": "Running", "results": []}
+    )
+    clock = {"now": 0.0}
+
+    with patch("boto3.client"), patch.dict("os.environ", _TEST_ENV, clear=False):
+        app = _load_app()
+        with (
+            patch.object(app.time, "monotonic", side_effect=lambda: clock["now"]),
+            patch.object(
+                app.time, "sleep", side_effect=lambda s: clock.update(now=clock["now"] + s)
+            ) as sleep,
+        ):
+            results = app._run_queries(logs_mock, "group", {"a": ("qa", 0, 1), "b": ("qb", 0, 1)})
+
+    assert results == {"a": [_row(n=1)], "b": None}
+    delays = [c.args[0] for c in sleep.call_args_list]
+    assert delays[:3] == [0.75, 1.125, app._QUERY_POLL_MIN_SECS]
+    assert max(delays) <= app._QUERY_POLL_MAX_SECS
+    assert clock["now"] == app._QUERY_TIMEOUT_SECS
+    logs_mock.stop_query.assert_called_once_with(queryId="b")
+
+
+def test_one_scan_per_metric_split_by_week():
+    """Each metric scans the full 14 days once; rows are split by week index."""
+    logs_mock = MagicMock()
+    logs_mock.start_query.side_effect = [{"queryId": f"q-{i}"} for i in range(3)]
+    results = {
+        "q-0": [
+            _row(event_name="PageView", week_index=0, event_count=10),
+            _row(event_name="PageView", week_index=1, event_count=15),
+            _row(event_name="VideoPlay", week_index=1, event_count=4),
+            _row(event_name="PageView", week_index=2, event_count=99),
+        ],
+        "q-1": [_row(week_index=1, n=7)],
+        "q-2": [_row(week_index=0, n=2), _row(week_index=1, n=3)],
+    }
+    logs_mock.get_query_results.side_effect = lambda queryId: {
+        "status": "Complete",
+        "results": results[queryId],
+    }
+    sns_mock = MagicMock()
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(logs_mock, sns_mock)),
+        patch.dict("os.environ", _TEST_ENV, clear=False),
+    ):
+        app = _load_app()
+        result = app.lambda_handler({}, MagicMock())
+
+    calls = [c.kwargs for c in logs_mock.start_query.call_args_list]
+    assert len(calls) == 3
+    for call in calls:
+        assert call["endTime"] - call["startTime"] == 14 * 86400
+        assert f"toMillis(@timestamp) - {call['startTime'] * 1000}" in call["queryString"]
+        assert "by " in call["queryString"] and "week_index" in call["queryString"]
+    assert result["metrics"]["PageView"] == 15
+    assert result["metrics"]["VideoPlay"] == 4
+    assert result["metrics"]["sessions"] == 7
+    assert result["metrics"]["unique_video_viewers"] == 3
+    report = sns_mock.publish.call_args[1]["Message"]
+    assert "Page Views          10 ->     15  (+50% **)" in report
+    assert "Sessions             0 ->      7  (new)" in report
+
+
+_SNAPSHOT_ENV = {
+    **_TEST_ENV,
+    "ANALYTICS_SNAPSHOT_BUCKET": "reports",
+    "ANALYTICS_SNAPSHOT_PREFIX": "w/",
+}
+
+
+def _week_start(weeks_back):
+    """Start date of the report week ``weeks_back`` weeks before this one."""
+    today = datetime.now(UTC).date()
+    return today - timedelta(days=7 * (weeks_back + 1))
+
+
+def _snapshot_key(week_start):
+    iso_year, iso_week, _ = week_start.isocalendar()
+    return f"w/{iso_year}-W{iso_week:02d}.json"
+
+
+def _make_s3_mock(stored, docs=None):
+    """S3 mock serving ``{week start: metrics}`` snapshots plus ``{key: doc}`` objects;
+    anything else is NoSuchKey."""
+    from botocore.exceptions import ClientError
+
+    objects = {
+        _snapshot_key(start): {"version": 1, "start": start.isoformat(), "metrics": metrics}
+        for start, metrics in stored.items()
+    }
+    objects.update(docs or {})
+
+    def get_object(Bucket, Key):
+        if Key not in objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "missing"}}, "GetObject")
+        return {"Body": io.BytesIO(json.dumps(objects[Key]).encode())}
+
+    s3 = MagicMock()
+    s3.get_object.side_effect = get_object
+    return s3
+
+
+def test_prior_week_read_from_snapshot_only_current_week_queried():
+    """A stored previous week is not re-queried; only this week is scanned and saved."""
+    prev = {"sessions": 20, "PageView": 100, "VideoPlay": 1, "UserSignIn": 2}
+    older = {"sessions": 10, "PageView": 50}
+    s3_mock = _make_s3_mock({_week_start(1): prev, _week_start(5): older})
+    logs_mock = _make_logs_mock(event_counts={"PageView": 150}, sessions=30)
+    sns_mock = MagicMock()
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(logs_mock, sns_mock, s3_mock)),
+        patch.dict("os.environ", _SNAPSHOT_ENV, clear=False),
+    ):
+        app = _load_app()
+        result = app.lambda_handler({}, MagicMock())
+
+    for call in logs_mock.start_query.call_args_list:
+        assert call.kwargs["endTime"] - call.kwargs["startTime"] == 7 * 86400
+    snapshot_reads = [c for c in s3_mock.get_object.call_args_list if c.kwargs["Key"][:2] == "w/"]
+    assert len(snapshot_reads) == app._TREND_WEEKS - 1
+    (put,) = s3_mock.put_object.call_args_list
+    assert put.kwargs["Key"] == _snapshot_key(_week_start(0))
+    saved = json.loads(put.kwargs["Body"])
+    assert saved["start"] == _week_start(0).isoformat()
+    assert saved["metrics"]["PageView"] == 150
+    assert result["snapshots"] == {"loaded": 2, "saved": 1}
+
+    report = sns_mock.publish.call_args[1]["Message"]
+    assert "Page Views         100 ->    150  (+50% **)" in report
+    assert "12-WEEK TREND" in report
+    assert "  Sessions        ······▁···▅█  30" in report
+
+
+def test_missing_snapshots_query_both_weeks_and_save_them():
+    s3_mock = _make_s3_mock({})
+    logs_mock = _make_logs_mock(event_counts={"PageView": 5}, sessions=1)
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(logs_mock, MagicMock(), s3_mock)),
+        patch.dict("os.environ", _SNAPSHOT_ENV, clear=False),
+    ):
+        app = _load_app()
+        result = app.lambda_handler({}, MagicMock())
+
+    for call in logs_mock.start_query.call_args_list:
+        assert call.kwargs["endTime"] - call.kwargs["startTime"] == 14 * 86400
+    keys = [c.kwargs["Key"] for c in s3_mock.put_object.call_args_list]
+    assert keys == [_snapshot_key(_week_start(1)), _snapshot_key(_week_start(0))]
+    assert result["snapshots"] == {"loaded": 0, "saved": 2}
+
+
+def test_misaligned_or_failed_weeks_are_not_trusted_or_saved():
+    """A snapshot for a differently aligned week is ignored; failed weeks are not saved."""
+    s3_mock = MagicMock()
+    s3_mock.get_object.side_effect = lambda Bucket, Key: {
+        "Body": io.BytesIO(
+            json.dumps({"version": 1, "start": "1999-01-01", "metrics": {"sessions": 9}}).encode()
+        )
+    }
+    logs_mock = MagicMock()
+    logs_mock.start_query.return_value = {"queryId": "q-1"}
+    logs_mock.get_query_results.return_value = {"status": "Failed", "results": []}
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(logs_mock, MagicMock(), s3_mock)),
+        patch.dict("os.environ", _SNAPSHOT_ENV, clear=False),
+    ):
+        app = _load_app()
+        result = app.lambda_handler({}, MagicMock())
+
+    assert result["snapshots"] == {"loaded": 0, "saved": 0}
+    s3_mock.put_object.assert_not_called()
+
+
+def test_sparkline():
+    with patch("boto3.client"), patch.dict("os.environ", _TEST_ENV, clear=False):
+        app = _load_app()
+    assert app._sparkline([0, 7, None, 14]) == "▁▅·█"
+    assert app._sparkline([3, 3]) == "▄▄"
+    assert app._sparkline([None, None]) == "··"
+
+
+def _load_hll():
+    spec = importlib.util.spec_from_file_location("analytics_hll", ANALYTICS_APP.parent / "hll.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_hll_accuracy_against_exact_counts():
+    """Sketch estimates stay within 3 standard errors of exact distinct counts."""
+    import random
+
+    hll = _load_hll()
+    rng = random.Random(42)
+    tolerance = 3 * 1.04 / (1 << hll.PRECISION) ** 0.5
+    for size in (1, 50, 1_000, 20_000, 200_000):
+        values = [f"session-{rng.getrandbits(64):016x}" for _ in range(size)]
+        sketch = hll.new_sketch()
+        for value in values + values[: size // 2]:  # duplicates must not count twice
+            hll.add(sketch, value)
+        exact = len(set(values))
+        assert abs(hll.estimate(sketch) - exact) <= max(1, tolerance * exact), size
+
+
+def test_hll_merge_matches_union_and_round_trips():
+    """Merged daily sketches estimate the union of overlapping days."""
+    hll = _load_hll()
+    days = [[f"user-{i}" for i in range(start, start + 3000)] for start in range(0, 7000, 1000)]
+    sketches = []
+    for values in days:
+        sketch = hll.new_sketch()
+        for value in values:
+            hll.add(sketch, value)
+        sketches.append(hll.decode(hll.encode(sketch)))
+    exact = len({v for values in days for v in values})
+    merged = hll.estimate(hll.merge(sketches))
+    assert abs(merged - exact) <= 0.05 * exact
+    assert sum(hll.estimate(s) for s in sketches) > 2 * exact  # per-day counts do not add up
+    assert len(hll.encode(hll.new_sketch())) < 100
+    with pytest.raises(ValueError):
+        hll.merge([hll.new_sketch(), hll.new_sketch(10)])
+    with pytest.raises(ValueError):
+        hll.decode("bm90IGEgc2tldGNo")
+
+
+def _sketch_doc(hll, day, sessions, viewers):
+    """Stored sketch document for one day from value lists."""
+    sketches = {}
+    for metric, values in (("sessions", sessions), ("unique_video_viewers", viewers)):
+        sketch = hll.new_sketch()
+        for value in values:
+            hll.add(sketch, value)
+        sketches[metric] = hll.encode(sketch)
+    return {"version": 1, "day": day.isoformat(), "sketches": sketches}
+
+
+def test_daily_sketch_job_builds_only_missing_days():
+    hll = _load_hll()
+    today = datetime.now(UTC).date()
+    stored = {
+        f"analytics-report/sketches/{(today - timedelta(days=d)).isoformat()}.json": _sketch_doc(
+            hll, today - timedelta(days=d), ["s"], []
+        )
+        for d in (2, 3)
+    }
+    s3_mock = _make_s3_mock({}, stored)
+    logs_mock = MagicMock()
+    logs_mock.start_query.side_effect = lambda **kw: {"queryId": kw["queryString"]}
+    logs_mock.get_query_results.side_effect = lambda queryId: {
+        "status": "Complete",
+        "results": [_row(value=f"id-{i}", n=2) for i in range(40)],
+    }
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(logs_mock, MagicMock(), s3_mock)),
+        patch.dict("os.environ", _SNAPSHOT_ENV, clear=False),
+    ):
+        app = _load_app()
+        result = app.lambda_handler({"analytics_sketch": {"days": 4}}, None)
+
+    assert result["built"] == [(today - timedelta(days=d)).isoformat() for d in (4, 1)]
+    assert result["failed"] == []
+    assert logs_mock.start_query.call_count == 4
+    for call in logs_mock.start_query.call_args_list:
+        assert call.kwargs["endTime"] - call.kwargs["startTime"] == 86400
+        assert "stats count() as n by value" in call.kwargs["queryString"]
+    put = s3_mock.put_object.call_args_list[-1].kwargs
+    assert put["Key"] == f"analytics-report/sketches/{(today - timedelta(days=1)).isoformat()}.json"
+    doc = json.loads(put["Body"])
+    assert hll.estimate(hll.decode(doc["sketches"]["sessions"])) == 40
+
+
+def test_report_uses_daily_sketches_for_distinct_counts():
+    """With every day sketched, only the event-count query runs; uniques come from sketches."""
+    hll = _load_hll()
+    today = datetime.now(UTC).date()
+    stored = {}
+    for back in range(1, 29):
+        day = today - timedelta(days=back)
+        sessions = [f"s-{back}-{i}" for i in range(10)]
+        viewers = [f"u-{i}" for i in range(back % 3 + 1)]
+        stored[f"analytics-report/sketches/{day.isoformat()}.json"] = _sketch_doc(
+            hll, day, sessions, viewers
+        )
+    s3_mock = _make_s3_mock({}, stored)
+    logs_mock = _make_logs_mock(event_counts={"PageView": 5}, sessions=999)
+    sns_mock = MagicMock()
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(logs_mock, sns_mock, s3_mock)),
+        patch.dict("os.environ", _SNAPSHOT_ENV, clear=False),
+    ):
+        app = _load_app()
+        result = app.lambda_handler({}, MagicMock())
+
+    (query,) = logs_mock.start_query.call_args_list
+    assert "count_distinct" not in query.kwargs["queryString"]
+    assert result["metrics"]["PageView"] == 5
+    assert result["metrics"]["sessions"] == 70
+    assert result["metrics"]["unique_video_viewers"] == 3
+    assert abs(result["rolling_unique"]["sessions"] - 280) <= 0.05 * 280
+    assert result["rolling_unique"]["unique_video_viewers"] == 3
+    report = sns_mock.publish.call_args[1]["Message"]
+    assert "LAST 28 DAYS (UNIQUE, ESTIMATED)" in report
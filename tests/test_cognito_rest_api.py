@@ -24,6 +24,36 @@ def _load_cognito_rest_app():
     return module
 
 
+_TOKEN_FIELDS = {
+    "list_users": "PaginationToken",
+    "list_users_in_group": "NextToken",
+    "admin_list_groups_for_user": "NextToken",
+}
+
+
+def _with_paginators(cognito_mock):
+    """Route get_paginator(op) through the mock's op, following its pagination token
+    the way botocore paginators do."""
+
+    def get_paginator(operation):
+        token_field = _TOKEN_FIELDS[operation]
+
+        def paginate(**kwargs):
+            call = getattr(cognito_mock, operation)
+            page = call(**kwargs)
+            yield page
+            while page.get(token_field):
+                page = call(**kwargs, **{token_field: page[token_field]})
+                yield page
+
+        paginator = MagicMock()
+        paginator.paginate.side_effect = paginate
+        return paginator
+
+    cognito_mock.get_paginator.side_effect = get_paginator
+    return cognito_mock
+
+
 def test_handler_options_returns_204():
     with (
         patch.dict(
@@ -93,7 +123,7 @@ def test_handler_missing_authorizer_passes_when_check_disabled():
             "ResponseMetadata": {"HTTPStatusCode": 200},
             "Users": [],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         # Force-clear REQUIRE_AUTHORIZER in case the surrounding env has it set.
@@ -147,7 +177,7 @@ def test_handler_get_list_returns_structure():
             "ResponseMetadata": {"HTTPStatusCode": 200},
             "Users": [],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {"httpMethod": "GET", "path": "/list", **AUTH_CONTEXT}
@@ -175,7 +205,7 @@ def test_handler_post_missing_body_returns_400():
             "ResponseMetadata": {"HTTPStatusCode": 200},
             "Users": [],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {"httpMethod": "POST", "path": "/approve", "body": None, **AUTH_CONTEXT}
@@ -203,7 +233,7 @@ def test_handler_post_invalid_json_returns_400():
             "ResponseMetadata": {"HTTPStatusCode": 200},
             "Users": [],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {"httpMethod": "POST", "path": "/approve", "body": "{invalid", **AUTH_CONTEXT}
@@ -231,7 +261,7 @@ def test_handler_post_missing_required_fields_returns_400():
             "ResponseMetadata": {"HTTPStatusCode": 200},
             "Users": [],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {
@@ -294,7 +324,7 @@ def test_handler_get_list_includes_groups_per_user():
                 {"Username": "bob", "Attributes": [{"Name": "email", "Value": "bob@example.com"}]},
             ],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {"httpMethod": "GET", "path": "/list", **AUTH_CONTEXT}
@@ -337,7 +367,7 @@ def test_handler_get_list_includes_total_count():
             "ResponseMetadata": {"HTTPStatusCode": 200},
             "Users": [],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {"httpMethod": "GET", "path": "/list", **AUTH_CONTEXT}
@@ -369,7 +399,7 @@ def test_handler_get_list_admin_returns_admin_emails():
                 },
             ],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {"httpMethod": "GET", "path": "/list/admin", **AUTH_CONTEXT}
@@ -456,7 +486,7 @@ def test_handler_post_actions_return_200(path_suffix, expected_substring):
         ),
         patch("boto3.client") as mock_boto,
     ):
-        mock_boto.return_value = _cognito_mock_for_post_actions()
+        mock_boto.return_value = _with_paginators(_cognito_mock_for_post_actions())
         app = _load_cognito_rest_app()
         with patch.object(app, "send_mail"):
             event = {
@@ -492,7 +522,7 @@ def test_handler_get_invalid_path_raises():
             "ResponseMetadata": {"HTTPStatusCode": 200},
             "Users": [],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {"httpMethod": "GET", "path": "/invalid", **AUTH_CONTEXT}
@@ -523,9 +553,198 @@ def test_handler_post_invalid_path_raises():
                 },
             ],
         }
-        mock_boto.return_value = cognito_mock
+        mock_boto.return_value = _with_paginators(cognito_mock)
 
         app = _load_cognito_rest_app()
         event = {"httpMethod": "POST", "path": "/invalid", "body": _post_body(), **AUTH_CONTEXT}
         with pytest.raises(RuntimeError, match="Invalid POST path"):
             app.handler(event, MagicMock())
+
+
+_ENV = {
+    "AWS_REGION": "us-west-1",
+    "AWS_COGNITO_USER_POOL_ID": "us-west-1_abc123",
+    "AWS_SES_SOURCE_EMAIL": "test@example.com",
+}
+
+
+def _user(name):
+    return {"Username": name, "Attributes": [{"Name": "email", "Value": f"{name}@example.com"}]}
+
+
+def _page(names, token_field=None, token=None):
+    page = {"ResponseMetadata": {"HTTPStatusCode": 200}, "Users": [_user(n) for n in names]}
+    if token:
+        page[token_field] = token
+    return page
+
+
+def test_handler_get_list_follows_every_page():
+    """Users beyond the first Cognito page are no longer dropped from /list."""
+
+    def list_users(**kw):
+        if kw.get("PaginationToken") == "p2":
+            return _page(["carol"])
+        return _page(["alice", "bob"], "PaginationToken", "p2")
+
+    def list_users_in_group(**kw):
+        if kw["GroupName"] != "approved":
+            return _page([])
+        if kw.get("NextToken") == "n2":
+            return _page(["carol"])
+        return _page(["alice", "bob"], "NextToken", "n2")
+
+    cognito_mock = MagicMock()
+    cognito_mock.list_users.side_effect = list_users
+    cognito_mock.list_users_in_group.side_effect = list_users_in_group
+    with patch.dict("os.environ", _ENV), patch("boto3.client") as mock_boto:
+        mock_boto.return_value = _with_paginators(cognito_mock)
+        app = _load_cognito_rest_app()
+        result = app.handler({"httpMethod": "GET", "path": "/list", **AUTH_CONTEXT}, MagicMock())
+
+    body = json.loads(result["body"])
+    assert body["total_count"] == 3
+    assert [u["user_name"] for u in body["approved"]] == ["alice", "bob", "carol"]
+    for call in cognito_mock.list_users.call_args_list:
+        assert call.kwargs["AttributesToGet"] == ["email"]
+
+
+def test_handler_get_list_cursor_pages_unapproved_then_approved():
+    def list_users_in_group(**kw):
+        group, token = kw["GroupName"], kw.get("NextToken")
+        if group == "unapproved":
+            return _page(["newbie"])
+        if group == "approved" and token is None:
+            return _page(["alice", "bob"], "NextToken", "n2")
+        return _page(["carol"])
+
+    def admin_list_groups_for_user(**kw):
+        names = ["approved", "admin", "students"] if kw["Username"] == "bob" else ["approved"]
+        return {"Groups": [{"GroupName": n} for n in names]}
+
+    cognito_mock = MagicMock()
+    cognito_mock.list_users_in_group.side_effect = list_users_in_group
+    cognito_mock.admin_list_groups_for_user.side_effect = admin_list_groups_for_user
+    cognito_mock.describe_user_pool.return_value = {"UserPool": {"EstimatedNumberOfUsers": 4}}
+    with patch.dict("os.environ", _ENV), patch("boto3.client") as mock_boto:
+        mock_boto.return_value = _with_paginators(cognito_mock)
+        app = _load_cognito_rest_app()
+        pages = []
+        qs = {"limit": "2"}
+        while True:
+            event = {"httpMethod": "GET", "path": "/list", "queryStringParameters": qs}
+            pages.append(json.loads(app.handler({**event, **AUTH_CONTEXT}, MagicMock())["body"]))
+            if not pages[-1]["next_cursor"]:
+                break
+            qs = {"limit": "2", "cursor": pages[-1]["next_cursor"]}
+
+    assert [[u["user_name"] for u in p["unapproved"] + p["approved"]] for p in pages] == [
+        ["newbie"],
+        ["alice", "bob"],
+        ["carol"],
+    ]
+    assert pages[0]["total_count"] == 4
+    assert all("total_count" not in p for p in pages[1:])
+    assert pages[1]["approved"][1] == {
+        "user_name": "bob",
+        "email": "bob@example.com",
+        "groups": ["admin"],
+    }
+    assert {c.kwargs.get("Limit") for c in cognito_mock.list_users_in_group.call_args_list} >= {2}
+    assert {c.kwargs["GroupName"] for c in cognito_mock.list_users_in_group.call_args_list} == {
+        "unapproved",
+        "approved",
+    }
+    looked_up = [
+        c.kwargs["Username"] for c in cognito_mock.admin_list_groups_for_user.call_args_list
+    ]
+    assert sorted(looked_up) == ["alice", "bob", "carol"]
+    cognito_mock.list_users.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "qs,message",
+    [
+        ({"limit": "abc"}, "limit must be an integer"),
+        ({"limit": "0"}, "limit must be between 1 and 60"),
+        ({"limit": "61"}, "limit must be between 1 and 60"),
+        ({"cursor": "not-a-cursor"}, "Invalid cursor"),
+        ({"cursor": "eyJncm91cCI6ImFkbWluIiwidG9rZW4iOm51bGx9"}, "Invalid cursor"),
+    ],
+)
+def test_handler_get_list_rejects_bad_page_params(qs, message):
+    with patch.dict("os.environ", _ENV), patch("boto3.client") as mock_boto:
+        mock_boto.return_value = _with_paginators(MagicMock())
+        app = _load_cognito_rest_app()
+        event = {"httpMethod": "GET", "path": "/list", "queryStringParameters": qs}
+        result = app.handler({**event, **AUTH_CONTEXT}, MagicMock())
+    assert result["statusCode"] == 400
+    assert json.loads(result["body"])["error"] == message
+
+
+def test_handler_get_list_runs_listings_concurrently():
+    """All six independent listings are in flight at once; the response is unchanged."""
+    import threading
+
+    barrier = threading.Barrier(6, timeout=5)
+
+    def list_users(**kw):
+        barrier.wait()
+        return _page(["alice", "bob", "newbie"])
+
+    def list_users_in_group(**kw):
+        barrier.wait()
+        members = {"approved": ["alice", "bob"], "unapproved": ["newbie"], "admin": ["bob"]}
+        return _page(members.get(kw["GroupName"], []))
+
+    cognito_mock = MagicMock()
+    cognito_mock.list_users.side_effect = list_users
+    cognito_mock.list_users_in_group.side_effect = list_users_in_group
+    with patch.dict("os.environ", _ENV), patch("boto3.client") as mock_boto:
+        mock_boto.return_value = _with_paginators(cognito_mock)
+        app = _load_cognito_rest_app()
+        result = app.handler({"httpMethod": "GET", "path": "/list", **AUTH_CONTEXT}, MagicMock())
+
+    assert mock_boto.call_count == 1
+    assert json.loads(result["body"]) == {
+        "approved": [
+            {"user_name": "alice", "email": "alice@example.com", "groups": []},
+            {"user_name": "bob", "email": "bob@example.com", "groups": ["admin"]},
+        ],
+        "unapproved": [{"user_name": "newbie", "email": "newbie@example.com"}],
+        "total_count": 3,
+    }
+
+
+def test_list_call_limiter_holds_rate_after_burst():
+    """The shared bucket allows a burst of _LIST_TPS calls, then paces at _LIST_TPS."""
+    with patch.dict("os.environ", _ENV), patch("boto3.client"):
+        app = _load_cognito_rest_app()
+    clock = {"now": 100.0}
+    app._LIST_LIMITER.tokens = app._LIST_TPS
+    app._LIST_LIMITER.updated = clock["now"]
+    with (
+        patch.object(app.time, "monotonic", side_effect=lambda: clock["now"]),
+        patch.object(
+            app.time, "sleep", side_effect=lambda secs: clock.update(now=clock["now"] + secs)
+        ) as sleep,
+    ):
+        for _ in range(int(app._LIST_TPS) + 10):
+            app._throttle_list_call()
+    assert sleep.call_count == 10
+    assert clock["now"] - 100.0 == pytest.approx(10 / app._LIST_TPS)
+
+
+def test_tracked_group_lookup_takes_a_list_token_per_page():
+    """Per-user group lookups go through the shared list-call bucket, one token per page."""
+    cognito_mock = MagicMock()
+    cognito_mock.admin_list_groups_for_user.side_effect = [
+        {"Groups": [{"GroupName": "approved"}, {"GroupName": "admin"}], "NextToken": "t2"},
+        {"Groups": [{"GroupName": "contributor"}]},
+    ]
+    with patch.dict("os.environ", _ENV), patch("boto3.client"):
+        app = _load_cognito_rest_app()
+    with patch.object(app, "_throttle_list_call") as throttle:
+        groups = app._tracked_groups_for_user(_with_paginators(cognito_mock), "pool", "bob")
+    assert groups == ["admin", "contributor"]
+    assert throttle.call_count >= 2
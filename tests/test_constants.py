@@ -9,6 +9,7 @@ from common.constants import (
     DDB_INDEX_NAME,
     HTTP_BAD_REQUEST,
     HTTP_NO_CONTENT,
+    HTTP_NOT_MODIFIED,
     HTTP_OK,
     HTTP_UNAUTHORIZED,
 )
@@ -17,6 +18,7 @@ from common.constants import (
 def test_http_constants():
     assert HTTP_OK == 200
     assert HTTP_NO_CONTENT == 204
+    assert HTTP_NOT_MODIFIED == 304
     assert HTTP_BAD_REQUEST == 400
     assert HTTP_UNAUTHORIZED == 401
 
@@ -427,6 +427,7 @@ def test_dashboard_error_logged_at_error_level(mock_boto_client, load_lambda):
         "ENABLE_DASHBOARD": "true",
         "ENABLE_CLOUDTRAIL_TRIPWIRES": "false",
         "ENABLE_CLOUDTRAIL_S3_POSTURE": "false",
+        "DASHBOARD_STRATEGY": "per_resource",
     },
     clear=False,
 )
@@ -595,3 +596,706 @@ def test_dashboard_name_sanitized_before_put(mock_boto_client, load_lambda):
 
     mock_cw.put_dashboard.assert_called_once()
     assert mock_cw.put_dashboard.call_args[1]["DashboardName"] == "Bad_Name_"
+
+
+def _throttle_error(op):
+    """ClientError carrying a ThrottlingException code."""
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate"}}, op)
+
+
+@patch("time.sleep")
+def test_limited_call_retries_throttle_and_halves_rate(mock_sleep, load_lambda):
+    """Throttled call is retried through the limiter; rate is cut and stats record it."""
+    load_lambda("log-janitor")
+    import rate_limiter
+
+    rate_limiter.reset_limiters()
+    client = MagicMock()
+    client.meta.region_name = "us-east-2"
+    client.put_retention_policy.side_effect = [_throttle_error("PutRetentionPolicy"), {}]
+
+    rate_limiter.limited_call(
+        client, "logs", "put_retention_policy", logGroupName="/aws/lambda/x", retentionInDays=90
+    )
+
+    assert client.put_retention_policy.call_count == 2
+    stats = rate_limiter.limiter_stats()["logs:us-east-2"]
+    assert stats["throttles"] == 1
+    assert stats["retries"] == 1
+    assert stats["min_rate"] == 2.5
+    assert mock_sleep.called
+
+
+@patch("time.sleep")
+def test_limited_call_raises_non_throttle_error(_mock_sleep, load_lambda):
+    """Non-throttling ClientErrors propagate without retry."""
+    load_lambda("log-janitor")
+    import rate_limiter
+
+    rate_limiter.reset_limiters()
+    client = MagicMock()
+    client.meta.region_name = "us-east-2"
+    client.put_metric_alarm.side_effect = ClientError(
+        {"Error": {"Code": "AccessDenied", "Message": "no"}}, "PutMetricAlarm"
+    )
+    try:
+        rate_limiter.limited_call(client, "cloudwatch", "put_metric_alarm", AlarmName="a")
+        raise AssertionError("expected ClientError")
+    except ClientError:
+        pass
+    assert client.put_metric_alarm.call_count == 1
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "MODE": "APPLY",
+        "REGIONS": "us-east-2",
+        "LOG_GROUP_INCLUDE_PREFIXES": "/aws/lambda/",
+        "LOG_GROUP_EXCLUDE_PATTERNS": "",
+        "LOG_GROUP_EXCEPTIONS_JSON": "{}",
+        "ENABLE_ALARMS": "false",
+        "ENABLE_DASHBOARD": "false",
+        "ENABLE_CLOUDTRAIL_TRIPWIRES": "false",
+        "ENABLE_CLOUDTRAIL_S3_POSTURE": "false",
+    },
+    clear=False,
+)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_retention_throttle_reported_in_rate_limiter_stats(
+    mock_boto_client, _mock_sleep, load_lambda
+):
+    """Throttled put_retention_policy is retried and limiter stats land in execution_metadata."""
+    mock_logs = MagicMock()
+    mock_logs.meta.region_name = "us-east-2"
+    mock_logs.get_paginator.return_value = _make_paginator(
+        [{"logGroups": [{"logGroupName": "/aws/lambda/bar", "retentionInDays": None}]}]
+    )
+    mock_logs.put_retention_policy.side_effect = [_throttle_error("PutRetentionPolicy"), {}]
+    mock_boto_client.side_effect = lambda svc, **_kw: mock_logs if svc == "logs" else MagicMock()
+
+    mod = load_lambda("log-janitor")
+    result = mod.lambda_handler({}, None)
+
+    assert result["findings"]["log_groups"]["fixed"] == 1
+    stats = result["execution_metadata"]["rate_limiter"]["logs:us-east-2"]
+    assert stats["calls"] == 2
+    assert stats["throttles"] == 1
+    json.dumps(result)
+
+
+def test_insights_dashboard_widget_count_is_fixed(load_lambda):
+    """Insights dashboard has the same widget count for 1 or 500 explicit Lambdas."""
+    load_lambda("log-janitor")
+    import dashboard
+
+    small = dashboard.build_insights_dashboard_widgets({"critical_lambdas": ["a"]}, "us-east-2")
+    big = dashboard.build_insights_dashboard_widgets(
+        {"critical_lambdas": [f"fn-{i}" for i in range(500)]}, "us-east-2"
+    )
+    assert len(small) == len(big)
+    for w in big:
+        assert w["properties"]["region"] == "us-east-2"
+
+
+def test_insights_expression_forms(load_lambda):
+    """Names use an exact Metrics Insights WHERE; prefixes use SORT(SEARCH()); else whole namespace."""
+    load_lambda("log-janitor")
+    import dashboard
+
+    panel = ("Lambda Errors", "AWS/Lambda", "FunctionName", "Errors", "Sum")
+    by_name = dashboard.insights_expression(panel, ["fn-a", "fn-b"], [], 5)
+    assert by_name.startswith('SELECT SUM(Errors) FROM SCHEMA("AWS/Lambda", FunctionName)')
+    assert "FunctionName = 'fn-a' OR FunctionName = 'fn-b'" in by_name
+    assert by_name.endswith("LIMIT 5")
+    by_prefix = dashboard.insights_expression(panel, [], ["suigetsukan-"], 5)
+    assert by_prefix.startswith("SORT(SEARCH(")
+    assert "(FunctionName=suigetsukan)" in by_prefix
+    multi = dashboard.insights_expression(panel, [], ["suigetsukan-usage-", "x'(y)"], 5)
+    assert (
+        "((FunctionName=suigetsukan AND FunctionName=usage) OR (FunctionName=x AND FunctionName=y))"
+        in multi
+    )
+    assert multi.count("'") == 4
+    everything = dashboard.insights_expression(panel, [], [], 5)
+    assert "WHERE" not in everything
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "MODE": "APPLY",
+        "REGIONS": "us-east-2",
+        "ENABLE_RETENTION": "false",
+        "ENABLE_ALARMS": "false",
+        "ENABLE_DASHBOARD": "true",
+        "ENABLE_CLOUDTRAIL_TRIPWIRES": "false",
+        "ENABLE_CLOUDTRAIL_S3_POSTURE": "false",
+        "CRITICAL_LAMBDA_PREFIXES": "suigetsukan-",
+        "DASHBOARD_STRATEGY": "insights",
+    },
+    clear=False,
+)
+@patch("boto3.client")
+def test_dashboard_put_skipped_when_hash_matches(mock_boto_client, load_lambda):
+    """PutDashboard is skipped when the deployed body hashes the same as the new one."""
+    mod = load_lambda("log-janitor")
+    config = mod._get_config()
+    widgets = mod.build_insights_dashboard_widgets(config, "us-east-2")
+    mock_cw = MagicMock()
+    mock_cw.get_dashboard.return_value = {
+        "DashboardBody": json.dumps({"widgets": widgets}, indent=2)
+    }
+    mock_boto_client.side_effect = lambda svc, **_kw: (
+        mock_cw if svc == "cloudwatch" else MagicMock()
+    )
+
+    result = mod.lambda_handler({}, None)
+
+    mock_cw.put_dashboard.assert_not_called()
+    assert result["findings"]["dashboard"]["unchanged"] is True
+    assert result["findings"]["dashboard"]["created"] is False
+
+
+@patch.dict("os.environ", {"DASHBOARD_STRATEGY": ""}, clear=False)
+def test_dashboard_strategy_defaults_to_per_resource(load_lambda):
+    """Insights widgets are opt-in; unset DASHBOARD_STRATEGY keeps the per-resource layout."""
+    mod = load_lambda("log-janitor")
+    assert mod._get_config()["dashboard_strategy"] == "per_resource"
+
+
+def _alarm_clients(functions, tables=None):
+    """Mock cloudwatch/lambda/dynamodb/sns clients for alarm-stage tests."""
+    mock_cw = MagicMock()
+    mock_lam = MagicMock()
+    mock_lam.get_paginator.return_value = _make_paginator(
+        [{"Functions": [{"FunctionName": f} for f in functions]}]
+    )
+    mock_ddb = MagicMock()
+    mock_ddb.get_paginator.return_value = _make_paginator([{"TableNames": tables or []}])
+    mock_sns = MagicMock()
+    mock_sns.get_paginator.return_value = _make_paginator([{"Topics": []}])
+    by_svc = {"cloudwatch": mock_cw, "lambda": mock_lam, "dynamodb": mock_ddb, "sns": mock_sns}
+    return mock_cw, lambda svc, **_kw: by_svc.get(svc, MagicMock())
+
+
+_AGGREGATE_ENV = {
+    "MODE": "APPLY",
+    "REGIONS": "us-east-2",
+    "ENABLE_RETENTION": "false",
+    "ENABLE_ALARMS": "true",
+    "ENABLE_DASHBOARD": "false",
+    "ENABLE_CLOUDTRAIL_TRIPWIRES": "false",
+    "ENABLE_CLOUDTRAIL_S3_POSTURE": "false",
+    "ALARM_STRATEGY": "aggregate",
+    "CRITICAL_LAMBDA_PREFIXES": "suigetsukan-",
+    "DDB_TABLE_PREFIXES": "mother-hen-",
+    "ALARM_SNS_TOPIC_ARN": "arn:aws:sns:us-east-2:123:alarms",
+}
+
+
+@patch.dict("os.environ", _AGGREGATE_ENV, clear=False)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_aggregate_alarms_scoped_to_prefix(mock_boto_client, _sleep, load_lambda):
+    """Aggregate strategy: one alarm per class, prefix and metric over the matching names."""
+    mock_cw, factory = _alarm_clients(
+        ["suigetsukan-b", "dev-sandbox", "suigetsukan-a"], ["mother-hen-devices", "scratch"]
+    )
+    mock_boto_client.side_effect = factory
+    mod = load_lambda("log-janitor")
+    result = mod.lambda_handler({}, None)
+
+    puts = [c.kwargs for c in mock_cw.put_metric_alarm.call_args_list]
+    assert result["findings"]["alarms"]["strategy"] == "aggregate"
+    assert result["findings"]["alarms"]["failed"] == 0
+    assert len(puts) == 4  # Lambda Errors/Throttles + DynamoDB ThrottledRequests/SystemErrors
+    first = puts[0]
+    assert first["AlarmName"] == "Janitor-Agg-lambda-suigetsukan-Errors"
+    assert first["Metrics"][0]["Expression"] == (
+        'SELECT MAX(Errors) FROM SCHEMA("AWS/Lambda", FunctionName) '
+        "WHERE FunctionName = 'suigetsukan-a' OR FunctionName = 'suigetsukan-b'"
+    )
+    assert first["AlarmActions"] == ["arn:aws:sns:us-east-2:123:alarms"]
+    ddb = [p["Metrics"][0]["Expression"] for p in puts if "DynamoDB" in p["AlarmName"]]
+    assert all("'mother-hen-devices'" in e and "scratch" not in e for e in ddb)
+
+
+@patch.dict("os.environ", _AGGREGATE_ENV, clear=False)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_aggregate_long_name_list_split_across_alarms(mock_boto_client, _sleep, load_lambda):
+    """Name lists too long for one expression are split into numbered alarms."""
+    mock_cw, factory = _alarm_clients([f"suigetsukan-fn-{i}" for i in range(200)])
+    mock_boto_client.side_effect = factory
+    mod = load_lambda("log-janitor")
+    mod.lambda_handler({}, None)
+
+    puts = [c.kwargs for c in mock_cw.put_metric_alarm.call_args_list]
+    errors = [p for p in puts if p["AlarmName"].startswith("Janitor-Agg-lambda-suigetsukan-Err")]
+    assert [p["AlarmName"] for p in errors][:2] == [
+        "Janitor-Agg-lambda-suigetsukan-Errors",
+        "Janitor-Agg-lambda-suigetsukan-Errors-2",
+    ]
+    expressions = [p["Metrics"][0]["Expression"] for p in errors]
+    assert all(len(e) <= 2048 for e in expressions)
+    assert sum(e.count("FunctionName = ") for e in expressions) == 200
+
+
+@patch.dict(
+    "os.environ",
+    {**_AGGREGATE_ENV, "ALARM_COMPOSITE": "true", "CRITICAL_LAMBDAS": "suigetsukan-critical"},
+    clear=False,
+)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_aggregate_composite_and_explicit_critical_alarms(mock_boto_client, _sleep, load_lambda):
+    """Composite carries the actions; explicitly listed Lambdas keep per-resource alarms."""
+    mock_cw, factory = _alarm_clients(["suigetsukan-a", "suigetsukan-b"])
+    mock_boto_client.side_effect = factory
+    mod = load_lambda("log-janitor")
+    mod.lambda_handler({}, None)
+
+    names = [c.kwargs["AlarmName"] for c in mock_cw.put_metric_alarm.call_args_list]
+    assert "Janitor-suigetsukan-critical-Errors" in names
+    aggregate = [c.kwargs for c in mock_cw.put_metric_alarm.call_args_list if "Metrics" in c.kwargs]
+    assert aggregate and all("AlarmActions" not in a for a in aggregate)
+    mock_cw.put_composite_alarm.assert_called_once()
+    composite = mock_cw.put_composite_alarm.call_args.kwargs
+    assert composite["AlarmActions"] == ["arn:aws:sns:us-east-2:123:alarms"]
+    assert 'ALARM("Janitor-Agg-lambda-suigetsukan-Errors")' in composite["AlarmRule"]
+
+
+def _existing_alarms(mock_cw, names):
+    """Make describe_alarms list the given Janitor alarm names."""
+    mock_cw.get_paginator.return_value = _make_paginator(
+        [{"MetricAlarms": [{"AlarmName": n} for n in names], "CompositeAlarms": []}]
+    )
+
+
+@patch.dict(
+    "os.environ", {**_AGGREGATE_ENV, "CRITICAL_LAMBDAS": "suigetsukan-critical"}, clear=False
+)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_aggregate_switch_deletes_per_resource_alarms(mock_boto_client, _sleep, load_lambda):
+    """Switching to aggregate deletes per-resource alarms, keeping explicit and tripwire ones."""
+    mock_cw, factory = _alarm_clients(["suigetsukan-a"])
+    _existing_alarms(
+        mock_cw,
+        [
+            "Janitor-suigetsukan-a-Errors",
+            "Janitor-DDB-mother-hen-devices-SystemErrors",
+            "Janitor-suigetsukan-critical-Errors",
+            "Janitor-CloudTrail-RootLogin",
+            "Janitor-Agg-lambda-Errors",
+        ],
+    )
+    mock_boto_client.side_effect = factory
+    mod = load_lambda("log-janitor")
+    result = mod.lambda_handler({}, None)
+
+    mock_cw.delete_alarms.assert_called_once_with(
+        AlarmNames=[
+            "Janitor-Agg-lambda-Errors",
+            "Janitor-DDB-mother-hen-devices-SystemErrors",
+            "Janitor-suigetsukan-a-Errors",
+        ]
+    )
+    assert result["findings"]["alarms"]["deleted"] == 3
+
+
+@patch.dict("os.environ", _AGGREGATE_ENV, clear=False)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_aggregate_listing_failure_deletes_nothing(mock_boto_client, _sleep, load_lambda):
+    """A failed resource listing aborts the region's alarm stage before any cleanup."""
+    mock_cw, factory = _alarm_clients(["suigetsukan-a"])
+    _existing_alarms(mock_cw, ["Janitor-suigetsukan-a-Errors"])
+    failing_lam = MagicMock()
+    failing_lam.get_paginator.return_value.paginate.side_effect = ClientError(
+        {"Error": {"Code": "AccessDeniedException", "Message": "no"}}, "ListFunctions"
+    )
+    mock_boto_client.side_effect = lambda svc, **kw: (
+        failing_lam if svc == "lambda" else factory(svc, **kw)
+    )
+    mod = load_lambda("log-janitor")
+    result = mod.lambda_handler({}, None)
+
+    mock_cw.delete_alarms.assert_not_called()
+    mock_cw.put_metric_alarm.assert_not_called()
+    assert result["errors"][0]["stage"] == "alarms"
+
+
+@patch.dict(
+    "os.environ",
+    {**_AGGREGATE_ENV, "ALARM_STRATEGY": "per_resource", "DDB_TABLE_PREFIXES": ""},
+    clear=False,
+)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_per_resource_switch_deletes_aggregate_alarms(mock_boto_client, _sleep, load_lambda):
+    """Switching back to per-resource deletes only the aggregate and composite alarms."""
+    mock_cw, factory = _alarm_clients(["suigetsukan-a"])
+    _existing_alarms(
+        mock_cw,
+        [
+            "Janitor-Agg-lambda-Errors",
+            "Janitor-Composite",
+            "Janitor-suigetsukan-gone-Errors",
+        ],
+    )
+    mock_boto_client.side_effect = factory
+    mod = load_lambda("log-janitor")
+    mod.lambda_handler({}, None)
+
+    mock_cw.delete_alarms.assert_called_once_with(
+        AlarmNames=["Janitor-Agg-lambda-Errors", "Janitor-Composite"]
+    )
+
+
+_SNAPSHOT_ENV = {
+    "MODE": "APPLY",
+    "REGIONS": "us-east-2",
+    "LOG_GROUP_INCLUDE_PREFIXES": "/aws/lambda/",
+    "LOG_GROUP_EXCLUDE_PATTERNS": "",
+    "LOG_GROUP_EXCEPTIONS_JSON": "{}",
+    "ENABLE_ALARMS": "false",
+    "ENABLE_DASHBOARD": "false",
+    "ENABLE_CLOUDTRAIL_TRIPWIRES": "false",
+    "ENABLE_CLOUDTRAIL_S3_POSTURE": "false",
+    "STATE_SNAPSHOT_BUCKET": "janitor-state",
+}
+
+
+def _snapshot_s3(stored):
+    """Mock S3 client whose get_object/put_object read and write stored['body']."""
+    s3 = MagicMock()
+
+    def get_object(**_kw):
+        if "body" not in stored:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "x"}}, "GetObject")
+        body = MagicMock()
+        body.read.return_value = stored["body"]
+        return {"Body": body}
+
+    def put_object(**kw):
+        stored["body"] = kw["Body"]
+        return {}
+
+    s3.get_object.side_effect = get_object
+    s3.put_object.side_effect = put_object
+    return s3
+
+
+@patch.dict("os.environ", _SNAPSHOT_ENV, clear=False)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_state_snapshot_tracks_log_group_drift(mock_boto_client, _sleep, load_lambda):
+    """Log groups are re-checked from the listing each run and recorded for the drift report."""
+    stored: dict = {}
+    mock_s3 = _snapshot_s3(stored)
+    mock_logs = MagicMock()
+    mock_logs.get_paginator.return_value = _make_paginator(
+        [
+            {
+                "logGroups": [
+                    {"logGroupName": "/aws/lambda/ok", "retentionInDays": 90},
+                    {"logGroupName": "/aws/lambda/drift", "retentionInDays": 7},
+                ]
+            }
+        ]
+    )
+    by_svc = {"logs": mock_logs, "s3": mock_s3}
+    mock_boto_client.side_effect = lambda svc, **_kw: by_svc.get(svc, MagicMock())
+    mod = load_lambda("log-janitor")
+
+    first = mod.lambda_handler({}, None)
+    assert first["findings"]["retention"]["fixed"] == 1
+    assert first["findings"]["state_snapshot"]["new"] == 2
+    assert first["findings"]["state_snapshot"]["saved"] is True
+
+    # After the fix, listing shows the remediated retention; one new group has drifted.
+    mock_logs.get_paginator.return_value = _make_paginator(
+        [
+            {
+                "logGroups": [
+                    {"logGroupName": "/aws/lambda/ok", "retentionInDays": 90},
+                    {"logGroupName": "/aws/lambda/drift", "retentionInDays": 90},
+                    {"logGroupName": "/aws/lambda/new", "retentionInDays": None},
+                ]
+            }
+        ]
+    )
+    mock_logs.put_retention_policy.reset_mock()
+    second = mod.lambda_handler({}, None)
+
+    ret = second["findings"]["retention"]
+    assert ret["in_scope"] == 3
+    assert ret["drifted"] == 1
+    mock_logs.put_retention_policy.assert_called_once()
+    report = second["findings"]["state_snapshot"]
+    assert report["unchanged"] == 0
+    assert report["new"] == 1
+    assert report["changed"] == 0
+    assert report["drift_trend"] == [1, 1]
+
+
+@patch.dict(
+    "os.environ",
+    {
+        **_SNAPSHOT_ENV,
+        "ENABLE_RETENTION": "false",
+        "ENABLE_ALARMS": "true",
+        "CRITICAL_LAMBDAS": "fn",
+    },
+    clear=False,
+)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_alarm_put_skipped_only_when_live_alarm_in_sync(mock_boto_client, _sleep, load_lambda):
+    """In-sync live alarms are not re-put; edited or deleted alarms are repaired."""
+    stored: dict = {}
+    mock_s3 = _snapshot_s3(stored)
+    mock_cw = MagicMock()
+    mock_cw.meta.region_name = "us-east-2"
+    by_svc = {"cloudwatch": mock_cw, "s3": mock_s3}
+    mock_boto_client.side_effect = lambda svc, **_kw: by_svc.get(svc, MagicMock())
+    mod = load_lambda("log-janitor")
+    import insights_alarms
+
+    live = [
+        insights_alarms.metric_alarm_params(
+            {
+                "alarm_name": f"Janitor-fn-{metric}",
+                "namespace": "AWS/Lambda",
+                "metric_name": metric,
+                "dimensions": [{"Name": "FunctionName", "Value": "fn"}],
+            }
+        )
+        for metric in ("Errors", "Throttles")
+    ]
+    mock_cw.get_paginator.return_value = _make_paginator([{"MetricAlarms": live}])
+    first = mod.lambda_handler({}, None)
+    mock_cw.put_metric_alarm.assert_not_called()
+    assert first["findings"]["alarms"]["unchanged"] == 2
+
+    edited = [{**live[0], "Threshold": 10.0}, live[1]]
+    mock_cw.get_paginator.return_value = _make_paginator([{"MetricAlarms": edited}])
+    second = mod.lambda_handler({}, None)
+    mock_cw.put_metric_alarm.assert_called_once()
+    assert mock_cw.put_metric_alarm.call_args.kwargs["AlarmName"] == "Janitor-fn-Errors"
+    assert second["findings"]["alarms"]["created"] == 1
+
+    mock_cw.put_metric_alarm.reset_mock()
+    mock_cw.get_paginator.return_value = _make_paginator([{"MetricAlarms": live[:1]}])
+    third = mod.lambda_handler({}, None)
+    mock_cw.put_metric_alarm.assert_called_once()
+    assert mock_cw.put_metric_alarm.call_args.kwargs["AlarmName"] == "Janitor-fn-Throttles"
+    assert third["findings"]["alarms"]["created"] == 1
+
+
+def test_compiled_matchers_match_original_rules(load_lambda):
+    """Precompiled matchers keep case-insensitive excludes, high-risk and exception rules."""
+    load_lambda("log-janitor")
+    import matchers
+
+    m = matchers.compile_matchers(
+        {
+            "log_group_include_prefixes": ["/aws/lambda/", "/aws/iot/"],
+            "log_group_exclude_patterns": ["dev", "Sandbox"],
+            "high_risk_patterns": ["Cognito", "ota"],
+            "log_group_exceptions": {"/aws/lambda/keep": "365", "/aws/lambda/bad": "x"},
+            "default_retention_days": 90,
+            "high_risk_retention_days": 180,
+        }
+    )
+    assert matchers.scoped_target_days("/ecs/app", m) is None
+    assert matchers.scoped_target_days("/aws/lambda/My-DEV-fn", m) is None
+    assert matchers.scoped_target_days("/aws/lambda/sandbox-x", m) is None
+    assert matchers.scoped_target_days("/aws/lambda/prod", m) == 90
+    assert matchers.scoped_target_days("/aws/iot/COGNITO-hook", m) == 180
+    assert matchers.scoped_target_days("/aws/lambda/keep", m) == 365
+    assert matchers.scoped_target_days("/aws/lambda/bad", m) == 90
+    assert matchers.in_scope("/aws/lambda/prod", m)
+    assert matchers.target_retention_days("/aws/lambda/ota-x", m) == 180
+
+
+_TRIPWIRE_ENV = {
+    "MODE": "APPLY",
+    "REGIONS": "us-east-2",
+    "ENABLE_RETENTION": "false",
+    "ENABLE_ALARMS": "false",
+    "ENABLE_DASHBOARD": "false",
+    "ENABLE_CLOUDTRAIL_TRIPWIRES": "true",
+    "ENABLE_CLOUDTRAIL_S3_POSTURE": "false",
+    "CLOUDTRAIL_LOG_GROUP_NAME": "trail-logs",
+    "ALARM_SNS_TOPIC_ARN": "arn:aws:sns:us-east-2:123:alarms",
+}
+
+
+def _tripwire_clients(drift_filter=None, drift_alarm=None):
+    """Per-region logs/cloudwatch mocks already holding every tripwire filter and alarm.
+    Call after load_lambda so the log-janitor modules are importable."""
+    import tripwires
+
+    namespace = "Security/CloudTrail"
+    topic = _TRIPWIRE_ENV["ALARM_SNS_TOPIC_ARN"]
+    clients: dict = {}
+
+    def factory(svc, region_name=None, **_kw):
+        key = (svc, region_name)
+        if key in clients:
+            return clients[key]
+        client = MagicMock()
+        if svc == "logs":
+            filters = [
+                tripwires.desired_filter(tw, "trail-logs", namespace)
+                for tw in tripwires.TRIPWIRE_DEFS
+                if tw["name"] != drift_filter
+            ]
+            client.get_paginator.return_value = _make_paginator([{"metricFilters": filters}])
+        elif svc == "cloudwatch":
+            alarms = [
+                tripwires.desired_alarm(tw, namespace, topic) for tw in tripwires.TRIPWIRE_DEFS
+            ]
+            for a in alarms:
+                if a["MetricName"] == drift_alarm:
+                    a["Threshold"] = 5
+            client.get_paginator.return_value = _make_paginator([{"MetricAlarms": alarms}])
+        clients[key] = client
+        return client
+
+    return clients, factory
+
+
+@patch.dict("os.environ", _TRIPWIRE_ENV, clear=False)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_tripwires_only_put_drifted_items(mock_boto_client, _sleep, load_lambda):
+    """In-sync tripwire filters/alarms are skipped; a missing filter and changed alarm are put."""
+    mod = load_lambda("log-janitor")
+    clients, factory = _tripwire_clients(drift_filter="RootLogin", drift_alarm="DeleteLogGroup")
+    mock_boto_client.side_effect = factory
+
+    result = mod.lambda_handler({}, None)
+
+    out = result["findings"]["cloudtrail_tripwires"]
+    logs, cw = clients[("logs", "us-east-2")], clients[("cloudwatch", "us-east-2")]
+    logs.put_metric_filter.assert_called_once()
+    assert logs.put_metric_filter.call_args.kwargs["filterName"] == "CloudTrail-RootLogin"
+    cw.put_metric_alarm.assert_called_once()
+    assert cw.put_metric_alarm.call_args.kwargs["AlarmName"] == "Janitor-CloudTrail-DeleteLogGroup"
+    assert out["scanned"] == 5
+    assert (out["filters_scanned"], out["alarms_scanned"]) == (5, 5)
+    assert out["unchanged"] == 8
+    assert out["drifted"] == 2
+    assert out["created"] == 2
+
+
+@patch.dict(
+    "os.environ",
+    {
+        **_TRIPWIRE_ENV,
+        "MODE": "AUDIT",
+        "CLOUDTRAIL_LOG_GROUP_NAME": "trail-logs, us-west-2:trail-logs",
+    },
+    clear=False,
+)
+@patch("boto3.client")
+def test_tripwires_audit_reports_drift_per_region(mock_boto_client, load_lambda):
+    """AUDIT reconciles every configured region and reports drift without writing."""
+    mod = load_lambda("log-janitor")
+    clients, factory = _tripwire_clients(drift_filter="RootLogin")
+    mock_boto_client.side_effect = factory
+
+    result = mod.lambda_handler({}, None)
+
+    out = result["findings"]["cloudtrail_tripwires"]
+    for region in ("us-east-2", "us-west-2"):
+        clients[("logs", region)].put_metric_filter.assert_not_called()
+        clients[("cloudwatch", region)].put_metric_alarm.assert_not_called()
+    assert out["scanned"] == 10
+    assert (out["filters_scanned"], out["alarms_scanned"]) == (10, 10)
+    assert out["drifted"] == 2
+    assert out["created"] == 0
+
+
+def _bare_bucket_client():
+    """S3 mock for a bucket with no versioning, encryption, lifecycle or public access block."""
+    s3 = MagicMock()
+    s3.get_public_access_block.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchPublicAccessBlockConfiguration"}}, "GetPublicAccessBlock"
+    )
+    s3.get_bucket_versioning.return_value = {}
+    s3.get_bucket_encryption.side_effect = ClientError(
+        {"Error": {"Code": "ServerSideEncryptionConfigurationNotFoundError"}}, "GetBucketEncryption"
+    )
+    s3.get_bucket_lifecycle_configuration.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchLifecycleConfiguration"}}, "GetBucketLifecycleConfiguration"
+    )
+    return s3
+
+
+@patch.dict(
+    "os.environ",
+    {
+        "MODE": "APPLY",
+        "REGIONS": "us-east-2",
+        "ENABLE_RETENTION": "false",
+        "ENABLE_ALARMS": "false",
+        "ENABLE_DASHBOARD": "false",
+        "ENABLE_CLOUDTRAIL_TRIPWIRES": "false",
+        "ENABLE_CLOUDTRAIL_S3_POSTURE": "true",
+        "CLOUDTRAIL_S3_BUCKET_NAME": "trail-bucket",
+        "S3_POSTURE_BUCKET_PREFIXES": "backup-,hls-",
+    },
+    clear=False,
+)
+@patch("time.sleep")
+@patch("boto3.client")
+def test_s3_posture_audits_prefixed_buckets_with_regional_clients(
+    mock_boto_client, _sleep, load_lambda
+):
+    """Prefix-matched buckets are audited via their region's client; lifecycle only on trail."""
+    default_s3 = MagicMock()
+    default_s3.list_buckets.return_value = {
+        "Buckets": [{"Name": n} for n in ("backup-db", "hls-out", "scratch", "trail-bucket")]
+    }
+    locations = {"trail-bucket": "us-east-2", "backup-db": "us-west-2", "hls-out": None}
+    default_s3.get_bucket_location.side_effect = lambda Bucket: {
+        "LocationConstraint": locations[Bucket]
+    }
+    regional = {r: _bare_bucket_client() for r in ("us-east-1", "us-east-2", "us-west-2")}
+
+    def client(svc, region_name=None, **_kw):
+        if svc == "s3":
+            return regional[region_name] if region_name else default_s3
+        return MagicMock()
+
+    mock_boto_client.side_effect = client
+    mod = load_lambda("log-janitor")
+
+    result = mod.lambda_handler({}, None)
+
+    buckets_by_region = {
+        r: {c.kwargs["Bucket"] for c in s3.get_bucket_versioning.call_args_list}
+        for r, s3 in regional.items()
+    }
+    assert buckets_by_region == {
+        "us-east-1": {"hls-out"},
+        "us-east-2": {"trail-bucket"},
+        "us-west-2": {"backup-db"},
+    }
+    default_s3.get_bucket_versioning.assert_not_called()
+    regional["us-east-2"].put_bucket_lifecycle_configuration.assert_called_once()
+    regional["us-west-2"].put_bucket_lifecycle_configuration.assert_not_called()
+    regional["us-east-1"].put_bucket_lifecycle_configuration.assert_not_called()
+    issues = {(f["bucket"], f["issue"]) for f in result["findings"]["s3_bucket"]}
+    assert ("backup-db", "lifecycle_not_set") in issues
+    assert not any(f["bucket"] == "scratch" for f in result["findings"]["s3_bucket"])
+    actions = {(a["bucket"], a["action"]) for a in result["actions_taken"]}
+    assert ("hls-out", "put_bucket_versioning") in actions
+    assert ("trail-bucket", "put_bucket_lifecycle") in actions
+    assert ("backup-db", "put_bucket_lifecycle") not in actions
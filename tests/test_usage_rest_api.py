@@ -53,14 +53,20 @@ def _make_cw_mock(per_metric=None):
     per_metric = per_metric or {}
     cw = MagicMock()
 
-    def get_metric_statistics(**kw):
-        metric = kw["MetricName"]
-        statistic = kw["Statistics"][0]
-        points = per_metric.get(metric, [])
-        datapoints = [{"Timestamp": ts, statistic: float(value)} for ts, value in points]
-        return {"Datapoints": datapoints}
-
-    cw.get_metric_statistics.side_effect = get_metric_statistics
+    def get_metric_data(**kw):
+        results = []
+        for query in kw["MetricDataQueries"]:
+            points = per_metric.get(query["MetricStat"]["Metric"]["MetricName"], [])
+            results.append(
+                {
+                    "Id": query["Id"],
+                    "Timestamps": [ts for ts, _ in points],
+                    "Values": [float(v) for _, v in points],
+                }
+            )
+        return {"MetricDataResults": results}
+
+    cw.get_metric_data.side_effect = get_metric_data
     return cw
 
 
@@ -162,6 +168,50 @@ def test_summary_returns_metrics(env):
     assert body["days"] == 7
 
 
+def test_summary_is_one_get_metric_data_call(env):
+    """All seven summary metrics travel in a single GetMetricData request."""
+    ts = datetime(2026, 5, 14, tzinfo=UTC)
+    cw = _make_cw_mock({"SessionCount": [(ts, 5)], "SessionDuration": [(ts, 120.0)]})
+    logs = _make_logs_mock()
+    with patch("boto3.client", side_effect=_client_factory(cw, logs)):
+        app = _load_app()
+        result = app.lambda_handler(
+            {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}, None
+        )
+    assert cw.get_metric_data.call_count == 1
+    queries = cw.get_metric_data.call_args.kwargs["MetricDataQueries"]
+    assert len(queries) == 7
+    stats = {q["MetricStat"]["Metric"]["MetricName"]: q["MetricStat"]["Stat"] for q in queries}
+    assert stats["SessionCount"] == "Sum"
+    assert stats["SessionDuration"] == "Average"
+    body = json.loads(result["body"])
+    assert body["data"]["daily"]["sessions"] == [{"date": "2026-05-14", "value": 5.0}]
+    assert body["data"]["avg_session_duration_seconds"] == pytest.approx(120.0)
+
+
+def test_metric_data_pages_are_merged(env):
+    """NextToken pages are followed and merged into date-ordered daily series."""
+    day1 = datetime(2026, 5, 13, tzinfo=UTC)
+    day2 = datetime(2026, 5, 14, tzinfo=UTC)
+    cw = MagicMock()
+    cw.get_metric_data.side_effect = [
+        {
+            "MetricDataResults": [{"Id": "sessions", "Timestamps": [day2], "Values": [3.0]}],
+            "NextToken": "t-1",
+        },
+        {"MetricDataResults": [{"Id": "sessions", "Timestamps": [day1], "Values": [2.0]}]},
+    ]
+    with patch("boto3.client", side_effect=_client_factory(cw, _make_logs_mock())):
+        app = _load_app()
+        result = app.lambda_handler(
+            {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}, None
+        )
+    assert cw.get_metric_data.call_args_list[1].kwargs["NextToken"] == "t-1"
+    body = json.loads(result["body"])
+    assert [p["date"] for p in body["data"]["daily"]["sessions"]] == ["2026-05-13", "2026-05-14"]
+    assert body["data"]["sessions"] == 5
+
+
 def test_summary_empty_metrics(env):
     cw = _make_cw_mock({})
     logs = _make_logs_mock()
@@ -196,13 +246,27 @@ def test_webvitals_uses_inp_when_present(env):
     assert body["data"]["interaction_ms"] == pytest.approx(80.0)
 
 
+def test_webvitals_falls_back_to_fid_in_same_call(env):
+    ts = datetime(2026, 5, 14, tzinfo=UTC)
+    cw = _make_cw_mock({"WebVitalsFirstInputDelay": [(ts, 42.0)]})
+    with patch("boto3.client", side_effect=_client_factory(cw, _make_logs_mock())):
+        app = _load_app()
+        result = app.lambda_handler(
+            {"httpMethod": "GET", "path": "/usage/webvitals", **AUTH_CONTEXT}, None
+        )
+    assert cw.get_metric_data.call_count == 1
+    body = json.loads(result["body"])
+    assert body["data"]["interaction_ms"] == pytest.approx(42.0)
+    assert body["data"]["lcp_seconds"] is None
+
+
 def test_top_pages(env):
     cw = _make_cw_mock({})
     logs = _make_logs_mock(
         [
             [
-                _row(**{"event_details.page": "/Aikido/Techniques", "views": 30}),
-                _row(**{"event_details.page": "/Home", "views": 12}),
+                _row(page="/Aikido/Techniques", section="Aikido", device="desktop", views=30),
+                _row(page="/Home", section="", device="mobile", views=12),
             ]
         ]
     )
@@ -298,16 +362,14 @@ def test_top_errors(env):
     assert body["data"][0]["page"] == "/Aikido"
 
 
-def test_devices_combines_two_queries(env):
+def test_devices_rolled_up_from_combined_pageview_query(env):
     cw = _make_cw_mock({})
     logs = _make_logs_mock(
         [
             [
-                _row(**{"metadata.deviceType": "desktop", "views": 40}),
-                _row(**{"metadata.deviceType": "mobile", "views": 15}),
-            ],
-            [
-                _row(**{"metadata.browserName": "Chrome", "views": 30}),
+                _row(page="/a", device="desktop", browser="Chrome", views=25),
+                _row(page="/b", device="desktop", browser="Firefox", views=15),
+                _row(page="/a", device="mobile", browser="Chrome", views=5),
             ],
         ]
     )
@@ -317,23 +379,138 @@ def test_devices_combines_two_queries(env):
             {"httpMethod": "GET", "path": "/usage/devices", **AUTH_CONTEXT}, None
         )
     body = json.loads(result["body"])
-    assert body["data"]["devices"][0] == {"device": "desktop", "views": 40}
+    assert body["data"]["devices"] == [
+        {"device": "desktop", "views": 40},
+        {"device": "mobile", "views": 5},
+    ]
     assert body["data"]["browsers"][0] == {"browser": "Chrome", "views": 30}
+    assert logs.start_query.call_count == 1
+
+
+def test_pageview_endpoints_share_one_scan(env):
+    """Pages, sections, devices and geography in one page load run a single query."""
+    logs = _make_logs_mock(
+        [[_row(page="/a", section="Aikido", device="desktop", country="US", region="CA", views=3)]]
+    )
+    paths = ["/usage/topPages", "/usage/topSections", "/usage/devices", "/usage/geography"]
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        bodies = [
+            json.loads(
+                app.lambda_handler({"httpMethod": "GET", "path": p, **AUTH_CONTEXT}, None)["body"]
+            )
+            for p in paths
+        ]
+    assert logs.start_query.call_count == 1
+    assert bodies[0]["data"] == [{"page": "/a", "views": 3}]
+    assert bodies[1]["data"] == [{"section": "Aikido", "views": 3}]
+    assert bodies[3]["data"]["regions"] == [{"country": "US", "region": "CA", "views": 3}]
+
+
+def _make_logs_by_id(statuses):
+    """Logs mock keyed by query id: statuses[qid] is a list of (status, rows) per poll."""
+    logs = MagicMock()
+    events = []
+    ids = iter(sorted(statuses))
+
+    def start_query(**kw):
+        qid = next(ids)
+        events.append(("start", qid))
+        return {"queryId": qid}
+
+    def get_query_results(queryId):
+        events.append(("poll", queryId))
+        polls = statuses[queryId]
+        status, rows = polls.pop(0) if len(polls) > 1 else polls[0]
+        return {"status": status, "results": rows}
+
+    logs.start_query.side_effect = start_query
+    logs.get_query_results.side_effect = get_query_results
+    return logs, events
+
+
+def _run_insights(app, queries):
+    from datetime import timedelta
+
+    end = datetime.now(UTC)
+    jobs = {(key, 0): (query, end - timedelta(days=1), end) for key, query in queries.items()}
+    return {key: (rows, complete) for (key, _i), rows, complete in app._iter_insights_results(jobs)}
+
+
+def test_insights_queries_submitted_together_and_polled_in_one_loop(env):
+    """Both queries start before the first poll; each completes on its own schedule."""
+    desktop = _row(**{"metadata.deviceType": "desktop", "views": 4})
+    chrome = _row(**{"metadata.browserName": "Chrome", "views": 3})
+    logs, events = _make_logs_by_id(
+        {
+            "q-a": [("Running", []), ("Running", []), ("Complete", [desktop])],
+            "q-b": [("Complete", [chrome])],
+        }
+    )
+    with (
+        patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)),
+        patch("time.sleep") as mock_sleep,
+    ):
+        app = _load_app()
+        results = _run_insights(app, {"devices": "qa", "browsers": "qb"})
+    assert results["devices"] == ([{"metadata.deviceType": "desktop", "views": "4"}], True)
+    assert results["browsers"] == ([{"metadata.browserName": "Chrome", "views": "3"}], True)
+    assert events[:2] == [("start", "q-a"), ("start", "q-b")]
+    assert events.count(("poll", "q-b")) == 1
+    delays = [c.args[0] for c in mock_sleep.call_args_list]
+    assert delays == sorted(delays)  # backs off while nothing finishes
+    logs.stop_query.assert_not_called()
+
+
+def test_insights_deadline_cancels_outstanding_queries(env):
+    """At the shared deadline, unfinished queries are stopped and return partial rows."""
+    us = _row(**{"metadata.countryCode": "US", "views": 9})
+    logs, _events = _make_logs_by_id(
+        {"q-a": [("Complete", [us])], "q-b": [("Running", [])]},
+    )
+    clock = {"now": 0.0}
+
+    def sleep(secs):
+        clock["now"] += secs
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)),
+        patch("time.sleep", side_effect=sleep),
+        patch("time.monotonic", side_effect=lambda: clock["now"]),
+    ):
+        app = _load_app()
+        results = _run_insights(app, {"countries": "qa", "regions": "qb"})
+    assert results["countries"] == ([{"metadata.countryCode": "US", "views": "9"}], True)
+    assert results["regions"] == ([], False)
+    logs.stop_query.assert_called_once_with(queryId="q-b")
+    assert clock["now"] <= app._QUERY_TIMEOUT_SECS
+
+
+def test_insights_limit_exceeded_queues_query(env):
+    """LimitExceededException on start leaves the query queued for the next poll round."""
+    from botocore.exceptions import ClientError
+
+    logs = _make_logs_mock([[_row(**{"metadata.deviceType": "mobile", "views": 2})], []])
+    limit = ClientError({"Error": {"Code": "LimitExceededException"}}, "StartQuery")
+    logs.start_query.side_effect = [{"queryId": "q-1"}, limit, {"queryId": "q-2"}]
+    with (
+        patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)),
+        patch("time.sleep"),
+    ):
+        app = _load_app()
+        results = _run_insights(app, {"devices": "qa", "browsers": "qb"})
+    assert logs.start_query.call_count == 3
+    assert results["devices"][0] == [{"metadata.deviceType": "mobile", "views": "2"}]
+    assert results["browsers"] == ([], True)
 
 
 def test_geography(env):
     cw = _make_cw_mock({})
     logs = _make_logs_mock(
         [
-            [_row(**{"metadata.countryCode": "US", "views": 20})],
             [
-                _row(
-                    **{
-                        "metadata.countryCode": "US",
-                        "metadata.subdivisionCode": "CA",
-                        "views": 12,
-                    }
-                ),
+                _row(country="US", region="CA", views=12),
+                _row(country="US", region="NY", views=8),
             ],
         ]
     )
@@ -343,8 +520,8 @@ def test_geography(env):
             {"httpMethod": "GET", "path": "/usage/geography", **AUTH_CONTEXT}, None
         )
     body = json.loads(result["body"])
-    assert body["data"]["countries"][0]["country"] == "US"
-    assert body["data"]["regions"][0]["region"] == "CA"
+    assert body["data"]["countries"] == [{"country": "US", "views": 20}]
+    assert body["data"]["regions"][0] == {"country": "US", "region": "CA", "views": 12}
 
 
 def test_unknown_endpoint_returns_error(env):
@@ -368,10 +545,10 @@ def test_cache_hit_skips_second_aws_call(env):
         app = _load_app()
         event = {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}
         app.lambda_handler(event, None)
-        calls_after_first = cw.get_metric_statistics.call_count
+        calls_after_first = cw.get_metric_data.call_count
         assert calls_after_first > 0
         app.lambda_handler(event, None)
-        assert cw.get_metric_statistics.call_count == calls_after_first
+        assert cw.get_metric_data.call_count == calls_after_first
 
 
 def _make_cw_with_metric_data(timestamps_values):
@@ -464,9 +641,9 @@ def test_aws_failure_returns_data_null_error(env):
     from botocore.exceptions import ClientError
 
     cw = MagicMock()
-    cw.get_metric_statistics.side_effect = ClientError(
+    cw.get_metric_data.side_effect = ClientError(
         {"Error": {"Code": "Throttling", "Message": "rate limit"}},
-        "GetMetricStatistics",
+        "GetMetricData",
     )
     logs = _make_logs_mock()
     with patch("boto3.client", side_effect=_client_factory(cw, logs)):
@@ -478,3 +655,639 @@ def test_aws_failure_returns_data_null_error(env):
     body = json.loads(result["body"])
     assert body["data"] is None
     assert "error" in body
+
+
+_CACHE_ENV = {"USAGE_CACHE_TABLE": "usage-cache", "AWS_LAMBDA_FUNCTION_NAME": "usage-api"}
+
+
+def _cache_clients(cw, item=None):
+    """Factory plus dynamodb/lambda mocks; `item` is the stored L2 cache item (or None)."""
+    ddb = MagicMock()
+    ddb.get_item.return_value = {"Item": item} if item else {}
+    lam = MagicMock()
+    by_service = {"cloudwatch": cw, "logs": _make_logs_mock(), "dynamodb": ddb, "lambda": lam}
+    return (lambda service, region_name=None: by_service[service]), ddb, lam
+
+
+def _cache_item(age_seconds, body):
+    import time as _time
+
+    return {
+        "computed_at": {"N": str(_time.time() - age_seconds)},
+        "body": {"S": json.dumps(body)},
+    }
+
+
+def test_cache_miss_fills_l2_then_l1_serves(env):
+    ts = datetime(2026, 5, 14, tzinfo=UTC)
+    cw = _make_cw_mock({"SessionCount": [(ts, 5)]})
+    factory, ddb, _lam = _cache_clients(cw)
+    event = {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}
+    with patch.dict("os.environ", _CACHE_ENV), patch("boto3.client", side_effect=factory):
+        app = _load_app()
+        first = json.loads(app.lambda_handler(event, None)["body"])
+        second = json.loads(app.lambda_handler(event, None)["body"])
+    assert first["cache"]["layer"] == "miss"
+    assert second["cache"]["layer"] == "l1"
+    assert cw.get_metric_data.call_count == 1
+    item = ddb.put_item.call_args.kwargs["Item"]
+    assert item["pk"]["S"] == "usage:/usage/summary:7"
+    assert json.loads(item["body"]["S"])["data"]["sessions"] == 5
+
+
+def test_cache_fresh_l2_hit_skips_aws(env):
+    cw = _make_cw_mock({})
+    factory, _ddb, lam = _cache_clients(cw, _cache_item(10, {"data": {"sessions": 42}}))
+    with patch.dict("os.environ", _CACHE_ENV), patch("boto3.client", side_effect=factory):
+        app = _load_app()
+        result = app.lambda_handler(
+            {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}, None
+        )
+    body = json.loads(result["body"])
+    assert body["data"]["sessions"] == 42
+    assert body["cache"] == {"layer": "l2", "age_seconds": 10, "stale": False}
+    cw.get_metric_data.assert_not_called()
+    lam.invoke.assert_not_called()
+
+
+def test_cache_stale_l2_served_and_refreshed_async(env):
+    cw = _make_cw_mock({})
+    factory, ddb, lam = _cache_clients(cw, _cache_item(3600, {"data": {"sessions": 7}}))
+    with patch.dict("os.environ", _CACHE_ENV), patch("boto3.client", side_effect=factory):
+        app = _load_app()
+        result = app.lambda_handler(
+            {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}, None
+        )
+    body = json.loads(result["body"])
+    assert body["data"]["sessions"] == 7
+    assert body["cache"]["stale"] is True
+    assert body["cache"]["refreshing"] is True
+    cw.get_metric_data.assert_not_called()
+    assert "refreshing_until" in ddb.update_item.call_args.kwargs["UpdateExpression"]
+    invoke = lam.invoke.call_args.kwargs
+    assert invoke["InvocationType"] == "Event"
+    assert json.loads(invoke["Payload"]) == {
+        "usage_cache_refresh": {"path": "/usage/summary", "days": 7}
+    }
+
+
+def test_cache_refresh_skipped_when_another_refresh_holds_lock(env):
+    from botocore.exceptions import ClientError
+
+    factory, ddb, lam = _cache_clients(_make_cw_mock({}), _cache_item(3600, {"data": {}}))
+    ddb.update_item.side_effect = ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem"
+    )
+    with patch.dict("os.environ", _CACHE_ENV), patch("boto3.client", side_effect=factory):
+        app = _load_app()
+        result = app.lambda_handler(
+            {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}, None
+        )
+    assert json.loads(result["body"])["cache"]["refreshing"] is False
+    lam.invoke.assert_not_called()
+
+
+def test_refresh_event_recomputes_and_writes_l2(env):
+    ts = datetime(2026, 5, 14, tzinfo=UTC)
+    cw = _make_cw_mock({"SessionCount": [(ts, 9)]})
+    factory, ddb, _lam = _cache_clients(cw)
+    with patch.dict("os.environ", _CACHE_ENV), patch("boto3.client", side_effect=factory):
+        app = _load_app()
+        result = app.lambda_handler(
+            {"usage_cache_refresh": {"path": "/usage/summary", "days": 14}}, None
+        )
+    assert result == {"refreshed": True, "path": "/usage/summary", "days": 14}
+    assert ddb.put_item.call_args.kwargs["Item"]["pk"]["S"] == "usage:/usage/summary:14"
+
+
+def test_l1_cache_is_lru_bounded(env):
+    with patch("boto3.client"):
+        app = _load_app()
+    app._L1_MAX_ENTRIES = 2
+    app._l1_put(("/a", 7, "d"), 1.0, {})
+    app._l1_put(("/b", 7, "d"), 1.0, {})
+    assert app._l1_get(("/a", 7, "d"), 2.0) is not None  # touch /a so /b is oldest
+    app._l1_put(("/c", 7, "d"), 1.0, {})
+    assert list(app._CACHE) == [("/a", 7, "d"), ("/c", 7, "d")]
+
+
+def _day(offset):
+    """ISO date `offset` days before today (UTC)."""
+    from datetime import timedelta
+
+    return (datetime.now(UTC) - timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def _query_start_day(logs):
+    ts = logs.start_query.call_args.kwargs["startTime"]
+    return datetime.fromtimestamp(ts, UTC).strftime("%Y-%m-%d")
+
+
+def _query_spans(logs):
+    """(start day, end day) of every start_query call, in call order."""
+    return [
+        tuple(
+            datetime.fromtimestamp(c.kwargs[k], UTC).strftime("%Y-%m-%d")
+            for k in ("startTime", "endTime")
+        )
+        for c in logs.start_query.call_args_list
+    ]
+
+
+def _top_pages_event(days):
+    return {
+        "httpMethod": "GET",
+        "path": "/usage/topPages",
+        "queryStringParameters": {"days": str(days)},
+        **AUTH_CONTEXT,
+    }
+
+
+def test_closed_days_memoized_and_merged_with_today(env):
+    """Rows split by bin(1d); a warm request only queries the unsettled yesterday and today,
+    and sums across days."""
+    page = "page"
+    first = [
+        _row(**{"bin(1d)": f"{_day(3)} 00:00:00.000", page: "/a", "views": 5}),
+        _row(**{"bin(1d)": f"{_day(0)} 00:00:00.000", page: "/a", "views": 1}),
+        _row(**{"bin(1d)": f"{_day(0)} 00:00:00.000", page: "/b", "views": 2}),
+    ]
+    second = [_row(**{"bin(1d)": f"{_day(0)} 00:00:00.000", page: "/b", "views": 7})]
+    logs = _make_logs_mock([first, second])
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        cold = json.loads(app.lambda_handler(_top_pages_event(7), None)["body"])
+        cold_start = _query_start_day(logs)
+        app._CACHE.clear()
+        app._RECENT_CACHE.clear()
+        warm = json.loads(app.lambda_handler(_top_pages_event(7), None)["body"])
+    assert cold_start == _day(6)
+    assert _query_start_day(logs) == _day(1)
+    assert cold["data"] == [{"page": "/a", "views": 6}, {"page": "/b", "views": 2}]
+    assert warm["data"] == [{"page": "/b", "views": 7}, {"page": "/a", "views": 5}]
+    assert sorted(day for _source, day in app._DAY_CACHE) == [_day(n) for n in range(6, 1, -1)]
+
+
+def test_unsettled_day_is_requeried_not_read_from_memo(env):
+    """A memo of yesterday written before ingestion caught up is ignored and re-queried."""
+    late = [_row(**{"bin(1d)": f"{_day(1)} 00:00:00.000", "page": "/a", "views": 9})]
+    logs = _make_logs_mock([late])
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        source = app._source_id("pageviews", app._DAILY_QUERIES["pageviews"], app._rum_log_group())
+        app._DAY_CACHE[(source, _day(1))] = [{"page": "/a", "views": 1}]
+        body = json.loads(app.lambda_handler(_top_pages_event(2), None)["body"])
+    assert _query_start_day(logs) == _day(1)
+    assert body["data"] == [{"page": "/a", "views": 9}]
+    assert app._DAY_CACHE[(source, _day(1))] == [{"page": "/a", "views": 1}]
+
+
+def test_wider_window_queries_only_unmemoized_days(env):
+    """After a 7-day request, a 30-day one queries days 29..7 (in week-long PageView
+    pieces) and the recent days; then only the recent days (yesterday and today)."""
+    logs = _make_logs_mock()
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        app.lambda_handler(_top_pages_event(7), None)
+        logs.start_query.reset_mock()
+        app.lambda_handler(_top_pages_event(30), None)
+        wide_spans = _query_spans(logs)
+        app._CACHE.clear()
+        app._RECENT_CACHE.clear()
+        logs.start_query.reset_mock()
+        app.lambda_handler(_top_pages_event(30), None)
+    assert wide_spans == [
+        (_day(29), _day(23)),
+        (_day(22), _day(16)),
+        (_day(15), _day(9)),
+        (_day(8), _day(6)),
+        (_day(1), _day(0)),
+    ]
+    assert _query_spans(logs) == [(_day(1), _day(0))]
+
+
+def test_partial_query_days_are_not_memoized(env):
+    """A query cut off at the deadline leaves its closed days unmemoized."""
+    logs, _events = _make_logs_by_id({"q-a": [("Running", [])]})
+    clock = {"now": 0.0}
+
+    def sleep(secs):
+        clock["now"] += secs
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)),
+        patch("time.sleep", side_effect=sleep),
+        patch("time.monotonic", side_effect=lambda: clock["now"]),
+    ):
+        app = _load_app()
+        app.lambda_handler(_top_pages_event(7), None)
+    assert not app._DAY_CACHE
+
+
+def _capped_rows(day_offset, n):
+    return [
+        _row(**{"bin(1d)": f"{_day(day_offset)} 00:00:00.000", "page": f"/p{i}", "views": 1})
+        for i in range(n)
+    ]
+
+
+def test_row_capped_span_is_split_and_requeried(env):
+    """A result at the row cap is dropped; its span is halved at a midnight and re-queried."""
+    logs = _make_logs_mock([_capped_rows(3, 3), _capped_rows(3, 2), _capped_rows(0, 1)])
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        app._DAILY_ROW_LIMIT = 3
+        body = json.loads(app.lambda_handler(_top_pages_event(7), None)["body"])
+    spans = _query_spans(logs)
+    assert spans[0] == (_day(6), _day(0))
+    assert spans[1:] == [(_day(6), _day(4)), (_day(3), _day(0))]
+    assert sum(item["views"] for item in body["data"]) == 3
+    assert "partial" not in body
+    assert len(app._DAY_CACHE) == 5  # settled days only; yesterday is re-queried
+
+
+def test_row_capped_piece_too_small_to_split_is_partial(env):
+    """Still at the cap once down to single days: not memoized, response marked partial."""
+    logs = _make_logs_mock([_capped_rows(3, 3)] * 50)
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        app._DAILY_ROW_LIMIT = 3
+        app._SPLIT_MIN_SECS = 86400
+        body = json.loads(app.lambda_handler(_top_pages_event(7), None)["body"])
+    single_days = [span for span in _query_spans(logs) if span[0] == span[1]]
+    assert len(single_days) == 7
+    assert body["approximate"] is True
+    assert body["partial"] is True
+    assert not app._DAY_CACHE
+    assert not app._RECENT_CACHE
+
+
+def test_split_span_halves_sub_day_pieces_down_to_the_minimum(env):
+    from datetime import timedelta
+
+    with patch("boto3.client"):
+        app = _load_app()
+    start = datetime(2026, 5, 14, tzinfo=UTC)
+    first, second = app._split_span(start, start + timedelta(hours=4))
+    assert first == (start, start + timedelta(hours=2, seconds=-1))
+    assert second == (start + timedelta(hours=2), start + timedelta(hours=4))
+    assert app._split_span(start, start + timedelta(minutes=30)) == []
+
+
+def test_day_memo_l2_batches_reads_and_writes(env):
+    """Settled days are read with BatchGetItem and written in 25-item BatchWriteItem chunks."""
+    ddb = MagicMock()
+    ddb.get_item.return_value = {}
+    ddb.batch_get_item.return_value = {"Responses": {}}
+    by_service = {"cloudwatch": MagicMock(), "logs": _make_logs_mock(), "dynamodb": ddb}
+    with (
+        patch.dict("os.environ", {"USAGE_CACHE_TABLE": "usage-cache"}),
+        patch("boto3.client", side_effect=lambda service, region_name=None: by_service[service]),
+    ):
+        app = _load_app()
+        app.lambda_handler(_top_pages_event(30), None)
+    keys = ddb.batch_get_item.call_args.kwargs["RequestItems"]["usage-cache"]["Keys"]
+    assert len(keys) == 28
+    writes = [
+        len(c.kwargs["RequestItems"]["usage-cache"]) for c in ddb.batch_write_item.call_args_list
+    ]
+    assert writes == [25, 3]
+
+
+def test_day_memo_l2_hits_skip_closed_days(env):
+    """Settled days found in L2 are reused; the query covers yesterday and today only."""
+    logs = _make_logs_mock()
+    ddb = MagicMock()
+    ddb.get_item.return_value = {}
+
+    def batch_get_item(RequestItems):
+        keys = RequestItems["usage-cache"]["Keys"]
+        rows = [{"page": "/old", "views": 1}]
+        items = [{**k, "rows": {"S": json.dumps(rows)}} for k in keys]
+        return {"Responses": {"usage-cache": items}}
+
+    ddb.batch_get_item.side_effect = batch_get_item
+    by_service = {"cloudwatch": MagicMock(), "logs": logs, "dynamodb": ddb}
+    with (
+        patch.dict("os.environ", {"USAGE_CACHE_TABLE": "usage-cache"}),
+        patch("boto3.client", side_effect=lambda service, region_name=None: by_service[service]),
+    ):
+        app = _load_app()
+        body = json.loads(app.lambda_handler(_top_pages_event(30), None)["body"])
+    assert _query_start_day(logs) == _day(1)
+    assert body["data"] == [{"page": "/old", "views": 28}]
+    ddb.batch_write_item.assert_not_called()
+
+
+_SCHEDULED_EVENT = {"source": "aws.events", "detail-type": "Scheduled Event", "detail": {}}
+
+
+def test_scheduled_rollup_materializes_every_source(env):
+    """The daily rule queries each additive source once and writes closed days to L2."""
+    logs = _make_logs_mock()
+    ddb = MagicMock()
+    ddb.batch_get_item.return_value = {"Responses": {}}
+    by_service = {"cloudwatch": MagicMock(), "logs": logs, "dynamodb": ddb}
+    with (
+        patch.dict("os.environ", {"USAGE_CACHE_TABLE": "usage-cache"}),
+        patch("boto3.client", side_effect=lambda service, region_name=None: by_service[service]),
+    ):
+        app = _load_app()
+        result = app.lambda_handler(_SCHEDULED_EVENT, None)
+    assert result["materialized"] is True
+    assert result["partial"] is False
+    assert set(result["rows"]) == set(app._DAILY_QUERIES)
+    pageview_pieces = -(-app._ROLLUP_DAYS // app._QUERY_SPAN_DAYS["pageviews"])
+    assert logs.start_query.call_count == len(app._DAILY_QUERIES) - 1 + pageview_pieces
+    assert _query_start_day(logs) == _day(app._ROLLUP_DAYS - 1)
+    pks = {
+        put["PutRequest"]["Item"]["pk"]["S"].split(":")[1]
+        for c in ddb.batch_write_item.call_args_list
+        for put in c.kwargs["RequestItems"]["usage-cache"]
+    }
+    assert pks == set(app._DAILY_QUERIES)
+
+
+def test_scheduled_rollup_requires_cache_table(env):
+    logs = _make_logs_mock()
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        result = app.lambda_handler(_SCHEDULED_EVENT, None)
+    assert result == {"materialized": False, "error": "USAGE_CACHE_TABLE not configured"}
+    logs.start_query.assert_not_called()
+
+
+def _all_event(sections=None):
+    qs = {"sections": sections} if sections is not None else None
+    return {
+        "httpMethod": "GET",
+        "path": "/usage/all",
+        "queryStringParameters": qs,
+        **AUTH_CONTEXT,
+    }
+
+
+def test_all_returns_every_section_with_per_section_errors(env):
+    """A failing section reports its error without failing the others."""
+    from botocore.exceptions import ClientError
+
+    cw = MagicMock()
+    cw.get_metric_data.side_effect = ClientError(
+        {"Error": {"Code": "Throttling", "Message": "rate limit"}}, "GetMetricData"
+    )
+    logs = _make_logs_mock([[_row(page="/a", device="desktop", views=2)]])
+    with patch("boto3.client", side_effect=_client_factory(cw, logs)):
+        app = _load_app()
+        body = json.loads(app.lambda_handler(_all_event(), None)["body"])
+    assert list(body["data"]) == [path.removeprefix("/usage/") for path in app._ENDPOINTS]
+    assert set(body["errors"]) == {"summary", "webvitals", "cognitoWeeklySignIns"}
+    assert body["data"]["summary"]["data"] is None
+    assert body["data"]["topPages"]["data"] == [{"page": "/a", "views": 2}]
+    assert body["data"]["devices"]["data"]["devices"] == [{"device": "desktop", "views": 2}]
+
+
+def test_all_sections_filter_and_shared_pageview_scan(env):
+    """Only the requested sections run; concurrent PageView sections share one query."""
+    cw = _make_cw_mock({})
+    logs = _make_logs_mock([[_row(page="/a", country="JP", region="13", views=4)]])
+    with patch("boto3.client", side_effect=_client_factory(cw, logs)):
+        app = _load_app()
+        body = json.loads(
+            app.lambda_handler(_all_event("topPages, geography,devices,bogus,topPages"), None)[
+                "body"
+            ]
+        )
+    assert list(body["data"]) == ["topPages", "geography", "devices", "bogus"]
+    assert body["errors"] == {"bogus": "Unknown endpoint: /usage/bogus"}
+    assert body["data"]["geography"]["data"]["countries"] == [{"country": "JP", "views": 4}]
+    assert logs.start_query.call_count == 1
+    cw.get_metric_data.assert_not_called()
+
+
+def test_sample_days_picks_spread_blocks_within_budget(env):
+    with patch("boto3.client"):
+        app = _load_app()
+    missing = [f"d{i:02d}" for i in range(89)]
+    assert app._sample_days(missing[:31], 31) == (missing[:31], [])
+    sampled, skipped = app._sample_days(missing, 31)
+    # 13 blocks cut from the newest day (the oldest has 5 days); 4 picked end to end.
+    assert sampled == missing[:5] + missing[26:33] + missing[54:61] + missing[82:]
+    assert sorted(sampled + skipped) == missing
+
+
+def test_sample_days_never_exceeds_a_budget_below_one_block(env):
+    with patch("boto3.client"):
+        app = _load_app()
+    missing = [f"d{i:02d}" for i in range(30)]
+    assert app._sample_days(missing, 3) == (missing[27:], missing[:27])
+    assert app._sample_days(missing, 1) == (missing[29:], missing[:29])
+
+
+def test_wide_cold_window_is_sampled_and_scaled(env):
+    """90 days with nothing memoized queries 25 sampled settled days plus yesterday and
+    scales counts up."""
+    logs = _make_logs_mock(
+        [[_row(**{"bin(1d)": f"{_day(1)} 00:00:00.000", "page": "/a", "views": 10})]]
+    )
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        body = json.loads(app.lambda_handler(_top_pages_event(90), None)["body"])
+    assert body["approximate"] is True
+    assert body["sampling_ratio"] == round(26 / 89, 3)
+    assert body["data"] == [{"page": "/a", "views": round(10 * 89 / 26)}]
+    spans = _query_spans(logs)
+    assert len(spans) == 5  # three spread blocks, the newest block, then yesterday and today
+    assert spans[-2:] == [(_day(8), _day(2)), (_day(1), _day(0))]
+    assert len(app._DAY_CACHE) == 25
+
+
+def test_approximate_mode_disabled_with_zero_budget(env):
+    logs = _make_logs_mock()
+    with (
+        patch.dict("os.environ", {"USAGE_APPROX_MAX_DAYS": "0"}),
+        patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)),
+    ):
+        app = _load_app()
+        body = json.loads(app.lambda_handler(_top_pages_event(90), None)["body"])
+    assert "approximate" not in body
+    spans = _query_spans(logs)
+    assert len(spans) == 13  # 90 days in week-long PageView pieces
+    assert spans[0] == (_day(89), _day(83))
+    assert spans[-1] == (_day(5), _day(0))
+
+
+def _emf_lines(captured):
+    return [json.loads(line) for line in captured.splitlines() if line.startswith('{"_aws"')]
+
+
+def test_debug_timing_returns_query_statistics_and_emits_emf(env, capsys):
+    logs = MagicMock()
+    logs.start_query.return_value = {"queryId": "q-1"}
+    logs.get_query_results.side_effect = [
+        {"status": "Running", "results": []},
+        {
+            "status": "Complete",
+            "results": [_row(page="/a", views=3)],
+            "statistics": {"bytesScanned": 2048.0, "recordsScanned": 40.0, "recordsMatched": 3.0},
+        },
+    ]
+    event = {**_top_pages_event(7), "queryStringParameters": {"days": "7", "debug": "timing"}}
+    with (
+        patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)),
+        patch("time.sleep"),
+    ):
+        app = _load_app()
+        body = json.loads(app.lambda_handler(event, None)["body"])
+    (query,) = body["timing"]["queries"]
+    assert query["source"].startswith("pageviews:")
+    assert query["status"] == "Complete"
+    assert query["polls"] == 2
+    assert query["bytes_scanned"] == 2048.0
+    assert query["records_matched"] == 3.0
+    assert query["partial"] == 0
+    (emf,) = _emf_lines(capsys.readouterr().out)
+    assert emf["Endpoint"] == "/usage/topPages"
+    assert emf["Window"] == "7d"
+    assert emf["InsightsBytesScanned"] == 2048.0
+    assert emf["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Endpoint", "Window"]]
+
+
+def test_timing_omitted_without_flag_and_deadline_marked_partial(env, capsys):
+    logs, _events = _make_logs_by_id({"q-a": [("Running", [])]})
+    clock = {"now": 0.0}
+
+    def sleep(secs):
+        clock["now"] += secs
+
+    with (
+        patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)),
+        patch("time.sleep", side_effect=sleep),
+        patch("time.monotonic", side_effect=lambda: clock["now"]),
+    ):
+        app = _load_app()
+        body = json.loads(app.lambda_handler(_top_pages_event(7), None)["body"])
+    assert "timing" not in body
+    (emf,) = _emf_lines(capsys.readouterr().out)
+    assert emf["Status"] == "Deadline"
+    assert emf["InsightsPartial"] == 1
+    assert emf["InsightsQueryTime"] >= app._QUERY_TIMEOUT_SECS * 1000
+
+
+def test_warm_event_fills_response_cache_for_each_window(env):
+    """Warm mode computes every endpoint per window; the next request is an L1 hit."""
+    ts = datetime(2026, 5, 14, tzinfo=UTC)
+    cw = _make_cw_mock({"SessionCount": [(ts, 5)]})
+    factory, ddb, _lam = _cache_clients(cw)
+    with patch.dict("os.environ", _CACHE_ENV), patch("boto3.client", side_effect=factory):
+        app = _load_app()
+        result = app.lambda_handler({"usage_cache_warm": {"days": [30, 7, 7]}}, None)
+        body = json.loads(
+            app.lambda_handler(
+                {**_top_pages_event(30), "path": "/usage/summary"},
+                None,
+            )["body"]
+        )
+    assert result["warmed"] == [7, 30]
+    assert set(result["errors"]) == {
+        "/usage/cognitoWeeklySignIns?days=7",
+        "/usage/cognitoWeeklySignIns?days=30",
+    }
+    assert {key[:2] for key in app._CACHE} >= {(p, d) for p in app._ENDPOINTS for d in (7, 30)}
+    pks = {c.kwargs["Item"]["pk"]["S"] for c in ddb.put_item.call_args_list}
+    assert {"usage:/usage/summary:7", "usage:/usage/topPages:30"} <= pks
+    assert body["cache"]["layer"] == "l1"
+    assert body["data"]["sessions"] == 5
+
+
+def test_warm_event_defaults_to_standard_windows(env):
+    factory, _ddb, _lam = _cache_clients(_make_cw_mock({}))
+    with patch.dict("os.environ", _CACHE_ENV), patch("boto3.client", side_effect=factory):
+        app = _load_app()
+        result = app.lambda_handler({"usage_cache_warm": {}}, None)
+    assert result["warmed"] == [7, 30, 90]
+
+
+def test_warm_event_requires_cache_table(env):
+    logs = _make_logs_mock()
+    with patch("boto3.client", side_effect=_client_factory(MagicMock(), logs)):
+        app = _load_app()
+        result = app.lambda_handler({"usage_cache_warm": {"days": [7]}}, None)
+    assert result == {"warmed": [], "error": "USAGE_CACHE_TABLE not configured"}
+    logs.start_query.assert_not_called()
+    assert not app._CACHE
+
+
+def test_etag_and_if_none_match_304_from_cache(env):
+    """A repeat request with the ETag is a 304 served from L1, with TTL-derived max-age."""
+    ts = datetime(2026, 5, 14, tzinfo=UTC)
+    cw = _make_cw_mock({"SessionCount": [(ts, 5)]})
+    event = {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}
+    with patch("boto3.client", side_effect=_client_factory(cw, _make_logs_mock())):
+        app = _load_app()
+        first = app.lambda_handler(event, None)
+        etag = first["headers"]["ETag"]
+        again = app.lambda_handler({**event, "headers": {"if-none-match": etag}}, None)
+        other = app.lambda_handler({**event, "headers": {"If-None-Match": '"nope"'}}, None)
+    assert first["statusCode"] == 200
+    assert first["headers"]["Cache-Control"] == f"private, max-age={app._CACHE_TTL_SECS}"
+    assert "_http" not in json.loads(first["body"])
+    assert again["statusCode"] == app.HTTP_NOT_MODIFIED
+    assert again["body"] == ""
+    assert again["headers"]["ETag"] == etag
+    assert other["statusCode"] == 200
+    assert cw.get_metric_data.call_count == 1
+
+
+def test_stale_l2_body_is_not_client_cacheable(env):
+    cw = _make_cw_mock({})
+    factory, _ddb, _lam = _cache_clients(cw, _cache_item(3600, {"data": {"sessions": 7}}))
+    with patch.dict("os.environ", _CACHE_ENV), patch("boto3.client", side_effect=factory):
+        app = _load_app()
+        result = app.lambda_handler(
+            {"httpMethod": "GET", "path": "/usage/summary", **AUTH_CONTEXT}, None
+        )
+    assert result["headers"]["Cache-Control"] == "private, max-age=0"
+    assert result["headers"]["ETag"] == f'W/"{app._etag({"data": {"sessions": 7}})}"'
+
+
+def test_large_body_gzipped_when_accepted(env):
+    import base64
+    import gzip
+
+    logs = _make_logs_mock([[_row(page="/a", views=3), _row(page="/b", views=2)]])
+    event = {**_top_pages_event(7), "headers": {"Accept-Encoding": "br;q=1, gzip;q=0.8"}}
+    with patch("boto3.client", side_effect=_client_factory(_make_cw_mock({}), logs)):
+        app = _load_app()
+        app._GZIP_MIN_BYTES = 64
+        result = app.lambda_handler(event, None)
+        refused = app.lambda_handler({**event, "headers": {"Accept-Encoding": "gzip;q=0"}}, None)
+        revalidated = app.lambda_handler(
+            {**event, "headers": {**event["headers"], "If-None-Match": result["headers"]["ETag"]}},
+            None,
+        )
+    assert result["isBase64Encoded"] is True
+    assert result["headers"]["Content-Encoding"] == "gzip"
+    assert result["headers"]["ETag"] == refused["headers"]["ETag"]
+    assert result["headers"]["ETag"].startswith('W/"')
+    body = json.loads(gzip.decompress(base64.b64decode(result["body"])))
+    assert body["data"] == json.loads(refused["body"])["data"]
+    assert "isBase64Encoded" not in refused
+    assert revalidated["statusCode"] == app.HTTP_NOT_MODIFIED
+
+
+def test_all_sections_combined_etag(env):
+    cw = _make_cw_mock({})
+    logs = _make_logs_mock([[_row(page="/a", device="desktop", views=2)]])
+    with patch("boto3.client", side_effect=_client_factory(cw, logs)):
+        app = _load_app()
+        first = app.lambda_handler(_all_event("topPages,devices"), None)
+        etag = first["headers"]["ETag"]
+        again = app.lambda_handler(
+            {**_all_event("topPages,devices"), "headers": {"If-None-Match": etag}}, None
+        )
+        narrower = app.lambda_handler(_all_event("topPages"), None)
+        failing = app.lambda_handler(_all_event("topPages,bogus"), None)
+    assert again["statusCode"] == app.HTTP_NOT_MODIFIED
+    assert narrower["headers"]["ETag"] != etag
+    assert "ETag" not in failing["headers"]
+    assert all("_http" not in s for s in json.loads(first["body"])["data"].values())